@@ -66,3 +66,24 @@ class TestAuthAPI:
         response = api_client.post(url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Token.objects.filter(user=user).exists()
+
+    def test_me_conditional_get(self, api_client: APIClient, django_assert_num_queries):
+        from rest_framework.authtoken.models import Token
+
+        user = create_user(username="u")
+        token = Token.objects.create(user=user)
+        api_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        url = reverse("accounts:me")
+        first = api_client.get(url)
+        assert first["Last-Modified"]
+        # token + user, profile
+        with django_assert_num_queries(2):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        api_client.patch(reverse("accounts:profile"), {"display_name": "New name"})
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["display_name"] == "New name"
@@ -5,6 +5,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.conditional import ConditionalGetMixin, make_version
+
 from .serializers import LoginSerializer, RegisterSerializer, UserSerializer, UpdateProfileSerializer
 from .services import UserService
 
@@ -62,11 +64,23 @@ class LogoutView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class MeView(APIView):
+class MeView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response(UserSerializer(request.user, context={"request": request}).data)
+        """
+        Current user. The profile row carries the only timestamp; username and email
+        cannot change through the API, so its updated_at also serves as Last-Modified.
+        """
+        user = request.user
+        profile = getattr(user, "profile", None)  # loaded once, reused by the serializer
+        changed = profile.updated_at if profile is not None else None
+        return self.conditional_response(
+            request,
+            make_version(user.pk, user.username, user.email, changed),
+            lambda: Response(UserSerializer(user, context={"request": request}).data),
+            last_modified=changed,
+        )
 
 
 class ProfileUpdateView(APIView):
@@ -1,72 +1,285 @@
 """
-Call presence state in Redis for UI (idle, connecting, active, ended).
-Key: call:state:{room_id} = hash of user_id -> JSON { state, username }.
-TTL on key so stale entries expire if consumer crashes without disconnect.
+Call presence state for UI (idle, connecting, active, ended).
+
+Key: call:state:{room_id} in the cache named by CALL_STATE_CACHE_ALIAS. Every write
+touches one user's entry only, so consumers of a room joining and leaving at once
+never overwrite each other:
+
+- Redis-backed cache (Django's RedisCache or django-redis): a hash of
+  user_id -> JSON {state, username, expires_at} plus a "_v" version field, written
+  by small Lua scripts (HSET / HDEL + HINCRBY _v) and read with HGETALL. The key's
+  EXPIRE is refreshed on every write; expired fields are deleted by a script that
+  re-checks their expires_at.
+- Any other backend: the room dict stored as (version, {user_id: entry}), updated by
+  compare-and-swap. A writer claims version + 1 with cache.add (atomic on every Django
+  backend) and only the claimant writes, so a racing writer re-reads and retries.
+
+Every change bumps the room's version, and writes return the change as a delta
+{version, added, removed, changed}; get_room_snapshot() returns the participants
+together with the version they correspond to. Clients apply deltas whose version is
+exactly theirs + 1 and fetch a snapshot on a gap. A room's version starts from the
+clock (in milliseconds) whenever its key is created, so it keeps growing across the
+key's expiry: a client still holding a version from before sees a gap, not old deltas.
+
+Each entry carries its own expires_at (CALL_STATE_TTL_SECONDS after the user's last
+update), emulating per-field expiry: readers skip expired entries, so a consumer that
+crashed without disconnecting drops out of presence even while others keep the room
+key alive.
 """
 from __future__ import annotations
 
 import json
+import logging
+import time
 from typing import Any
 
 from django.conf import settings
+from django.core.cache import caches
+
+from core.utils import redis_client
+
+logger = logging.getLogger(__name__)
 
 CALL_STATE_KEY_PREFIX = "call:state:"
 CALL_STATE_TTL_SECONDS = 3600  # 1 hour
+CAS_ATTEMPTS = 50
+CAS_CLAIM_TTL_SECONDS = 5
+VERSION_FIELD = "_v"
 
 STATE_IDLE = "idle"
 STATE_CONNECTING = "connecting"
 STATE_ACTIVE = "active"
 STATE_ENDED = "ended"
 
+clock = time.time
+
+
+def _cache():
+    return caches[getattr(settings, "CALL_STATE_CACHE_ALIAS", "default")]
 
-# AICODE-NOTE: Using Django cache as a fallback for Redis-less environments (SQLite/Low Memory)
-from django.core.cache import cache
 
 def _get_cache_key(room_id: int) -> str:
     return f"{CALL_STATE_KEY_PREFIX}{room_id}"
 
-def set_user_state(room_id: int, user_id: int, username: str, state: str) -> None:
-    """Set one user's call state in a room."""
+
+def _participants(entries: dict, now: float) -> list[dict[str, Any]]:
+    return [
+        {
+            "user_id": int(uid),
+            "username": data.get("username", ""),
+            "state": data.get("state", STATE_IDLE),
+        }
+        for uid, data in entries.items()
+        if data.get("expires_at", now) >= now
+    ]
+
+
+# --- Redis hashes ---------------------------------------------------------------------
+
+
+# KEYS[1] room hash; ARGV user_id, entry JSON, ttl, initial version.
+# Returns {version, 1 if the user had an entry}.
+_SET_SCRIPT = """
+local existed = redis.call('HEXISTS', KEYS[1], ARGV[1])
+redis.call('HSETNX', KEYS[1], '_v', ARGV[4])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+local version = redis.call('HINCRBY', KEYS[1], '_v', 1)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return {version, existed}
+"""
+
+# KEYS[1] room hash; ARGV user_id. Returns the new version, 0 if the user had no entry.
+_REMOVE_SCRIPT = """
+if redis.call('HDEL', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+return redis.call('HINCRBY', KEYS[1], '_v', 1)
+"""
+
+# KEYS[1] room hash; ARGV now, then the user_ids a reader saw expired. Deletes those still
+# expired (a user may have rejoined since the read) and bumps the version if any went.
+_PRUNE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local pruned = 0
+for i = 2, #ARGV do
+    local value = redis.call('HGET', KEYS[1], ARGV[i])
+    if value and tonumber(cjson.decode(value)['expires_at']) < now then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+        pruned = pruned + 1
+    end
+end
+if pruned > 0 then
+    redis.call('HINCRBY', KEYS[1], '_v', 1)
+end
+return pruned
+"""
+
+
+def _decode_hash(raw: dict) -> tuple[int, dict]:
+    decoded = {(uid.decode() if isinstance(uid, bytes) else uid): value for uid, value in raw.items()}
+    version = int(decoded.pop(VERSION_FIELD, 0))
+    return version, {uid: json.loads(value) for uid, value in decoded.items()}
+
+
+def _prune(client, raw_key: str, entries: dict, now: float) -> None:
+    """
+    Drop expired fields (the hash itself has only a key-level TTL). The script re-checks
+    each field's stored expires_at, so a user who rejoined since entries were read stays.
+    """
+    expired = [uid for uid, data in entries.items() if data.get("expires_at", now) < now]
+    if expired:
+        # A change like any other: the script bumps the version so clients holding the entry resync.
+        client.eval(_PRUNE_SCRIPT, 1, raw_key, repr(now), *expired)
+
+
+# --- compare-and-swap fallback ----------------------------------------------------------
+
+
+def _initial_version() -> int:
+    return int(clock() * 1000)
+
+
+def _unpack(value) -> tuple[int, dict]:
+    if isinstance(value, tuple):
+        return value
+    return 0, value or {}  # absent, or written before entries were versioned
+
+
+def _cas_update(cache, key: str, mutate) -> tuple[int, dict] | None:
+    """
+    Apply mutate(entries) -> entries to the room dict at key, retrying on conflicts.
+    Returns (new version, entries before the change), or None if nothing changed.
+    """
+    for attempt in range(CAS_ATTEMPTS):
+        value = cache.get(key)
+        version, entries = _unpack(value)
+        updated = mutate(dict(entries))
+        if updated == entries:
+            return None
+        if value is None:
+            # Create the key first so racing creators all start from the same version.
+            cache.add(key, (_initial_version(), {}), CALL_STATE_TTL_SECONDS)
+            continue
+        if cache.add(f"{key}:cas:{version + 1}", 1, timeout=CAS_CLAIM_TTL_SECONDS):
+            # Never delete the key: the version must keep growing while claims are alive.
+            cache.set(key, (version + 1, updated), CALL_STATE_TTL_SECONDS)
+            return version + 1, entries
+        time.sleep(0.001 * attempt)
+    logger.warning("Call state update of %s gave up after %d conflicting attempts", key, CAS_ATTEMPTS)
+    return None
+
+
+def _delta(version: int, added=(), removed=(), changed=()) -> dict:
+    return {"version": version, "added": list(added), "removed": list(removed), "changed": list(changed)}
+
+
+# --- public API -------------------------------------------------------------------------
+
+
+def set_user_state(room_id: int, user_id: int, username: str, state: str) -> dict | None:
+    """Set one user's call state in a room. Returns the delta (None if the write gave up)."""
+    now = clock()
+    entry = {"state": state, "username": username, "expires_at": now + CALL_STATE_TTL_SECONDS}
+    participant = {"user_id": user_id, "username": username, "state": state}
+    cache = _cache()
     key = _get_cache_key(room_id)
-    # Get current room state or empty dict
-    room_data = cache.get(key, {})
-    # Update user data
-    room_data[str(user_id)] = {"state": state, "username": username}
-    # Save back to cache with TTL
-    cache.set(key, room_data, CALL_STATE_TTL_SECONDS)
+    raw_key = cache.make_and_validate_key(key)
+    client = redis_client(cache, raw_key)
+    pruned = []
+    if client is not None:
+        version, existed = client.eval(
+            _SET_SCRIPT, 1, raw_key, str(user_id), json.dumps(entry), CALL_STATE_TTL_SECONDS,
+            _initial_version(),
+        )
+        existed = bool(existed)
+    else:
+        def mutate(entries):
+            entries = {uid: data for uid, data in entries.items() if data.get("expires_at", now) >= now}
+            entries[str(user_id)] = entry
+            return entries
 
+        result = _cas_update(cache, key, mutate)
+        if result is None:
+            return None
+        version, before = result
+        existed = str(user_id) in before
+        # Expired entries of others were pruned by this write.
+        pruned = [
+            int(uid) for uid, data in before.items()
+            if uid != str(user_id) and data.get("expires_at", now) < now
+        ]
+    if existed:
+        return _delta(int(version), changed=[participant], removed=pruned)
+    return _delta(int(version), added=[participant], removed=pruned)
 
-def remove_user(room_id: int, user_id: int) -> None:
-    """Remove user from room call state."""
+
+def remove_user(room_id: int, user_id: int) -> dict | None:
+    """Remove user from room call state. Returns the delta, None if the user was not in it."""
+    cache = _cache()
     key = _get_cache_key(room_id)
-    room_data = cache.get(key, {})
-    if str(user_id) in room_data:
-        del room_data[str(user_id)]
-        if not room_data:
-            cache.delete(key)
-        else:
-            cache.set(key, room_data, CALL_STATE_TTL_SECONDS)
+    raw_key = cache.make_and_validate_key(key)
+    client = redis_client(cache, raw_key)
+    if client is not None:
+        version = int(client.eval(_REMOVE_SCRIPT, 1, raw_key, str(user_id)))
+        return _delta(version, removed=[user_id]) if version else None
+
+    def mutate(entries):
+        entries.pop(str(user_id), None)
+        return entries
+
+    result = _cas_update(cache, key, mutate)
+    return _delta(result[0], removed=[user_id]) if result is not None else None
 
 
 def get_room_state(room_id: int) -> list[dict[str, Any]]:
     """Return list of participants in call for the room."""
-    key = _get_cache_key(room_id)
-    room_data = cache.get(key, {})
-    result = []
-    for uid, data in room_data.items():
-        result.append({
-            "user_id": int(uid),
-            "username": data.get("username", ""),
-            "state": data.get("state", STATE_IDLE),
-        })
-    return result
+    return get_room_snapshot(room_id)[1]
 
 
-def get_room_aggregate_state(room_id: int) -> str:
-    """Return 'active' if any participant in call, else 'idle'."""
-    participants = get_room_state(room_id)
-    if not participants:
-        return STATE_IDLE
+def get_room_snapshot(room_id: int) -> tuple[int, list[dict[str, Any]]]:
+    """Return (version, participants): the state later deltas apply to."""
+    return _read_rooms([room_id])[room_id]
+
+
+def get_rooms_state(room_ids) -> dict[int, list[dict[str, Any]]]:
+    """get_room_state for many rooms with one round trip (room lists)."""
+    return {room_id: participants for room_id, (_, participants) in _read_rooms(room_ids).items()}
+
+
+def _read_rooms(room_ids) -> dict[int, tuple[int, list[dict[str, Any]]]]:
+    now = clock()
+    cache = _cache()
+    keys = {_get_cache_key(room_id): room_id for room_id in room_ids}
+    raw_keys = {key: cache.make_and_validate_key(key) for key in keys}
+    clients = {key: redis_client(cache, raw_key) for key, raw_key in raw_keys.items()}
+    if keys and all(client is not None for client in clients.values()):
+        snapshots = {}
+        pipelines = {}
+        for key, client in clients.items():
+            pipelines.setdefault(id(client), (client, client.pipeline(transaction=False), []))
+            _, pipe, pending = pipelines[id(client)]
+            pipe.hgetall(raw_keys[key])
+            pending.append(key)
+        for client, pipe, pending in pipelines.values():
+            for key, raw in zip(pending, pipe.execute()):
+                snapshots[key] = _decode_hash(raw)
+                _prune(client, raw_keys[key], snapshots[key][1], now)
+    else:
+        found = cache.get_many(keys)
+        snapshots = {key: _unpack(found.get(key)) for key in keys}
+    return {
+        room_id: (snapshots[key][0], _participants(snapshots[key][1], now))
+        for key, room_id in keys.items()
+    }
+
+
+def aggregate_state(participants) -> str:
+    """'active' if anyone in the participant list is in the call, else 'idle'."""
     if any(p.get("state") == STATE_ACTIVE or p.get("state") == STATE_CONNECTING for p in participants):
         return STATE_ACTIVE
     return STATE_IDLE
+
+
+def get_room_aggregate_state(room_id: int) -> str:
+    """Return 'active' if any participant in call, else 'idle'."""
+    return aggregate_state(get_room_state(room_id))
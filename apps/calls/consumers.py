@@ -1,21 +1,41 @@
 """
 WebRTC signaling WebSocket consumer.
-Relays offer, answer, ice_candidate to target user; broadcasts user_joined / user_left.
-Call state (idle, connecting, active, ended) is stored in Redis for presence/UI.
+Relays offer, answer, ice_candidate to the target user's sockets only (each socket is
+also in call_{room_id}_user_{user_id}, so a relay is one delivery, not one per
+participant). Call presence (idle, connecting, active, ended) lives in call_state.py:
+a client gets a versioned call_state snapshot on connect (and on sync_call_state),
+then one call_state_delta per change.
+
+ICE batching (opt-in per socket with ?ice_batch=1): ice_candidate messages from the
+socket to one target are held for SIGNALING_ICE_BATCH_WINDOW_MS and relayed as one
+ice_candidates message, in order. Any other relay to that target, an end-of-candidates
+marker (candidate null or with an empty candidate string), a candidate whose other
+fields differ from the batch's, leave_call and disconnect flush the target's batch
+first. Sends to one target are serialized by a per-target lock, so a flush by the
+window timer never overtakes or interleaves with one from the socket. Opted-in
+receivers get one ice_candidates frame (the message's fields with `candidates` in
+place of `candidate`), others one ice_candidate frame per candidate.
 """
 
+import asyncio
+from urllib.parse import parse_qs
+
 from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 
+from core import ratelimit
 from core.ws_auth import get_user_from_scope
+from apps.rooms import presence
 from apps.rooms.models import Room
 from apps.rooms.services import RoomService
 
 from .call_state import (
     STATE_ACTIVE,
     STATE_CONNECTING,
-    get_room_aggregate_state,
+    aggregate_state,
+    get_room_snapshot,
     get_room_state,
     remove_user as call_state_remove_user,
     set_user_state as call_state_set_user_state,
@@ -36,9 +56,23 @@ def check_room_participant(room_id, user):
     return True, room
 
 
+def user_group_name(room_id, user_id) -> str:
+    """Group of one user's signaling sockets in one call."""
+    return f"call_{room_id}_user_{user_id}"
+
+
+def ice_batch_requested(scope) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("ice_batch", ["0"])[0].lower() in ("1", "true")
+
+
+def is_end_of_candidates(candidate) -> bool:
+    return candidate is None or (isinstance(candidate, dict) and not candidate.get("candidate"))
+
+
 class SignalingConsumer(AsyncJsonWebsocketConsumer):
     """
-    WebRTC signaling: join_call, leave_call, offer, answer, ice_candidate.
+    WebRTC signaling: join_call, leave_call, sync_call_state, offer, answer, ice_candidate.
     Only room participants can connect. SDP/ICE payloads are forwarded unchanged.
     """
 
@@ -52,32 +86,38 @@ class SignalingConsumer(AsyncJsonWebsocketConsumer):
         self.room_group_name = f"call_{self.room_id}"
         self.user_id = self.user.id
         self._username = getattr(self.user, "username", "") or ""
+        self.user_group_name = user_group_name(self.room_id, self.user_id)
+        self.ice_batch = ice_batch_requested(self.scope)
+        self._ice_pending = {}  # target user id -> (other fields, candidates) held for the window
+        self._ice_flush_tasks = {}
+        self._send_locks = {}  # target user id -> asyncio.Lock held across flush and send
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await sync_to_async(call_state_set_user_state)(
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        delta = await sync_to_async(call_state_set_user_state)(
             self.room_id, self.user_id, self._username, STATE_CONNECTING
         )
         await self.accept()
+        # The snapshot already includes this change; the delta only goes to the others.
+        await self._send_snapshot()
+        await self._broadcast_call_state(delta, exclude_self=True)
 
     async def disconnect(self, close_code):
         if hasattr(self, "room_group_name"):
-            await sync_to_async(call_state_remove_user)(self.room_id, self.user_id)
-            await self._broadcast_call_state()
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "user_left",
-                    "user_id": self.user_id,
-                },
-            )
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name,
-            )
+            await self._flush_all_ice()
+            delta = await sync_to_async(call_state_remove_user)(self.room_id, self.user_id)
+            await self._broadcast_call_state(delta)
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
 
     async def receive_json(self, content):
         message_type = content.get("type")
         data = content.get("data", {})
 
+        retry_after = await ratelimit.ahit(self.user_id, message_type)
+        if retry_after:
+            await self.send_json(ratelimit.rate_limited_error(message_type, retry_after))
+            return
+
         if message_type == "ping":
             await self.send_json({"type": "pong"})
             return
@@ -86,6 +126,8 @@ class SignalingConsumer(AsyncJsonWebsocketConsumer):
             await self._broadcast_user_joined()
         elif message_type == "leave_call":
             await self._broadcast_user_left()
+        elif message_type == "sync_call_state":
+            await self._send_snapshot()
         elif message_type == "request_mic":
             # AICODE-NOTE: Handle admin request to unmute (#15)
             await self._handle_request_mic(data)
@@ -102,101 +144,130 @@ class SignalingConsumer(AsyncJsonWebsocketConsumer):
             await self.send_json({"type": "error", "detail": "Only admin can request microphone."})
             return
 
-        target_user_id = data.get("target_user_id")
-        if not target_user_id:
-            await self.send_json({"type": "error", "detail": "target_user_id required."})
-            return
-
         # 2. Relay request to target user
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "signaling_relay",
-                "message_type": "request_mic",
-                "from_user_id": self.user_id,
-                "from_username": self._username,
-                "target_user_id": target_user_id,
-                "data": {},
-            },
-        )
+        target_user_id = await self._target(data.get("target_user_id"))
+        if target_user_id is not None:
+            await self._send_to_target("request_mic", target_user_id, {})
 
     async def _broadcast_user_joined(self):
-        """Notify other participants that this user joined the call; update Redis state to active."""
-        await sync_to_async(call_state_set_user_state)(
+        """This user joined the call (state active); peers set up connections on the delta."""
+        delta = await sync_to_async(call_state_set_user_state)(
             self.room_id, self.user_id, self._username, STATE_ACTIVE
         )
-        await self._broadcast_call_state()
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "user_joined",
-                "user": {
-                    "id": self.user_id,
-                    "username": self._username,
-                },
-                "exclude_channel": self.channel_name,
-            },
-        )
+        await self._broadcast_call_state(delta)
 
     async def _broadcast_user_left(self):
-        """Notify others that this user left the call (explicit leave_call); remove from Redis."""
-        await sync_to_async(call_state_remove_user)(self.room_id, self.user_id)
-        await self._broadcast_call_state()
+        """This user left the call (explicit leave_call); peers close connections on the delta."""
+        await self._flush_all_ice()
+        delta = await sync_to_async(call_state_remove_user)(self.room_id, self.user_id)
+        await self._broadcast_call_state(delta)
+
+    async def _send_snapshot(self):
+        version, participants = await sync_to_async(get_room_snapshot)(self.room_id)
+        await self.send_json({
+            "type": "call_state",
+            "data": {
+                "version": version,
+                "participants": participants,
+                "room_state": aggregate_state(participants),
+            },
+        })
+
+    async def _broadcast_call_state(self, delta, exclude_self=False):
+        """Send one presence change to the call group and the room members' sidebars."""
+        if delta is None:
+            return
+        # 1. Notify participants in the call
         await self.channel_layer.group_send(
             self.room_group_name,
             {
-                "type": "user_left",
-                "user_id": self.user_id,
+                "type": "call_state_delta",
+                "delta": delta,
+                "exclude_channel": self.channel_name if exclude_self else None,
             },
         )
 
-    async def _broadcast_call_state(self):
-        """Send call_state to all in group so UI can show presence (idle/connecting/active/ended)."""
+        # 2. Notify all room members for sidebar update (#UI_Presence): one send to the
+        # room's presence group reaches every member's notification sockets.
         participants = await sync_to_async(get_room_state)(self.room_id)
-        room_state = await sync_to_async(get_room_aggregate_state)(self.room_id)
-        
-        # 1. Notify participants in the call
+        active_usernames = [p["username"] for p in participants if p.get("state") in (STATE_ACTIVE, STATE_CONNECTING)]
         await self.channel_layer.group_send(
-            self.room_group_name,
+            presence.group_name(self.room_id),
             {
-                "type": "call_state",
-                "participants": participants,
-                "room_state": room_state,
+                "type": "notification",
+                "data": {
+                    "type": "room_presence_update",
+                    "room_id": int(self.room_id),
+                    "active_participants": active_usernames,
+                },
             },
         )
 
-        # 2. Notify all room members for sidebar update (#UI_Presence)
-        room_members_group = f"room_{self.room_id}"
-        active_usernames = [p["username"] for p in participants if p.get("state") in (STATE_ACTIVE, STATE_CONNECTING)]
-        
-        # Broadcast to all users in the room (via their personal user_{id} groups)
-        # We need to fetch all participant IDs for this room
-        participant_ids = await database_sync_to_async(
-            lambda: list(Room.objects.get(pk=self.room_id).participants.values_list('user_id', flat=True))
-        )()
-
-        for user_id in participant_ids:
-            user_group = f"user_{user_id}"
-            await self.channel_layer.group_send(
-                user_group,
-                {
-                    "type": "notification",
-                    "data": {
-                        "type": "room_presence_update",
-                        "room_id": int(self.room_id),
-                        "active_participants": active_usernames,
-                    }
-                }
-            )
-
     async def _relay_signaling(self, message_type, data):
         """Relay offer/answer/ice_candidate to target_user_id."""
-        target_user_id = data.get("target_user_id")
+        target_user_id = await self._target(data.get("target_user_id"))
         if target_user_id is None:
-            await self.send_json({"type": "error", "detail": "target_user_id required."})
             return
+        window = getattr(settings, "SIGNALING_ICE_BATCH_WINDOW_MS", 0) / 1000
+        if message_type == "ice_candidate" and self.ice_batch and window > 0:
+            candidate = data.get("candidate")
+            fields = {key: value for key, value in data.items() if key != "candidate"}
+            pending = self._ice_pending.get(target_user_id)
+            if pending is not None and pending[0] != fields:
+                await self._flush_ice(target_user_id)  # a batch carries one set of fields
+            self._ice_pending.setdefault(target_user_id, (fields, []))[1].append(candidate)
+            if is_end_of_candidates(candidate):
+                await self._flush_ice(target_user_id)
+            elif target_user_id not in self._ice_flush_tasks:
+                self._ice_flush_tasks[target_user_id] = asyncio.create_task(
+                    self._flush_ice_later(target_user_id, window)
+                )
+            return
+        async with self._send_lock(target_user_id):
+            # Candidates held for this target were sent before this message: keep them first.
+            await self._send_pending_ice(target_user_id)
+            await self._send_to_target(message_type, target_user_id, data)
+
+    def _send_lock(self, target_user_id):
+        return self._send_locks.setdefault(target_user_id, asyncio.Lock())
+
+    async def _flush_ice_later(self, target_user_id, window):
+        await asyncio.sleep(window)
+        await self._flush_ice(target_user_id)
+
+    async def _flush_ice(self, target_user_id):
+        async with self._send_lock(target_user_id):
+            await self._send_pending_ice(target_user_id)
+
+    async def _send_pending_ice(self, target_user_id):
+        """Send the target's held candidates; the caller holds the target's send lock."""
+        task = self._ice_flush_tasks.pop(target_user_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()  # not started sending: a timer only sends while holding the lock
+        pending = self._ice_pending.pop(target_user_id, None)
+        if pending is not None:
+            fields, candidates = pending
+            await self._send_to_target("ice_candidates", target_user_id, {**fields, "candidates": candidates})
+
+    async def _flush_all_ice(self):
+        for target_user_id in list(self._ice_pending):
+            await self._flush_ice(target_user_id)
+
+    async def _target(self, target_user_id):
+        """The target user id as int, or None after telling the client what is wrong."""
+        if target_user_id in (None, ""):
+            await self.send_json({"type": "error", "detail": "target_user_id required."})
+            return None
+        try:
+            return int(target_user_id)
+        except (TypeError, ValueError):
+            await self.send_json({"type": "error", "detail": "target_user_id must be an integer."})
+            return None
+
+    async def _send_to_target(self, message_type, target_user_id, data):
+        """Deliver a signaling_relay to the target user's sockets in this call only."""
         await self.channel_layer.group_send(
-            self.room_group_name,
+            user_group_name(self.room_id, target_user_id),
             {
                 "type": "signaling_relay",
                 "message_type": message_type,
@@ -207,35 +278,26 @@ class SignalingConsumer(AsyncJsonWebsocketConsumer):
             },
         )
 
-    async def call_state(self, event):
-        """Send current call presence to this client."""
-        await self.send_json({
-            "type": "call_state",
-            "data": {
-                "participants": event["participants"],
-                "room_state": event["room_state"],
-            },
-        })
-
-    async def user_joined(self, event):
-        """Send user_joined to this client (excluding sender)."""
+    async def call_state_delta(self, event):
+        """Send one versioned presence change ({version, added, removed, changed}) to this client."""
         if event.get("exclude_channel") == self.channel_name:
             return
-        await self.send_json({
-            "type": "user_joined",
-            "data": {"user": event["user"]},
-        })
-
-    async def user_left(self, event):
-        """Send user_left to this client."""
-        await self.send_json({
-            "type": "user_left",
-            "data": {"user_id": event["user_id"]},
-        })
+        await self.send_json({"type": "call_state_delta", "data": event["delta"]})
 
     async def signaling_relay(self, event):
-        """Send offer/answer/ice_candidate only to the target user."""
-        if event["target_user_id"] != self.user_id:
+        """Send offer/answer/ice_candidate (addressed to this user's group) to the client."""
+        if event["message_type"] == "ice_candidates" and not self.ice_batch:
+            fields = dict(event["data"])
+            for candidate in fields.pop("candidates"):
+                await self.send_json({
+                    "type": "ice_candidate",
+                    "data": {
+                        "from_user_id": event["from_user_id"],
+                        "from_username": event.get("from_username", ""),
+                        **fields,
+                        "candidate": candidate,
+                    },
+                })
             return
         await self.send_json({
             "type": event["message_type"],
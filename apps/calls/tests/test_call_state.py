@@ -1,20 +1,285 @@
-"""Unit tests for call state in Redis. Without Redis, get_room_state returns [] and state is idle."""
+"""Unit tests for call state: CAS fallback on the test cache, Redis hashes on a fake client."""
+
+import asyncio
+import json
+import time
 
 import pytest
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.locmem import LocMemCache
 
+from apps.calls import call_state
 from apps.calls.call_state import (
+    STATE_ACTIVE,
+    STATE_CONNECTING,
     STATE_IDLE,
     get_room_aggregate_state,
+    get_room_snapshot,
     get_room_state,
+    get_rooms_state,
+    remove_user,
+    set_user_state,
 )
 
 
+def _users(room_id):
+    return {p["user_id"]: p["state"] for p in get_room_state(room_id)}
+
+
 @pytest.mark.django_db
 class TestCallStateWithoutRedis:
-    """When Redis is unavailable (e.g. test env), state is empty and idle."""
+    """When Redis is unavailable (e.g. test env), state lives in the Django cache."""
 
     def test_get_room_state_returns_empty_list(self):
         assert get_room_state(room_id=1) == []
 
     def test_get_room_aggregate_state_returns_idle(self):
         assert get_room_aggregate_state(room_id=1) == STATE_IDLE
+
+    def test_set_and_remove(self):
+        set_user_state(1, 10, "alice", STATE_CONNECTING)
+        set_user_state(1, 11, "bob", STATE_ACTIVE)
+        set_user_state(1, 10, "alice", STATE_ACTIVE)
+        assert get_room_state(1) == [
+            {"user_id": 10, "username": "alice", "state": STATE_ACTIVE},
+            {"user_id": 11, "username": "bob", "state": STATE_ACTIVE},
+        ]
+        remove_user(1, 10)
+        remove_user(1, 11)
+        remove_user(1, 12)
+        assert get_room_state(1) == []
+        assert get_room_aggregate_state(1) == STATE_IDLE
+
+    def test_entries_expire_individually(self, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        set_user_state(1, 10, "crashed", STATE_ACTIVE)
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS - 1)
+        set_user_state(1, 11, "alive", STATE_ACTIVE)
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS + 1)
+        assert _users(1) == {11: STATE_ACTIVE}
+
+    def test_writes_return_versioned_deltas(self):
+        alice = {"user_id": 10, "username": "alice", "state": STATE_CONNECTING}
+        assert remove_user(1, 10) is None
+        first = set_user_state(1, 10, "alice", STATE_CONNECTING)
+        v = first["version"]
+        assert first == {"version": v, "added": [alice], "removed": [], "changed": []}
+        assert set_user_state(1, 10, "alice", STATE_ACTIVE) == {
+            "version": v + 1, "added": [], "removed": [], "changed": [{**alice, "state": STATE_ACTIVE}],
+        }
+        assert get_room_snapshot(1) == (v + 1, [{**alice, "state": STATE_ACTIVE}])
+        assert remove_user(1, 10) == {"version": v + 2, "added": [], "removed": [10], "changed": []}
+        assert remove_user(1, 10) is None
+        assert get_room_snapshot(1) == (v + 2, [])
+
+    def test_version_keeps_growing_after_the_key_expires(self, monkeypatch):
+        from django.core.cache import cache
+
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        for state in (STATE_CONNECTING, STATE_ACTIVE, STATE_CONNECTING):
+            old = set_user_state(1, 10, "alice", state)["version"]
+        cache.delete(call_state._get_cache_key(1))  # the room key's TTL ran out
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS)
+        assert set_user_state(1, 11, "bob", STATE_CONNECTING)["version"] > old + 1
+
+    def test_write_reports_pruned_entries_as_removed(self, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        set_user_state(1, 10, "crashed", STATE_ACTIVE)
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS + 1)
+        delta = set_user_state(1, 11, "alive", STATE_ACTIVE)
+        assert delta["removed"] == [10]
+        assert [p["user_id"] for p in delta["added"]] == [11]
+
+    def test_get_rooms_state(self):
+        set_user_state(1, 10, "alice", STATE_ACTIVE)
+        assert get_rooms_state([1, 2]) == {
+            1: [{"user_id": 10, "username": "alice", "state": STATE_ACTIVE}],
+            2: [],
+        }
+
+
+@pytest.fixture
+def slow_cache(monkeypatch):
+    """Widen the read-modify-write window so racing writers really interleave."""
+    get = LocMemCache.get
+
+    def slow_get(self, *args, **kwargs):
+        value = get(self, *args, **kwargs)
+        time.sleep(0.002)
+        return value
+
+    monkeypatch.setattr(LocMemCache, "get", slow_get)
+
+
+@pytest.mark.django_db
+class TestCallStateConcurrency:
+    N = 40
+
+    async def _hammer(self, fn, calls):
+        await asyncio.gather(*(sync_to_async(fn, thread_sensitive=False)(*args) for args in calls))
+
+    async def test_concurrent_joins_are_all_kept(self, slow_cache):
+        await self._hammer(set_user_state, [(1, uid, f"u{uid}", STATE_CONNECTING) for uid in range(self.N)])
+        assert await sync_to_async(_users)(1) == {uid: STATE_CONNECTING for uid in range(self.N)}
+
+    async def test_concurrent_writes_get_distinct_consecutive_versions(self, slow_cache):
+        deltas = await asyncio.gather(*(
+            sync_to_async(set_user_state, thread_sensitive=False)(1, uid, f"u{uid}", STATE_ACTIVE)
+            for uid in range(self.N)
+        ))
+        first = min(d["version"] for d in deltas)
+        assert sorted(d["version"] for d in deltas) == list(range(first, first + self.N))
+        assert (await sync_to_async(get_room_snapshot)(1))[0] == first + self.N - 1
+
+    async def test_concurrent_joins_updates_and_leaves(self, slow_cache):
+        await self._hammer(set_user_state, [(1, uid, f"u{uid}", STATE_CONNECTING) for uid in range(self.N)])
+        calls = [(set_user_state, (1, uid, f"u{uid}", STATE_ACTIVE)) for uid in range(0, self.N, 2)]
+        calls += [(remove_user, (1, uid)) for uid in range(1, self.N, 2)]
+        await asyncio.gather(*(sync_to_async(fn, thread_sensitive=False)(*args) for fn, args in calls))
+        assert await sync_to_async(_users)(1) == {uid: STATE_ACTIVE for uid in range(0, self.N, 2)}
+
+
+class FakeRedis:
+    """The hash subset of redis-py used by call_state (one client, no real expiry)."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.expires = {}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field.encode()] = value.encode()
+
+    def hdel(self, key, *fields):
+        h = self.hashes.get(key, {})
+        for field in fields:
+            h.pop(field.encode(), None)
+        if not h:
+            self.hashes.pop(key, None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        self.expires[key] = seconds
+
+    def hincrby(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field.encode()] = str(int(h.get(field.encode(), 0)) + amount).encode()
+        return int(h[field.encode()])
+
+    def eval(self, script, numkeys, key, *args):
+        """The call_state scripts, run the way Redis would (atomically)."""
+        if script == call_state._SET_SCRIPT:
+            field, value, ttl, initial_version = args
+            existed = int(field.encode() in self.hashes.get(key, {}))
+            self.hashes.setdefault(key, {}).setdefault(call_state.VERSION_FIELD.encode(), str(initial_version).encode())
+            self.hset(key, field, value)
+            version = self.hincrby(key, call_state.VERSION_FIELD, 1)
+            self.expire(key, int(ttl))
+            return [version, existed]
+        if script == call_state._PRUNE_SCRIPT:
+            now, *fields = args
+            h = self.hashes.get(key, {})
+            expired = [
+                field for field in fields
+                if field.encode() in h and json.loads(h[field.encode()])["expires_at"] < float(now)
+            ]
+            if expired:
+                self.hdel(key, *expired)
+                self.hincrby(key, call_state.VERSION_FIELD, 1)
+            return len(expired)
+        assert script == call_state._REMOVE_SCRIPT
+        (field,) = args
+        if field.encode() not in self.hashes.get(key, {}):
+            return 0
+        self.hdel(key, field)
+        return self.hincrby(key, call_state.VERSION_FIELD, 1)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client, self.calls = client, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@pytest.mark.django_db
+class TestCallStateRedisHashes:
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        client = FakeRedis()
+        monkeypatch.setattr(call_state, "redis_client", lambda cache, key: client)
+        return client
+
+    def test_per_user_fields(self, redis):
+        v = set_user_state(1, 10, "alice", STATE_ACTIVE)["version"]
+        assert set_user_state(1, 11, "bob", STATE_CONNECTING)["added"] == [
+            {"user_id": 11, "username": "bob", "state": STATE_CONNECTING}
+        ]
+        (key,) = redis.hashes
+        assert set(redis.hashes[key]) == {b"10", b"11", b"_v"}
+        assert redis.expires[key] == call_state.CALL_STATE_TTL_SECONDS
+        assert _users(1) == {10: STATE_ACTIVE, 11: STATE_CONNECTING}
+        assert get_room_aggregate_state(1) == STATE_ACTIVE
+
+        assert remove_user(1, 10) == {"version": v + 2, "added": [], "removed": [10], "changed": []}
+        assert remove_user(1, 10) is None
+        remove_user(1, 11)
+        assert set(redis.hashes[key]) == {b"_v"}
+        assert get_rooms_state([1, 2]) == {1: [], 2: []}
+        assert get_room_snapshot(1) == (v + 3, [])
+
+    def test_version_keeps_growing_after_the_hash_expires(self, redis, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        for state in (STATE_CONNECTING, STATE_ACTIVE, STATE_CONNECTING):
+            old = set_user_state(1, 10, "alice", state)["version"]
+        redis.hashes.clear()  # the hash's EXPIRE ran out
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS)
+        assert set_user_state(1, 11, "bob", STATE_CONNECTING)["version"] > old + 1
+
+    def test_expired_fields_are_skipped_and_pruned(self, redis, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        set_user_state(1, 10, "crashed", STATE_ACTIVE)
+        set_user_state(1, 11, "alive", STATE_ACTIVE)
+        monkeypatch.setattr(call_state, "clock", lambda: now + 10)
+        set_user_state(1, 11, "alive", STATE_ACTIVE)
+        monkeypatch.setattr(call_state, "clock", lambda: now + call_state.CALL_STATE_TTL_SECONDS + 1)
+        version, _ = get_room_snapshot(1)
+        assert _users(1) == {11: STATE_ACTIVE}
+        (key,) = redis.hashes
+        assert set(redis.hashes[key]) == {b"11", b"_v"}
+        # Pruning is a change: the next snapshot is a newer version.
+        assert get_room_snapshot(1)[0] == version + 1
+
+    def test_prune_keeps_a_user_who_rejoined_after_the_read(self, redis, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(call_state, "clock", lambda: now)
+        set_user_state(1, 10, "alice", STATE_ACTIVE)
+        later = now + call_state.CALL_STATE_TTL_SECONDS + 1
+        monkeypatch.setattr(call_state, "clock", lambda: later)
+        hgetall = redis.hgetall
+
+        def hgetall_then_rejoin(key):
+            raw = hgetall(key)
+            # alice rejoins between the reader's HGETALL and its prune.
+            redis.eval(call_state._SET_SCRIPT, 1, key, "10", json.dumps(
+                {"state": STATE_CONNECTING, "username": "alice", "expires_at": later + 60}
+            ), call_state.CALL_STATE_TTL_SECONDS, 0)
+            return raw
+
+        monkeypatch.setattr(redis, "hgetall", hgetall_then_rejoin)
+        assert get_room_state(1) == []  # the stale read
+        monkeypatch.setattr(redis, "hgetall", hgetall)
+        assert _users(1) == {10: STATE_CONNECTING}
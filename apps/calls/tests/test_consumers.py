@@ -0,0 +1,287 @@
+import asyncio
+
+import pytest
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from apps.accounts.tests.factories import create_user
+from apps.calls.consumers import SignalingConsumer
+from apps.rooms.models import RoomParticipant
+from apps.rooms.tests.factories import create_room
+
+application = URLRouter([path("ws/call/<int:room_id>/", SignalingConsumer.as_asgi())])
+
+
+def _seed_call():
+    caller = create_user(username="caller")
+    callee = create_user(username="callee")
+    room = create_room(owner=caller, name="R1")
+    RoomParticipant.objects.create(room=room, user=callee)
+    return room, Token.objects.create(user=caller), Token.objects.create(user=callee), callee
+
+
+async def _drain(communicator):
+    frames = []
+    while not await communicator.receive_nothing(timeout=0.1):
+        frames.append(await communicator.receive_json_from())
+    return frames
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSignalingRateLimit:
+    async def test_ice_candidate_flood_is_not_relayed(self, settings):
+        settings.WS_RATE_LIMITS = {"ice_candidate": {"burst": 3, "per_second": 0.1}, "*": {"burst": 5, "per_second": 1}}
+        room, caller_token, callee_token, callee = await sync_to_async(_seed_call)()
+        caller = WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={caller_token.key}")
+        peer = WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={callee_token.key}")
+        assert (await caller.connect())[0]
+        assert (await peer.connect())[0]
+
+        for i in range(5):
+            await caller.send_json_to({
+                "type": "ice_candidate",
+                "data": {"target_user_id": callee.id, "candidate": {"n": i}},
+            })
+        sent = await _drain(caller)
+        received = await _drain(peer)
+        await caller.disconnect()
+        await peer.disconnect()
+
+        errors = [f for f in sent if f.get("code") == "rate_limited"]
+        assert len(errors) == 2
+        assert all(f["message_type"] == "ice_candidate" for f in errors)
+        relayed = [f for f in received if f["type"] == "ice_candidate"]
+        assert [f["data"]["candidate"]["n"] for f in relayed] == [0, 1, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCallStateDeltas:
+    async def test_snapshot_on_connect_then_one_delta_per_change(self):
+        room, caller_token, callee_token, callee = await sync_to_async(_seed_call)()
+        caller = WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={caller_token.key}")
+        assert (await caller.connect())[0]
+        (snapshot,) = await _drain(caller)
+        assert snapshot["type"] == "call_state"
+        version = snapshot["data"]["version"]
+        assert [p["username"] for p in snapshot["data"]["participants"]] == ["caller"]
+
+        peer = WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={callee_token.key}")
+        assert (await peer.connect())[0]
+        peer_frames = await _drain(peer)
+        assert peer_frames[0]["type"] == "call_state"
+        assert peer_frames[0]["data"]["version"] == version + 1
+        await peer.send_json_to({"type": "join_call"})
+        await peer.disconnect()
+
+        frames = await _drain(caller)
+        assert [f["type"] for f in frames] == ["call_state_delta"] * 3
+        deltas = [f["data"] for f in frames]
+        assert [d["version"] for d in deltas] == [version + 1, version + 2, version + 3]
+        assert deltas[0]["added"] == [{"user_id": callee.id, "username": "callee", "state": "connecting"}]
+        assert deltas[1]["changed"] == [{"user_id": callee.id, "username": "callee", "state": "active"}]
+        assert deltas[2]["removed"] == [callee.id]
+
+        await caller.send_json_to({"type": "sync_call_state"})
+        (resync,) = await _drain(caller)
+        assert resync["type"] == "call_state"
+        assert resync["data"]["version"] == version + 3
+        await caller.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSignalingFanOut:
+    """Every peer sends one ICE candidate to every other peer of a mesh call."""
+
+    @pytest.mark.parametrize("n", [4, 8, 16])
+    async def test_relays_are_delivered_once(self, n, monkeypatch, settings):
+        settings.WS_RATE_LIMIT_ENABLED = False
+        def seed():
+            users = [create_user(username=f"p{i}") for i in range(n)]
+            room = create_room(owner=users[0], name="Mesh")
+            RoomParticipant.objects.bulk_create([RoomParticipant(room=room, user=u) for u in users[1:]])
+            return room, users, [Token.objects.create(user=u).key for u in users]
+
+        room, users, tokens = await sync_to_async(seed)()
+        peers = [WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={t}") for t in tokens]
+        for peer in peers:
+            assert (await peer.connect())[0]
+            await peer.send_json_to({"type": "join_call"})
+        for peer in peers:
+            await _drain(peer)
+
+        layer = get_channel_layer()
+        send = layer.send
+        deliveries = []
+
+        async def counting_send(channel, message):
+            if message.get("type") == "signaling_relay":
+                deliveries.append(channel)
+            await send(channel, message)
+
+        monkeypatch.setattr(layer, "send", counting_send)
+        call_group_size = len(layer.groups[f"call_{room.id}"])
+        for sender, peer in zip(users, peers):
+            for target in users:
+                if target != sender:
+                    await peer.send_json_to({
+                        "type": "ice_candidate",
+                        "data": {"target_user_id": target.id, "candidate": {"from": sender.id}},
+                    })
+
+        relays = n * (n - 1)
+        for user, peer in zip(users, peers):
+            frames = [f for f in await _drain(peer) if f["type"] == "ice_candidate"]
+            assert sorted(f["data"]["from_user_id"] for f in frames) == sorted(u.id for u in users if u != user)
+            await peer.disconnect()
+        # Broadcast-and-filter delivered every relay to each socket of the call group:
+        # 48 / 448 / 3840 deliveries at 4 / 8 / 16 peers, now 12 / 56 / 240.
+        broadcast_deliveries = relays * call_group_size
+        assert len(deliveries) == relays
+        assert broadcast_deliveries == n * len(deliveries)
+
+
+def _candidate(n):
+    return {"candidate": f"candidate:{n} 1 udp 2122260223 10.0.0.{n} 5000{n} typ host", "sdpMid": "0"}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestIceBatching:
+    async def _connect(self, settings, caller_batch, callee_batch):
+        settings.SIGNALING_ICE_BATCH_WINDOW_MS = 200
+        room, caller_token, callee_token, callee = await sync_to_async(_seed_call)()
+        caller = WebsocketCommunicator(
+            application, f"/ws/call/{room.id}/?token={caller_token.key}" + ("&ice_batch=1" if caller_batch else "")
+        )
+        peer = WebsocketCommunicator(
+            application, f"/ws/call/{room.id}/?token={callee_token.key}" + ("&ice_batch=1" if callee_batch else "")
+        )
+        assert (await caller.connect())[0]
+        assert (await peer.connect())[0]
+        await _drain(caller)
+        await _drain(peer)
+        return caller, peer, callee
+
+    async def _send(self, caller, callee, message_type, **data):
+        await caller.send_json_to({"type": message_type, "data": {"target_user_id": callee.id, **data}})
+
+    @pytest.mark.parametrize("batch, relays, frames", [(False, 10, 10), (True, 2, 2)])
+    async def test_frames_per_call_setup(self, settings, monkeypatch, batch, relays, frames):
+        """Offer, 8 trickled candidates and end-of-candidates: 10 relays / frames, batched 2."""
+        caller, peer, callee = await self._connect(settings, batch, batch)
+        layer = get_channel_layer()
+        send = layer.send
+        deliveries = []
+
+        async def counting_send(channel, message):
+            if message.get("type") == "signaling_relay":
+                deliveries.append(message["message_type"])
+            await send(channel, message)
+
+        monkeypatch.setattr(layer, "send", counting_send)
+        await self._send(caller, callee, "offer", sdp="v=0")
+        for n in range(8):
+            await self._send(caller, callee, "ice_candidate", candidate=_candidate(n))
+        await self._send(caller, callee, "ice_candidate", candidate=None)
+
+        received = await _drain(peer)
+        assert len(deliveries) == relays
+        assert len(received) == frames
+        candidates = (
+            received[1]["data"]["candidates"] if batch else [f["data"]["candidate"] for f in received[1:]]
+        )
+        assert candidates == [_candidate(n) for n in range(8)] + [None]
+        await caller.disconnect()
+        await peer.disconnect()
+
+    async def test_other_relays_flush_pending_candidates_first(self, settings):
+        caller, peer, callee = await self._connect(settings, True, True)
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(1))
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(2))
+        await self._send(caller, callee, "answer", sdp="v=0")
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(3))
+        await self._send(caller, callee, "ice_candidate", candidate={"candidate": "", "sdpMid": "0"})
+
+        received = await _drain(peer)
+        assert [f["type"] for f in received] == ["ice_candidates", "answer", "ice_candidates"]
+        assert received[0]["data"]["candidates"] == [_candidate(1), _candidate(2)]
+        assert received[0]["data"]["from_user_id"] != callee.id
+        assert received[2]["data"]["candidates"] == [_candidate(3), {"candidate": "", "sdpMid": "0"}]
+        await caller.disconnect()
+        await peer.disconnect()
+
+    async def test_window_and_disconnect_flush(self, settings):
+        caller, peer, callee = await self._connect(settings, True, True)
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(1))
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(2))
+        assert await peer.receive_nothing(timeout=0.05)
+        frame = await peer.receive_json_from(timeout=1)
+        assert frame["type"] == "ice_candidates"
+        assert frame["data"]["candidates"] == [_candidate(1), _candidate(2)]
+
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(3))
+        await caller.disconnect()
+        received = await _drain(peer)
+        assert [f["data"]["candidates"] for f in received if f["type"] == "ice_candidates"] == [[_candidate(3)]]
+        await peer.disconnect()
+
+    async def test_receiver_without_opt_in_gets_single_candidates(self, settings):
+        caller, peer, callee = await self._connect(settings, True, False)
+        for n in range(3):
+            await self._send(caller, callee, "ice_candidate", candidate=_candidate(n))
+        await self._send(caller, callee, "ice_candidate", candidate=None)
+
+        received = await _drain(peer)
+        assert [f["type"] for f in received] == ["ice_candidate"] * 4
+        assert [f["data"]["candidate"] for f in received] == [_candidate(n) for n in range(3)] + [None]
+        await caller.disconnect()
+        await peer.disconnect()
+
+    async def test_timer_flush_and_relay_keep_order(self, settings, monkeypatch):
+        caller, peer, callee = await self._connect(settings, True, True)
+        layer = get_channel_layer()
+        group_send = layer.group_send
+
+        async def slow_batch_send(group, message):
+            if message.get("message_type") == "ice_candidates":
+                await asyncio.sleep(0.3)
+            await group_send(group, message)
+
+        monkeypatch.setattr(layer, "group_send", slow_batch_send)
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(1))
+        await asyncio.sleep(0.25)  # the window timer is now inside its (slow) send
+        await self._send(caller, callee, "answer", sdp="v=0")
+
+        received = [await peer.receive_json_from(timeout=1) for _ in range(2)]
+        assert [f["type"] for f in received] == ["ice_candidates", "answer"]
+        assert received[0]["data"]["candidates"] == [_candidate(1)]
+        await caller.disconnect()
+        await peer.disconnect()
+
+    @pytest.mark.parametrize("callee_batch", [True, False])
+    async def test_other_fields_are_kept(self, settings, callee_batch):
+        caller, peer, callee = await self._connect(settings, True, callee_batch)
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(1), stream="camera")
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(2), stream="camera")
+        await self._send(caller, callee, "ice_candidate", candidate=_candidate(3), stream="screen")
+        await self._send(caller, callee, "ice_candidate", candidate=None, stream="screen")
+
+        received = await _drain(peer)
+        if callee_batch:
+            assert [(f["type"], f["data"]["stream"], f["data"]["candidates"]) for f in received] == [
+                ("ice_candidates", "camera", [_candidate(1), _candidate(2)]),
+                ("ice_candidates", "screen", [_candidate(3), None]),
+            ]
+        else:
+            assert [(f["type"], f["data"]["stream"], f["data"]["candidate"]) for f in received] == [
+                ("ice_candidate", "camera", _candidate(1)),
+                ("ice_candidate", "camera", _candidate(2)),
+                ("ice_candidate", "screen", _candidate(3)),
+                ("ice_candidate", "screen", None),
+            ]
+            assert all(f["data"]["target_user_id"] == callee.id for f in received)
+        await caller.disconnect()
+        await peer.disconnect()
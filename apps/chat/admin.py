@@ -1,13 +1,12 @@
 from django.contrib import admin
 
-from .models import Message, MessageAttachment
+from .models import ArchivedMessage, Message, MessageAttachment
 
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ("id", "room", "author", "content_preview", "created_at")
     list_filter = ("room", "created_at")
-    raw_id_fields = ("read_by", )
 
     def content_preview(self, obj):
         return (obj.content or "")[:50] + "..." if len(obj.content or "") > 50 else (obj.content or "")
@@ -18,3 +17,9 @@ class MessageAdmin(admin.ModelAdmin):
 @admin.register(MessageAttachment)
 class MessageAttachmentAdmin(admin.ModelAdmin):
     list_display = ("message", "file", "created_at")
+
+
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "room", "author", "created_at", "archived_at")
+    raw_id_fields = ("room", "author")
@@ -0,0 +1,67 @@
+"""
+Cold-history archival.
+
+Messages older than CHAT_ARCHIVE_AFTER_DAYS are moved from chat_message into the compact
+ArchivedMessage / ArchivedAttachment tables (no updated_at, no search index rows), in
+small id-ordered batches with one short transaction each, so writers are never blocked
+for long (SQLite takes a database-wide write lock). Every archived row is older than
+every hot row, so history keyset pagination reads [hot, archive] as two tiers of one
+timeline (see core.pagination.KeysetPagination.paginate_tiers).
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .models import ArchivedAttachment, ArchivedMessage, Message, MessageAttachment
+
+
+def archive_cutoff(days: int | None = None):
+    if days is None:
+        days = getattr(settings, "CHAT_ARCHIVE_AFTER_DAYS", 180)
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size: int = 500) -> int:
+    """Move up to batch_size messages created before cutoff into the archive. Returns how many."""
+    with transaction.atomic():
+        messages = list(
+            Message.objects.filter(created_at__lt=cutoff)
+            .order_by("id")
+            .only("id", "room_id", "author_id", "content", "seq", "created_at")[:batch_size]
+        )
+        if not messages:
+            return 0
+        ids = [m.id for m in messages]
+        attachments = list(
+            MessageAttachment.objects.filter(message_id__in=ids).values_list("id", "message_id", "file_id")
+        )
+        ArchivedMessage.objects.bulk_create(
+            [
+                ArchivedMessage(
+                    id=m.id,
+                    room_id=m.room_id,
+                    author_id=m.author_id,
+                    content=m.content,
+                    seq=m.seq,
+                    created_at=m.created_at,
+                )
+                for m in messages
+            ],
+            ignore_conflicts=True,
+        )
+        ArchivedAttachment.objects.bulk_create(
+            [
+                ArchivedAttachment(id=att_id, message_id=message_id, file_id=file_id)
+                for att_id, message_id, file_id in attachments
+            ],
+            ignore_conflicts=True,
+        )
+        search.remove_messages(ids)
+        Message.objects.filter(id__in=ids).delete()
+    return len(messages)
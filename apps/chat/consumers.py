@@ -1,11 +1,16 @@
+from urllib.parse import parse_qs
+
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 
+from core import ratelimit
 from core.ws_auth import get_user_from_scope
 from apps.rooms.models import Room
 from apps.rooms.services import RoomService
 
 from .services import MessageService
+from .write_behind import get_write_behind
 
 
 @database_sync_to_async
@@ -29,16 +34,17 @@ def save_and_broadcast_message(room, user, content, attachment_ids):
         content=content or "",
         attachment_file_ids=attachment_ids or [],
     )
-    from .serializers import MessageSerializer
-    return MessageSerializer(message).data
+    from .message_cache import render_messages
+    # A message that was just created cannot be under anyone's read cursor yet.
+    return render_messages([message], {})[0]
 
 
 @database_sync_to_async
 def mark_message_as_read(message_id, user):
     try:
         from .models import Message
-        message = Message.objects.get(pk=message_id)
-        message.read_by.add(user)
+        message = Message.objects.select_related("room").get(pk=message_id)
+        MessageService.mark_read(message.room, user, up_to_message_id=message.id)
         return True
     except Exception:
         return False
@@ -46,20 +52,50 @@ def mark_message_as_read(message_id, user):
 
 @database_sync_to_async
 def mark_room_messages_as_read(room, user):
-    """Mark all messages in a room as read by the user, except their own."""
+    """
+    Move the user's read cursor to the latest message.
+    Returns (previous, current, count) where (previous, current] is the newly read
+    id range and count is how many of those messages came from others; None if
+    nothing changed.
+    """
     from .models import Message
-    unread_messages = Message.objects.filter(room=room).exclude(author=user).exclude(read_by=user)
-    if unread_messages.exists():
-        # Bulk add user to read_by of all unread messages
-        # Using .through model to bulk_create relationships
-        MessageReadBy = Message.read_by.through
-        links = [
-            MessageReadBy(message_id=m_id, user_id=user.id)
-            for m_id in unread_messages.values_list('id', flat=True)
-        ]
-        MessageReadBy.objects.bulk_create(links, ignore_conflicts=True)
-        return list(unread_messages.values_list('id', flat=True))
-    return []
+    previous, current = MessageService.mark_read(room, user)
+    if current <= previous:
+        return None
+    count = (
+        Message.objects.filter(room=room, id__gt=previous, id__lte=current)
+        .exclude(author=user)
+        .count()
+    )
+    return previous, current, count
+
+
+@database_sync_to_async
+def load_missed_messages(room_id, since_seq):
+    """
+    Everything a client resuming from since_seq has missed.
+    Returns (last_seq, payloads, read_cursors); payloads is None if the gap is too
+    large to replay over the socket.
+    """
+    from .message_cache import render_messages
+    last_seq, messages = MessageService.messages_since(
+        room_id, since_seq, settings.CHAT_RESUME_MAX_MESSAGES
+    )
+    if messages is None:
+        return last_seq, None, None
+    cursors = MessageService.read_cursors(room_id)
+    return last_seq, render_messages(messages, cursors), cursors
+
+
+def parse_since_seq(scope):
+    """since_seq from the query string, or None if absent or not a non-negative integer."""
+    query = parse_qs(scope.get("query_string", b"").decode())
+    value = query.get("since_seq", [None])[0]
+    try:
+        since_seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return since_seq if since_seq >= 0 else None
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -98,6 +134,38 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         await self.accept()
         print(f"WebSocket connected for user {self.user} in room {self.room_id}")
 
+        since_seq = parse_since_seq(self.scope)
+        if since_seq is not None:
+            await self.resume(since_seq)
+
+    async def resume(self, since_seq):
+        """
+        Replay what a reconnecting client missed after since_seq: the messages (with
+        current read_by_ids), then one read_state snapshot of every read cursor.
+        Runs after group_add, so a message broadcast meanwhile may arrive twice;
+        clients de-duplicate by id.
+        """
+        last_seq, payloads, cursors = await load_missed_messages(self.room_id, since_seq)
+        if payloads is None:
+            await self.send_json({
+                "type": "resync_required",
+                "data": {"since_seq": since_seq, "last_seq": last_seq},
+            })
+            return
+        for payload in payloads:
+            await self.send_json({"type": "chat_message", "data": payload})
+        await self.send_json({
+            "type": "read_state",
+            "data": {
+                "room_id": int(self.room_id),
+                "read_cursors": {str(uid): last_read for uid, last_read in cursors.items()},
+            },
+        })
+        await self.send_json({
+            "type": "resume_complete",
+            "data": {"since_seq": since_seq, "last_seq": last_seq, "count": len(payloads)},
+        })
+
     async def disconnect(self, close_code):
         if hasattr(self, "room_group_name"):
             await self.channel_layer.group_discard(
@@ -108,19 +176,36 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
     async def receive_json(self, content):
         print(f"Received WebSocket message: {content}")
         msg_type = content.get("type")
+
+        retry_after = await ratelimit.ahit(self.user.id, msg_type)
+        if retry_after:
+            data = content.get("data")
+            client_id = data.get("client_id") if isinstance(data, dict) else None
+            await self.send_json(ratelimit.rate_limited_error(msg_type, retry_after, client_id=client_id))
+            return
         
         if msg_type == "chat_message":
             data = content.get("data", {})
             content_text = data.get("content", "")
             attachment_ids = data.get("attachment_ids", [])
+            client_id = data.get("client_id")
             print(f"Processing message from {self.user}: {content_text}")
             try:
-                payload = await save_and_broadcast_message(
-                    self.room,
-                    self.user,
-                    content_text,
-                    attachment_ids,
-                )
+                if settings.CHAT_WRITE_BEHIND:
+                    # Batched insert; resolves only after the row is committed.
+                    payload = await get_write_behind().submit(
+                        self.room,
+                        self.user,
+                        content_text,
+                        attachment_ids,
+                    )
+                else:
+                    payload = await save_and_broadcast_message(
+                        self.room,
+                        self.user,
+                        content_text,
+                        attachment_ids,
+                    )
                 print(f"Message saved: {payload['id']}")
                 await self.channel_layer.group_send(
                     self.room_group_name,
@@ -129,9 +214,13 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                         "payload": payload,
                     },
                 )
+                await self.send_json({
+                    "type": "chat_message_ack",
+                    "data": {"client_id": client_id, "id": payload["id"]},
+                })
             except Exception as e:
                 print(f"Error saving message: {e}")
-                await self.send_json({"type": "error", "detail": str(e)})
+                await self.send_json({"type": "error", "detail": str(e), "client_id": client_id})
 
         elif msg_type == "message_read":
             message_id = content.get("data", {}).get("message_id")
@@ -150,20 +239,23 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                     )
 
         elif msg_type == "mark_room_as_read":
-            read_message_ids = await mark_room_messages_as_read(self.room, self.user)
-            if read_message_ids:
-                # Broadcast that messages were read to update UI (checkmark)
-                for m_id in read_message_ids:
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            "type": "chat_message_read_broadcast",
-                            "data": {
-                                "message_id": m_id,
-                                "user_id": self.user.id,
-                            },
+            read_range = await mark_room_messages_as_read(self.room, self.user)
+            if read_range:
+                previous, current, count = read_range
+                # One event for the whole range instead of one per message.
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    {
+                        "type": "chat_messages_read_broadcast",
+                        "data": {
+                            "room_id": int(self.room_id),
+                            "user_id": self.user.id,
+                            "from_message_id": previous,
+                            "last_read_message_id": current,
+                            "count": count,
                         },
-                    )
+                    },
+                )
 
         else:
             print(f"Unknown message type: {msg_type}")
@@ -181,3 +273,10 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             "type": "message_read",
             "data": event["data"],
         })
+
+    async def chat_messages_read_broadcast(self, event):
+        """Read watermark: every message with from_message_id < id <= last_read_message_id is read by user_id."""
+        await self.send_json({
+            "type": "messages_read",
+            "data": event["data"],
+        })
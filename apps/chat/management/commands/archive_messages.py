@@ -0,0 +1,39 @@
+"""
+Move chat messages older than CHAT_ARCHIVE_AFTER_DAYS into the archive tier.
+
+Runs in small batches, each in its own short transaction, pausing between batches so
+concurrent writers (and SQLite's single write lock) are not starved. Safe to interrupt
+and re-run. Usage:
+
+    python manage.py archive_messages --older-than-days 180 --batch-size 500 --pause 0.05
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.chat.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = "Archive old chat messages in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches.")
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["older_than_days"])
+        total = 0
+        batches = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            moved = archive_batch(cutoff, options["batch_size"])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(f"Archived {total} messages created before {cutoff.isoformat()} in {batches} batches.")
@@ -0,0 +1,64 @@
+"""
+Compare chat message persistence throughput: one thread hop per message (current
+ChatConsumer path) vs. the write-behind batcher. Creates a throwaway user and room
+and deletes them afterwards. Usage:
+
+    python manage.py bench_chat_write_behind --messages 2000 --senders 50
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from apps.chat.consumers import save_and_broadcast_message
+from apps.chat.write_behind import MessageWriteBehind
+from apps.rooms.models import Room, RoomParticipant
+
+
+class Command(BaseCommand):
+    help = "Measure messages/s for per-message saves vs. write-behind batching."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument("--senders", type=int, default=50, help="Concurrent senders (sockets).")
+        parser.add_argument("--flush-ms", type=float, default=5)
+        parser.add_argument("--max-batch", type=int, default=100)
+
+    def handle(self, *args, **options):
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_user(username="__bench_write_behind__", password="x")
+        room = Room.objects.create(owner=user, name="bench")
+        RoomParticipant.objects.create(room=room, user=user)
+        try:
+            direct = asyncio.run(self._run(room, user, options, batcher=None))
+            batcher = MessageWriteBehind(options["flush_ms"] / 1000, options["max_batch"])
+            batched = asyncio.run(self._run(room, user, options, batcher=batcher))
+        finally:
+            room.delete()
+            user.delete()
+
+        n = options["messages"]
+        self.stdout.write(f"{'path':<14} {'seconds':>8} {'msg/s':>9}")
+        self.stdout.write(f"{'per-message':<14} {direct:>8.2f} {n / direct:>9.0f}")
+        self.stdout.write(
+            f"{'write-behind':<14} {batched:>8.2f} {n / batched:>9.0f}"
+            f"   ({batcher.flushes} flushes, avg batch {n / max(batcher.flushes, 1):.1f})"
+        )
+
+    async def _run(self, room, user, options, batcher) -> float:
+        per_sender = options["messages"] // options["senders"]
+
+        async def sender(i):
+            for j in range(per_sender):
+                if batcher is None:
+                    await save_and_broadcast_message(room, user, f"{i}:{j}", [])
+                else:
+                    await batcher.submit(room, user, f"{i}:{j}")
+
+        await sync_to_async(lambda: None)()  # warm up the DB thread
+        start = time.perf_counter()
+        await asyncio.gather(*(sender(i) for i in range(options["senders"])))
+        return time.perf_counter() - start
@@ -0,0 +1,98 @@
+"""
+Benchmark room history paging: page-number (COUNT + OFFSET) vs keyset cursor.
+
+Seeds one throwaway room with N messages per size, times the first page and a
+page half-way back in history through MessageListCreateView, then rolls everything
+back. Usage:
+
+    python manage.py bench_message_history --sizes 10000 100000 1000000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.chat.models import Message
+from apps.chat.views import MessageListCreateView
+from apps.rooms.models import Room, RoomParticipant
+from core.pagination import encode_cursor
+
+
+class _RollbackError(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure message history page latency at several room sizes (data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        from django.contrib.auth import get_user_model
+
+        self.factory = APIRequestFactory()
+        self.view = MessageListCreateView.as_view()
+        self.page_size = options["page_size"]
+        self.repeat = options["repeat"]
+
+        self.stdout.write(
+            f"{'messages':>10} | {'page: first':>12} {'page: middle':>13} | "
+            f"{'cursor: first':>14} {'cursor: middle':>15}  (ms, best of {self.repeat})"
+        )
+        try:
+            with transaction.atomic():
+                self.user = get_user_model().objects.create_user(username="__bench_history__", password="x")
+                room = Room.objects.create(owner=self.user, name="bench")
+                RoomParticipant.objects.create(room=room, user=self.user)
+                seeded = 0
+                for size in sorted(options["sizes"]):
+                    while seeded < size:
+                        n = min(options["batch"], size - seeded)
+                        Message.objects.bulk_create(
+                            Message(room=room, author=self.user, content=f"m{seeded + i}")
+                            for i in range(n)
+                        )
+                        seeded += n
+                    self._report(room, size)
+                raise _RollbackError
+        except _RollbackError:
+            pass
+
+    def _report(self, room, size):
+        middle = (
+            Message.objects.filter(room=room)
+            .order_by("-created_at", "-id")
+            .only("id", "created_at")[size // 2]
+        )
+        middle_page = max(1, (size // 2) // self.page_size)
+        cursor = encode_cursor(middle.created_at, middle.pk)
+        timings = [
+            self._time(room, {"page_size": self.page_size}),
+            self._time(room, {"page_size": self.page_size, "page": middle_page}),
+            self._time(room, {"page_size": self.page_size, "pagination": "cursor"}),
+            self._time(room, {"page_size": self.page_size, "before": cursor}),
+        ]
+        self.stdout.write(
+            f"{size:>10} | {timings[0]:>12.2f} {timings[1]:>13.2f} | "
+            f"{timings[2]:>14.2f} {timings[3]:>15.2f}"
+        )
+
+    def _time(self, room, params) -> float:
+        best = None
+        for _ in range(self.repeat):
+            request = self.factory.get(f"/api/chat/{room.pk}/messages/", params)
+            force_authenticate(request, user=self.user)
+            start = time.perf_counter()
+            response = self.view(request, room_id=room.pk)
+            response.render()
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"{params} -> {response.status_code}")
+            best = elapsed if best is None else min(best, elapsed)
+        return best
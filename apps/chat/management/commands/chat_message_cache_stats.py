@@ -0,0 +1,20 @@
+"""Print hit/miss counters of the serialized message cache (all processes sharing the cache)."""
+
+from django.core.management.base import BaseCommand
+
+from apps.chat import message_cache
+
+
+class Command(BaseCommand):
+    help = "Show serialized message cache hit/miss counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing.")
+
+    def handle(self, *args, **options):
+        stats = message_cache.shared_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}"
+        )
+        if options["reset"]:
+            message_cache.reset_stats()
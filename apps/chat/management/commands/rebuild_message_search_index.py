@@ -0,0 +1,41 @@
+"""Backfill (or with --rebuild, recreate) the message full-text index in id-ordered batches."""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.chat import search
+from apps.chat.models import Message
+
+
+class Command(BaseCommand):
+    help = "Index existing chat messages for full-text search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Clear the index first.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search.backend() == "scan":
+            self.stdout.write("Database has no full-text index backend; nothing to do.")
+            return
+        if options["rebuild"]:
+            search.clear_index()
+
+        batch_size = options["batch_size"]
+        last_id = 0
+        indexed = 0
+        while True:
+            batch = list(
+                Message.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", "room_id", "content")[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                present = search.indexed_ids_after(last_id, batch[-1].id - last_id)
+                missing = [m for m in batch if m.id not in present]
+                search.index_messages(missing)
+            indexed += len(missing)
+            last_id = batch[-1].id
+        self.stdout.write(f"Indexed {indexed} messages ({search.backend()}).")
@@ -0,0 +1,124 @@
+"""
+Shared cache of serialized chat messages, used by REST history and ChatConsumer.
+
+Key: chat:msg:v{payload}:{id}:{message version}.{author profile version}, versions being
+the updated_at timestamps, so an edited message, a changed attachment (bumps the message,
+see signals.py) or an updated author profile simply misses and re-renders. Read state
+is not part of the cached body: read_by_ids is laid over from the room's read cursors
+per request, so read receipts never invalidate anything.
+
+Cached bodies are rendered without a request (relative media URLs, as on the
+WebSocket); render_messages makes them absolute for REST callers.
+
+Hit/miss counters are kept per process (stats()) and mirrored into the cache under
+chat:msg:stats:* so `manage.py chat_message_cache_stats` can report them across workers.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+
+from .serializers import MessageSerializer, read_by_ids
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "chat:msg:"
+# Bump when MessageSerializer's output shape changes so stale bodies are never served.
+PAYLOAD_VERSION = 2
+STATS_KEYS = {"hits": f"{KEY_PREFIX}stats:hits", "misses": f"{KEY_PREFIX}stats:misses"}
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def _cache():
+    return caches[getattr(settings, "CHAT_MESSAGE_CACHE_ALIAS", "default")]
+
+
+def _version(value) -> int:
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def cache_key(message) -> str:
+    profile = getattr(message.author, "profile", None)
+    author_version = _version(profile.updated_at) if profile is not None else 0
+    return f"{KEY_PREFIX}v{PAYLOAD_VERSION}:{message.pk}:{_version(message.updated_at)}.{author_version}"
+
+
+def _absolutize(payload: dict, request) -> dict:
+    def absolute(url):
+        return request.build_absolute_uri(url) if url and url.startswith("/") else url
+
+    payload["author"] = dict(payload["author"], avatar_url=absolute(payload["author"]["avatar_url"]))
+    payload["attachments"] = [
+        dict(att, file=dict(att["file"], file=absolute(att["file"]["file"])))
+        for att in payload["attachments"]
+    ]
+    return payload
+
+
+def _record(hits: int, misses: int) -> None:
+    _stats["hits"] += hits
+    _stats["misses"] += misses
+    cache = _cache()
+    for name, n in (("hits", hits), ("misses", misses)):
+        if not n:
+            continue
+        try:
+            cache.incr(STATS_KEYS[name], n)
+        except ValueError:
+            cache.add(STATS_KEYS[name], n, timeout=None)
+
+
+def stats() -> dict:
+    """Hit/miss counters of this process."""
+    total = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": _stats["hits"] / total if total else 0.0}
+
+
+def shared_stats() -> dict:
+    """Hit/miss counters summed over every process sharing the cache."""
+    values = _cache().get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS["hits"], 0)
+    misses = values.get(STATS_KEYS["misses"], 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def reset_stats() -> None:
+    _stats.update(hits=0, misses=0)
+    _cache().delete_many(STATS_KEYS.values())
+
+
+def render_messages(messages, read_cursors: dict[int, int], request=None) -> list[dict]:
+    """
+    Serialize messages through the cache: one get_many for the page, one set_many
+    for whatever missed. read_cursors is MessageService.read_cursors(room_id)
+    ({} for messages that were just created).
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    cache = _cache()
+    keys = {m.pk: cache_key(m) for m in messages}
+    bodies = cache.get_many(keys.values())
+    missing = [m for m in messages if keys[m.pk] not in bodies]
+    if missing:
+        prefetch_related_objects(missing, "attachments__file")
+        fresh = {}
+        for message, data in zip(missing, MessageSerializer(missing, many=True, context={"read_cursors": {}}).data):
+            body = dict(data)
+            body.pop("read_by_ids", None)
+            fresh[keys[message.pk]] = body
+        cache.set_many(fresh, timeout=getattr(settings, "CHAT_MESSAGE_CACHE_TTL", 3600))
+        bodies.update(fresh)
+    _record(hits=len(messages) - len(missing), misses=len(missing))
+
+    result = []
+    for m in messages:
+        payload = dict(bodies[keys[m.pk]], read_by_ids=read_by_ids(m.pk, m.author_id, read_cursors))
+        result.append(_absolutize(payload, request) if request is not None else payload)
+    return result
@@ -0,0 +1,68 @@
+"""
+Collapse Message.read_by rows into RoomParticipant.last_read_message_id.
+
+Each (room, user) pair gets the highest message id the user had read in that room,
+then the M2M table is dropped. Reversing re-expands the cursor into read_by rows.
+"""
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 5000
+
+
+def collapse_read_by(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    RoomParticipant = apps.get_model("rooms", "RoomParticipant")
+    read_by = Message.read_by.through
+
+    cursors = (
+        read_by.objects.values("message__room_id", "user_id")
+        .annotate(last_read=Max("message_id"))
+        .order_by()
+    )
+    for row in cursors.iterator(chunk_size=BATCH_SIZE):
+        RoomParticipant.objects.filter(
+            room_id=row["message__room_id"],
+            user_id=row["user_id"],
+            last_read_message_id__lt=row["last_read"],
+        ).update(last_read_message_id=row["last_read"])
+
+
+def expand_read_cursor(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    RoomParticipant = apps.get_model("rooms", "RoomParticipant")
+    read_by = Message.read_by.through
+
+    participants = RoomParticipant.objects.filter(last_read_message_id__gt=0)
+    for p in participants.iterator(chunk_size=BATCH_SIZE):
+        ids = (
+            Message.objects.filter(room_id=p.room_id, id__lte=p.last_read_message_id)
+            .exclude(author_id=p.user_id)
+            .values_list("id", flat=True)
+        )
+        batch = []
+        for message_id in ids.iterator(chunk_size=BATCH_SIZE):
+            batch.append(read_by(message_id=message_id, user_id=p.user_id))
+            if len(batch) >= BATCH_SIZE:
+                read_by.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        read_by.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_message_room_created_index"),
+        ("rooms", "0005_roomparticipant_last_read_message_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(collapse_read_by, expand_read_cursor),
+        migrations.RemoveField(
+            model_name="message",
+            name="read_by",
+        ),
+    ]
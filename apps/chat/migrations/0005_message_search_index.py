@@ -0,0 +1,54 @@
+"""
+Full-text index tables for message search (see apps/chat/search.py).
+
+SQLite gets an FTS5 virtual table, PostgreSQL a tsvector table with a GIN index.
+Existing messages are not indexed here: run `manage.py rebuild_message_search_index`.
+"""
+
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_message_fts USING fts5("
+    "content, room_id UNINDEXED, message_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+)
+SQLITE_DROP = "DROP TABLE IF EXISTS chat_message_fts"
+
+POSTGRES_CREATE = [
+    "CREATE TABLE IF NOT EXISTS chat_message_search ("
+    "message_id bigint PRIMARY KEY REFERENCES chat_message (id) ON DELETE CASCADE "
+    "DEFERRABLE INITIALLY DEFERRED, "
+    "room_id bigint NOT NULL, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS chat_message_search_document_gin "
+    "ON chat_message_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS chat_message_search_room_id ON chat_message_search (room_id)",
+]
+POSTGRES_DROP = "DROP TABLE IF EXISTS chat_message_search"
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(SQLITE_CREATE)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_CREATE:
+            schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(SQLITE_DROP)
+    elif vendor == "postgresql":
+        schema_editor.execute(POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_collapse_read_by_into_read_cursor"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,64 @@
+"""
+Number messages per room (Message.seq) and record the last number on Room.message_seq.
+
+Existing messages are numbered 1..n within their room in (created_at, id) order,
+archived ones first (they are all older than the hot table), after which (room, seq)
+is made unique on the hot table.
+"""
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def _number(model, room_id, seq):
+    rows = model.objects.filter(room_id=room_id).order_by("created_at", "id").only("id")
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        seq += 1
+        row.seq = seq
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, ["seq"])
+            batch = []
+    model.objects.bulk_update(batch, ["seq"])
+    return seq
+
+
+def number_messages(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    ArchivedMessage = apps.get_model("chat", "ArchivedMessage")
+    Room = apps.get_model("rooms", "Room")
+
+    room_ids = set(Message.objects.values_list("room_id", flat=True).distinct().order_by())
+    room_ids |= set(ArchivedMessage.objects.values_list("room_id", flat=True).distinct().order_by())
+    for room_id in sorted(room_ids):
+        seq = _number(ArchivedMessage, room_id, 0)
+        seq = _number(Message, room_id, seq)
+        Room.objects.filter(pk=room_id).update(message_seq=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0006_archived_message"),
+        ("rooms", "0006_room_message_seq"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="seq",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="archivedmessage",
+            name="seq",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(number_messages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(fields=("room", "seq"), name="chat_msg_room_seq_uniq"),
+        ),
+    ]
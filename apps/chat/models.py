@@ -20,14 +20,24 @@ class Message(TimestampedModel):
         related_name="messages",
     )
     content = models.TextField(blank=True)
-    read_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name="read_messages",
-        blank=True,
-    )
+    # Per-room, gap-free sequence number (1, 2, ...) used to resume a chat socket.
+    # Assigned by MessageService; NULL for rows created directly through the ORM.
+    seq = models.BigIntegerField(null=True, blank=True)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Matches Meta.ordering scoped by room: backs history keyset pagination.
+            models.Index(
+                fields=["room", "-created_at", "-id"],
+                name="chat_msg_room_created_id",
+            ),
+            # Unread counts: messages of a room above a read cursor (room_id = ? AND id > ?).
+            models.Index(fields=["room", "id"], name="chat_msg_room_id"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["room", "seq"], name="chat_msg_room_seq_uniq"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.author} in {self.room}: {self.content[:50]}"
@@ -49,3 +59,57 @@ class MessageAttachment(TimestampedModel):
 
     def __str__(self) -> str:
         return f"{self.file.name} on {self.message_id}"
+
+
+class ArchivedMessage(models.Model):
+    """
+    Cold-tier copy of a Message older than CHAT_ARCHIVE_AFTER_DAYS (see archive.py).
+    Keeps the original id so history cursors stay valid across tiers.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="archived_messages",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_messages",
+    )
+    content = models.TextField(blank=True)
+    seq = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["room", "-created_at", "-id"],
+                name="chat_arch_room_created_id",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.author} in {self.room} (archived): {self.content[:50]}"
+
+
+class ArchivedAttachment(models.Model):
+    """File attached to an archived message; keeps the original attachment id."""
+
+    id = models.BigIntegerField(primary_key=True)
+    message = models.ForeignKey(
+        ArchivedMessage,
+        on_delete=models.CASCADE,
+        related_name="attachments",
+    )
+    file = models.ForeignKey(
+        File,
+        on_delete=models.CASCADE,
+        related_name="archived_attachments",
+    )
+
+    def __str__(self) -> str:
+        return f"{self.file.name} on {self.message_id} (archived)"
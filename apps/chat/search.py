@@ -0,0 +1,117 @@
+"""
+Full-text index over chat messages.
+
+- SQLite (low_memory profile): FTS5 virtual table chat_message_fts(content, room_id, message_id).
+- PostgreSQL (production): table chat_message_search(message_id, room_id, document tsvector)
+  with a GIN index on document.
+- Any other backend: falls back to an unindexed icontains scan.
+
+Tables are created by migration chat 0005. Rows are written by MessageService when
+messages are inserted; `manage.py rebuild_message_search_index` backfills or rebuilds.
+Search results are always re-joined with chat_message scoped to the room, so rows left
+behind by deleted messages never surface.
+"""
+
+from __future__ import annotations
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = "chat_message_fts"
+POSTGRES_TABLE = "chat_message_search"
+POSTGRES_CONFIG = "simple"
+
+
+def backend() -> str:
+    return {"sqlite": "fts5", "postgresql": "tsvector"}.get(connection.vendor, "scan")
+
+
+def fts5_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    terms = ['"' + t.replace('"', '""') + '"' for t in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def index_messages(messages) -> None:
+    """Add messages to the search index (call inside the transaction that inserts them)."""
+    rows = [(m.pk, m.room_id, m.content) for m in messages if m.content]
+    if not rows:
+        return
+    kind = backend()
+    with connection.cursor() as cursor:
+        if kind == "fts5":
+            # rowid mirrors message_id so lookups and deletes by id are rowid seeks.
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, message_id, room_id, content) "
+                "VALUES (%s, %s, %s, %s)",
+                [(pk, pk, room_id, content) for pk, room_id, content in rows],
+            )
+        elif kind == "tsvector":
+            cursor.executemany(
+                f"INSERT INTO {POSTGRES_TABLE} (message_id, room_id, document) "
+                f"VALUES (%s, %s, to_tsvector('{POSTGRES_CONFIG}', %s)) "
+                "ON CONFLICT (message_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def remove_messages(message_ids) -> None:
+    ids = list(message_ids)
+    if not ids:
+        return
+    kind = backend()
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        if kind == "fts5":
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})", ids)
+        elif kind == "tsvector":
+            cursor.execute(f"DELETE FROM {POSTGRES_TABLE} WHERE message_id IN ({placeholders})", ids)
+
+
+def clear_index() -> None:
+    kind = backend()
+    with connection.cursor() as cursor:
+        if kind == "fts5":
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+        elif kind == "tsvector":
+            cursor.execute(f"TRUNCATE {POSTGRES_TABLE}")
+
+
+def indexed_ids_after(last_id: int, limit: int) -> set[int]:
+    """Message ids already present in the index within (last_id, last_id + limit]."""
+    kind = backend()
+    if kind == "scan":
+        return set()
+    table, key = (SQLITE_TABLE, "rowid") if kind == "fts5" else (POSTGRES_TABLE, "message_id")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {key} FROM {table} WHERE {key} > %s AND {key} <= %s",
+            [last_id, last_id + limit],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def filter_messages(queryset, room_id: int, q: str):
+    """Restrict a Message queryset (already scoped to room_id) to messages matching q."""
+    kind = backend()
+    if kind == "fts5":
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {SQLITE_TABLE} "
+                f"WHERE {SQLITE_TABLE} MATCH %s AND room_id = %s",
+                (fts5_query(q), room_id),
+            )
+        )
+    if kind == "tsvector":
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT message_id FROM {POSTGRES_TABLE} "
+                f"WHERE room_id = %s AND document @@ plainto_tsquery('{POSTGRES_CONFIG}', %s)",
+                (room_id, q),
+            )
+        )
+    for term in q.split():
+        queryset = queryset.filter(content__icontains=term)
+    return queryset
@@ -3,7 +3,16 @@ from rest_framework import serializers
 from apps.accounts.serializers import UserSerializer
 from apps.files.serializers import FileSerializer
 
-from .models import Message, MessageAttachment
+from .models import ArchivedAttachment, ArchivedMessage, Message, MessageAttachment
+
+
+def read_by_ids(message_id: int, author_id: int, cursors: dict[int, int]) -> list[int]:
+    """Users (author excluded) whose read cursor has reached message_id."""
+    return [
+        user_id
+        for user_id, last_read in cursors.items()
+        if last_read >= message_id and user_id != author_id
+    ]
 
 
 class MessageAttachmentSerializer(serializers.ModelSerializer):
@@ -21,15 +30,14 @@ class MessageSerializer(serializers.ModelSerializer):
 
     author = UserSerializer(read_only=True)
     attachments = MessageAttachmentSerializer(many=True, read_only=True)
-    read_by_ids = serializers.PrimaryKeyRelatedField(
-        source="read_by", many=True, read_only=True
-    )
+    read_by_ids = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
         fields = (
             "id",
             "room",
+            "seq",
             "author",
             "content",
             "attachments",
@@ -37,6 +45,42 @@ class MessageSerializer(serializers.ModelSerializer):
             "read_by_ids",
         )
 
+    def get_read_by_ids(self, obj: Message) -> list[int]:
+        """
+        Participants whose read cursor has reached this message (author excluded).
+        Pass context["read_cursors"] (see MessageService.read_cursors) when
+        serializing many messages of one room to avoid a query per message.
+        """
+        cursors = self.context.get("read_cursors")
+        if cursors is None:
+            from .services import MessageService
+
+            cursors = MessageService.read_cursors(obj.room_id)
+        return read_by_ids(obj.id, obj.author_id, cursors)
+
+
+class ArchivedAttachmentSerializer(serializers.ModelSerializer):
+    file = FileSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedAttachment
+        fields = ("id", "file")
+
+
+class ArchivedMessageSerializer(serializers.ModelSerializer):
+    """Archived message in the same shape as MessageSerializer."""
+
+    author = UserSerializer(read_only=True)
+    attachments = ArchivedAttachmentSerializer(many=True, read_only=True)
+    read_by_ids = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedMessage
+        fields = MessageSerializer.Meta.fields
+
+    def get_read_by_ids(self, obj: ArchivedMessage) -> list[int]:
+        return read_by_ids(obj.id, obj.author_id, self.context.get("read_cursors") or {})
+
 
 class CreateMessageSerializer(serializers.Serializer):
     """Input for sending a message."""
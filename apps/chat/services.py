@@ -1,16 +1,28 @@
-from typing import List, Optional
+from collections import Counter
+from typing import Optional
 
 from core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
 
 from apps.files.models import File
-from apps.rooms.models import Room
+from apps.rooms import membership
+from apps.rooms.models import Room, RoomParticipant
 
+from . import search
 from .models import Message, MessageAttachment
 
 User = get_user_model()
 
 
+def _file_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class MessageService:
     """Send and list messages."""
 
@@ -19,36 +31,226 @@ class MessageService:
         room: Room,
         author: User,
         content: str,
-        attachment_file_ids: Optional[List[int]] = None,
+        attachment_file_ids: Optional[list[int]] = None,
     ) -> Message:
         """Create a message; validate room membership and file ownership."""
-        from apps.rooms.services import RoomService
+        item = {
+            "room": room,
+            "author": author,
+            "content": content,
+            "attachment_file_ids": attachment_file_ids or [],
+        }
+        checked = MessageService._validate_batch([item])[0]
+        if isinstance(checked, ValidationError):
+            raise checked
+        return MessageService._insert([item], [checked])[0]
+
+    @staticmethod
+    def send_messages(items: list[dict], partial: bool = False) -> list:
+        """
+        Bulk variant of send_message for bots, bridges and imports.
+
+        Each item takes the send_message keyword arguments (room, author, content,
+        attachment_file_ids). Validation costs two queries for the whole batch and all
+        rows are inserted in one transaction. By default any invalid item rejects the
+        batch with ValidationError({"messages": {index: errors}}); with partial=True
+        valid items are inserted and the result holds the ValidationError in place of
+        each rejected item.
+        """
+        checked = MessageService._validate_batch(items)
+        errors = {
+            str(idx): result.detail
+            for idx, result in enumerate(checked)
+            if isinstance(result, ValidationError)
+        }
+        if errors and not partial:
+            raise ValidationError(detail={"messages": errors})
+
+        valid = [idx for idx, result in enumerate(checked) if not isinstance(result, ValidationError)]
+        messages = MessageService._insert([items[i] for i in valid], [checked[i] for i in valid])
+        results = list(checked)
+        for idx, message in zip(valid, messages):
+            results[idx] = message
+        return results
+
+    @staticmethod
+    def _validate_batch(items: list[dict]) -> list:
+        """
+        Check membership and attachment ownership for many messages at once:
+        memberships through the membership cache (at most one query), one query
+        for files. Returns, per item, the list of File objects to attach or the
+        ValidationError that rejects it.
+        """
+        memberships = membership.members((item["room"].pk, item["author"].pk) for item in items)
+        # Ids come from JSON as given ("5" included); one that is no integer is simply not found.
+        file_ids = {
+            _file_id(fid) for item in items for fid in item.get("attachment_file_ids") or []
+        } - {None}
+        files = File.objects.in_bulk(file_ids) if file_ids else {}
 
-        if not RoomService.is_participant(room, author):
+        results = []
+        for item in items:
+            author_id = item["author"].pk
+            if (item["room"].pk, author_id) not in memberships:
+                results.append(ValidationError(
+                    detail={"room": ["You are not a participant in this room."]}
+                ))
+                continue
+            files_to_attach = []
+            error = None
+            for fid in item.get("attachment_file_ids") or []:
+                f = files.get(_file_id(fid))
+                if f is None:
+                    error = ValidationError(
+                        detail={"attachments": [f"File id {fid} not found."]}
+                    )
+                    break
+                if f.uploaded_by_id != author_id:
+                    error = ValidationError(
+                        detail={"attachments": ["You can only attach files you uploaded."]}
+                    )
+                    break
+                files_to_attach.append(f)
+            results.append(error if error is not None else files_to_attach)
+        return results
+
+    @staticmethod
+    def _insert(items: list[dict], attachments: list[list]) -> list[Message]:
+        if not items:
+            return []
+        with transaction.atomic():
+            next_seq = MessageService._reserve_seq(Counter(item["room"].pk for item in items))
+            messages = []
+            for item in items:
+                next_seq[item["room"].pk] += 1
+                messages.append(Message(
+                    room=item["room"],
+                    author=item["author"],
+                    content=(item.get("content") or "").strip(),
+                    seq=next_seq[item["room"].pk],
+                ))
+            messages = Message.objects.bulk_create(messages)
+            MessageAttachment.objects.bulk_create([
+                MessageAttachment(message=message, file=f)
+                for message, files_to_attach in zip(messages, attachments)
+                for f in files_to_attach
+            ])
+            search.index_messages(messages)
+            MessageService._touch_rooms(messages)
+        return messages
+
+    @staticmethod
+    def _touch_rooms(messages: list[Message]) -> None:
+        """Record each room's newest message on Room (last_message_id, last_activity_at)."""
+        newest = {}
+        for message in messages:
+            current = newest.get(message.room_id)
+            if current is None or (message.created_at, message.pk) > (current.created_at, current.pk):
+                newest[message.room_id] = message
+        for room_id, message in sorted(newest.items()):
+            Room.objects.filter(pk=room_id).update(
+                last_message_id=message.pk,
+                last_activity_at=message.created_at,
+            )
+
+    @staticmethod
+    def _reserve_seq(counts: Counter) -> dict[int, int]:
+        """
+        Reserve counts[room_id] sequence numbers per room. Returns, per room, the
+        number just below the reserved block. The UPDATE holds the room row lock
+        until the surrounding transaction commits, so blocks never overlap.
+        """
+        start = {}
+        for room_id, n in sorted(counts.items()):
+            Room.objects.filter(pk=room_id).update(message_seq=F("message_seq") + n)
+            last = Room.objects.filter(pk=room_id).values_list("message_seq", flat=True).get()
+            start[room_id] = last - n
+        return start
+
+    @staticmethod
+    def messages_since(
+        room_id: int,
+        since_seq: int,
+        limit: int,
+    ) -> tuple[int, Optional[list[Message]]]:
+        """
+        Messages in the room with seq > since_seq, oldest first, for resuming a socket.
+        Returns (last_seq, messages). messages is None when more than `limit` were
+        missed or some of them were already archived; the client should then page
+        history over REST instead.
+        """
+        last_seq = Room.objects.filter(pk=room_id).values_list("message_seq", flat=True).first() or 0
+        if last_seq - since_seq > limit:
+            return last_seq, None
+        messages = list(
+            Message.objects.filter(room_id=room_id, seq__gt=since_seq, seq__lte=last_seq)
+            .select_related("author")
+            .order_by("seq")
+        )
+        # seq is unique per room: any row missing from the range (archived, at
+        # either end or in between) leaves fewer rows than the gap is long.
+        if len(messages) != max(last_seq - since_seq, 0):
+            return last_seq, None
+        return last_seq, messages
+
+    @staticmethod
+    def mark_read(
+        room: Room,
+        user: User,
+        up_to_message_id: Optional[int] = None,
+    ) -> tuple[int, int]:
+        """
+        Move the user's read cursor in the room forward to up_to_message_id
+        (default: the latest message). The cursor never moves backwards.
+        Returns (previous, current) cursor values.
+        """
+        participant = (
+            RoomParticipant.objects.filter(room=room, user=user)
+            .only("id", "last_read_message_id")
+            .first()
+        )
+        if participant is None:
             raise ValidationError(
                 detail={"room": ["You are not a participant in this room."]}
             )
+        if up_to_message_id is None:
+            up_to_message_id = (
+                Message.objects.filter(room=room)
+                .order_by("-created_at", "-id")
+                .values_list("id", flat=True)
+                .first()
+                or 0
+            )
+        previous = participant.last_read_message_id
+        if up_to_message_id <= previous:
+            return previous, previous
+        RoomParticipant.objects.filter(
+            pk=participant.pk,
+            last_read_message_id__lt=up_to_message_id,
+        ).update(last_read_message_id=up_to_message_id)
+        return previous, up_to_message_id
 
-        attachment_file_ids = attachment_file_ids or []
-        files_to_attach = []
-        for fid in attachment_file_ids:
-            try:
-                f = File.objects.get(pk=fid)
-            except File.DoesNotExist:
-                raise ValidationError(
-                    detail={"attachments": [f"File id {fid} not found."]}
-                )
-            if f.uploaded_by_id != author.id:
-                raise ValidationError(
-                    detail={"attachments": ["You can only attach files you uploaded."]}
-                )
-            files_to_attach.append(f)
-
-        message = Message.objects.create(
-            room=room,
-            author=author,
-            content=(content or "").strip(),
+    @staticmethod
+    def unread_count(room: Room, user: User) -> int:
+        """Messages from others above the user's read cursor."""
+        last_read = (
+            RoomParticipant.objects.filter(room=room, user=user)
+            .values_list("last_read_message_id", flat=True)
+            .first()
+        )
+        if last_read is None:
+            return 0
+        return (
+            Message.objects.filter(room=room, id__gt=last_read)
+            .exclude(author=user)
+            .count()
+        )
+
+    @staticmethod
+    def read_cursors(room_id: int) -> dict[int, int]:
+        """Map user_id -> last_read_message_id for every participant of the room."""
+        return dict(
+            RoomParticipant.objects.filter(room_id=room_id).values_list(
+                "user_id", "last_read_message_id"
+            )
         )
-        for f in files_to_attach:
-            MessageAttachment.objects.create(message=message, file=f)
-        return message
@@ -0,0 +1,21 @@
+"""Bump Message.updated_at when what a cached message payload embeds changes (see message_cache)."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.files.models import File
+
+from .models import Message, MessageAttachment
+
+
+@receiver([post_save, post_delete], sender=MessageAttachment)
+def touch_message_on_attachment_change(sender, instance, **kwargs):
+    Message.objects.filter(pk=instance.message_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=File)
+def touch_messages_on_file_change(sender, instance, created, **kwargs):
+    if created:
+        return
+    Message.objects.filter(attachments__file=instance).update(updated_at=timezone.now())
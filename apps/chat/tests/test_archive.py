@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import create_user
+from apps.chat.archive import archive_batch
+from apps.chat.models import ArchivedMessage, Message, MessageAttachment
+from apps.chat.services import MessageService
+from apps.files.models import File
+from apps.files.permissions import IsFileAccessible
+from apps.rooms.services import RoomService
+from apps.rooms.tests.factories import create_room
+
+
+def _age(messages, days):
+    Message.objects.filter(id__in=[m.id for m in messages]).update(
+        created_at=timezone.now() - timedelta(days=days)
+    )
+
+
+@pytest.mark.django_db
+class TestArchive:
+    def test_archive_batch_moves_old_messages(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        old = [MessageService.send_message(room=room, author=user, content=f"old {i}") for i in range(3)]
+        fresh = MessageService.send_message(room=room, author=user, content="fresh")
+        _age(old, 400)
+
+        assert archive_batch(timezone.now() - timedelta(days=180), batch_size=2) == 2
+        assert archive_batch(timezone.now() - timedelta(days=180), batch_size=2) == 1
+        assert archive_batch(timezone.now() - timedelta(days=180), batch_size=2) == 0
+        assert list(Message.objects.values_list("id", flat=True)) == [fresh.id]
+        assert sorted(ArchivedMessage.objects.values_list("id", flat=True)) == [m.id for m in old]
+        assert sorted(ArchivedMessage.objects.values_list("seq", flat=True)) == [1, 2, 3]
+
+    def test_history_cursor_continues_into_archive(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        msgs = [MessageService.send_message(room=room, author=user, content=f"m{i}") for i in range(5)]
+        _age(msgs[:3], 400)
+        call_command("archive_messages", "--older-than-days", "180", "--pause", "0")
+
+        api_client.force_authenticate(user=user)
+        url = f"/api/chat/{room.id}/messages/"
+        seen, params = [], {"pagination": "cursor", "page_size": 2}
+        while True:
+            page = api_client.get(url, params).data
+            seen += [m["id"] for m in page["results"]]
+            if not page["next_cursor"]:
+                break
+            params = {"before": page["next_cursor"], "page_size": 2}
+        assert seen == [m.id for m in reversed(msgs)]
+
+        back = api_client.get(url, {"after": page["previous_cursor"], "page_size": 2}).data
+        assert [m["id"] for m in back["results"]] == [msgs[2].id, msgs[1].id]
+
+    def test_archived_attachment_keeps_file_access(self, media_root):
+        owner = create_user(username="owner")
+        member = create_user(username="member")
+        room = create_room(owner=owner, name="R1")
+        RoomService.add_participant(room, member)
+        f = File.objects.create(
+            uploaded_by=owner, file=ContentFile(b"x", name="x.txt"), name="x.txt", size=1
+        )
+        message = MessageService.send_message(
+            room=room, author=owner, content="see file", attachment_file_ids=[f.id]
+        )
+        _age([message], 400)
+        archive_batch(timezone.now() - timedelta(days=180))
+
+        assert not MessageAttachment.objects.exists()
+        archived = ArchivedMessage.objects.get(pk=message.id)
+        assert archived.attachments.get().file == f
+
+        class _Request:
+            user = member
+
+        assert IsFileAccessible().has_object_permission(_Request(), None, f)
+
+    @pytest.mark.parametrize("n", [2, 20])
+    def test_archive_batch_query_count_is_constant(self, django_assert_num_queries, n):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        _age([MessageService.send_message(room=room, author=user, content=f"m{i}") for i in range(n)], 400)
+
+        # savepoint, messages, attachments, archive insert, fts delete,
+        # delete collector (messages, attachments), delete, release
+        with django_assert_num_queries(9):
+            assert archive_batch(timezone.now() - timedelta(days=180)) == n
@@ -0,0 +1,161 @@
+import pytest
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from apps.accounts.tests.factories import create_user
+from apps.chat.consumers import ChatConsumer
+from apps.chat.models import Message
+from apps.chat.services import MessageService
+from apps.rooms.models import RoomParticipant
+from apps.rooms.tests.factories import create_room
+
+application = URLRouter([path("ws/chat/<int:room_id>/", ChatConsumer.as_asgi())])
+
+
+def _seed_unread(n):
+    owner = create_user(username="owner")
+    reader = create_user(username="reader")
+    room = create_room(owner=owner, name="R1")
+    RoomParticipant.objects.create(room=room, user=reader)
+    Message.objects.bulk_create(
+        Message(room=room, author=owner, content=f"m{i}") for i in range(n)
+    )
+    token = Token.objects.create(user=reader)
+    return room, reader, token
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChatConsumerReadReceipts:
+    async def test_mark_room_as_read_sends_one_event(self, monkeypatch):
+        room, reader, token = await sync_to_async(_seed_unread)(50)
+        layer = get_channel_layer()
+        sends = []
+        original = layer.group_send
+
+        async def counting_group_send(group, message):
+            sends.append(message["type"])
+            await original(group, message)
+
+        monkeypatch.setattr(layer, "group_send", counting_group_send)
+
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{room.id}/?token={token.key}")
+        connected, _ = await communicator.connect()
+        assert connected
+        await communicator.send_json_to({"type": "mark_room_as_read"})
+        event = await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        assert sends == ["chat_messages_read_broadcast"]
+        assert event["type"] == "messages_read"
+        assert event["data"]["user_id"] == reader.id
+        assert event["data"]["from_message_id"] == 0
+        assert event["data"]["count"] == 50
+        last_id = await sync_to_async(
+            lambda: Message.objects.filter(room=room).order_by("-id").values_list("id", flat=True)[0]
+        )()
+        assert event["data"]["last_read_message_id"] == last_id
+
+    async def test_mark_room_as_read_twice_sends_nothing_new(self):
+        room, _, token = await sync_to_async(_seed_unread)(3)
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{room.id}/?token={token.key}")
+        await communicator.connect()
+        await communicator.send_json_to({"type": "mark_room_as_read"})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"type": "mark_room_as_read"})
+        assert await communicator.receive_nothing(timeout=0.2)
+        await communicator.disconnect()
+
+
+def _seed_history(n):
+    owner = create_user(username="owner")
+    reader = create_user(username="reader")
+    room = create_room(owner=owner, name="R1")
+    RoomParticipant.objects.create(room=room, user=reader)
+    MessageService.send_messages(
+        [{"room": room, "author": owner, "content": f"m{i}"} for i in range(n)]
+    )
+    token = Token.objects.create(user=reader)
+    return room, reader, token
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChatConsumerResume:
+    async def test_replays_only_missed_messages(self):
+        room, reader, token = await sync_to_async(_seed_history)(10)
+        await sync_to_async(MessageService.mark_read)(room, reader)
+        communicator = WebsocketCommunicator(
+            application, f"/ws/chat/{room.id}/?token={token.key}&since_seq=7"
+        )
+        connected, _ = await communicator.connect()
+        assert connected
+        frames = [await communicator.receive_json_from() for _ in range(5)]
+        assert await communicator.receive_nothing(timeout=0.1)
+        await communicator.disconnect()
+
+        assert [f["type"] for f in frames] == [
+            "chat_message", "chat_message", "chat_message", "read_state", "resume_complete",
+        ]
+        assert [f["data"]["seq"] for f in frames[:3]] == [8, 9, 10]
+        assert [f["data"]["content"] for f in frames[:3]] == ["m7", "m8", "m9"]
+        assert all(f["data"]["read_by_ids"] == [reader.id] for f in frames[:3])
+        assert frames[3]["data"]["read_cursors"][str(reader.id)] == frames[2]["data"]["id"]
+        assert frames[4]["data"] == {"since_seq": 7, "last_seq": 10, "count": 3}
+
+    async def test_up_to_date_client_gets_only_markers(self):
+        room, _, token = await sync_to_async(_seed_history)(3)
+        communicator = WebsocketCommunicator(
+            application, f"/ws/chat/{room.id}/?token={token.key}&since_seq=3"
+        )
+        await communicator.connect()
+        read_state = await communicator.receive_json_from()
+        done = await communicator.receive_json_from()
+        await communicator.disconnect()
+        assert read_state["type"] == "read_state"
+        assert done["data"] == {"since_seq": 3, "last_seq": 3, "count": 0}
+
+    async def test_large_gap_requires_rest_resync(self, settings):
+        settings.CHAT_RESUME_MAX_MESSAGES = 5
+        room, _, token = await sync_to_async(_seed_history)(20)
+        communicator = WebsocketCommunicator(
+            application, f"/ws/chat/{room.id}/?token={token.key}&since_seq=2"
+        )
+        await communicator.connect()
+        event = await communicator.receive_json_from()
+        assert await communicator.receive_nothing(timeout=0.1)
+        await communicator.disconnect()
+        assert event == {"type": "resync_required", "data": {"since_seq": 2, "last_seq": 20}}
+
+    async def test_without_since_seq_nothing_is_replayed(self):
+        room, _, token = await sync_to_async(_seed_history)(3)
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{room.id}/?token={token.key}")
+        await communicator.connect()
+        assert await communicator.receive_nothing(timeout=0.1)
+        await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChatConsumerRateLimit:
+    async def test_flood_is_rejected_with_retry_after(self, settings):
+        settings.WS_RATE_LIMITS = {"chat_message": {"burst": 2, "per_second": 0.1}, "*": {"burst": 5, "per_second": 1}}
+        room, _, token = await sync_to_async(_seed_history)(0)
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{room.id}/?token={token.key}")
+        await communicator.connect()
+        for i in range(3):
+            await communicator.send_json_to(
+                {"type": "chat_message", "data": {"content": f"x{i}", "client_id": f"c{i}"}}
+            )
+        frames = []
+        while not await communicator.receive_nothing(timeout=0.2):
+            frames.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+
+        limited = [f for f in frames if f.get("code") == "rate_limited"]
+        assert len(limited) == 1
+        assert limited[0]["client_id"] == "c2"
+        assert limited[0]["message_type"] == "chat_message"
+        assert limited[0]["retry_after"] > 0
+        assert await sync_to_async(Message.objects.filter(room=room).count)() == 2
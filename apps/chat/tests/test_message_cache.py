@@ -0,0 +1,74 @@
+import pytest
+from django.core.files.base import ContentFile
+
+from apps.accounts.tests.factories import create_user
+from apps.chat import message_cache
+from apps.chat.models import Message, MessageAttachment
+from apps.chat.services import MessageService
+from apps.files.models import File
+from apps.rooms.services import RoomService
+from apps.rooms.tests.factories import create_room
+
+
+def _messages(room):
+    return list(Message.objects.filter(room=room).select_related("author", "author__profile"))
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
+class TestMessageCache:
+    def setup_method(self):
+        message_cache.reset_stats()
+
+    def test_rendered_message_is_served_from_cache(self, django_assert_num_queries):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        message = MessageService.send_message(room=room, author=user, content="hi")
+        message_cache.render_messages([message], {})
+        assert message_cache.stats()["misses"] == 1
+
+        page = _messages(room)
+        with django_assert_num_queries(0):
+            payloads = message_cache.render_messages(page, {})
+        assert payloads[0]["content"] == "hi"
+        assert message_cache.stats()["hits"] == 1
+        assert message_cache.shared_stats()["hits"] == 1
+
+    def test_read_state_is_overlaid_not_cached(self):
+        owner = create_user(username="owner")
+        reader = create_user(username="reader")
+        room = create_room(owner=owner, name="R1")
+        RoomService.add_participant(room, reader)
+        message = MessageService.send_message(room=room, author=owner, content="hi")
+        assert message_cache.render_messages([message], {})[0]["read_by_ids"] == []
+
+        MessageService.mark_read(room, reader)
+        page = _messages(room)
+        payload = message_cache.render_messages(page, MessageService.read_cursors(room.id))[0]
+        assert payload["read_by_ids"] == [reader.id]
+        assert message_cache.stats()["hits"] == 1
+
+    def test_attachment_change_invalidates(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        message = MessageService.send_message(room=room, author=user, content="hi")
+        message_cache.render_messages([message], {})
+        f = File.objects.create(
+            uploaded_by=user, file=ContentFile(b"x", name="x.txt"), name="x.txt", size=1
+        )
+        MessageAttachment.objects.create(message=message, file=f)
+
+        payload = message_cache.render_messages(_messages(room), {})[0]
+        assert [a["file"]["name"] for a in payload["attachments"]] == ["x.txt"]
+        assert message_cache.stats() == {"hits": 0, "misses": 2, "hit_rate": 0.0}
+
+    def test_profile_change_invalidates(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_message(room=room, author=user, content="hi")
+        message_cache.render_messages(_messages(room), {})
+        user.profile.display_name = "New Name"
+        user.profile.save()
+
+        payload = message_cache.render_messages(_messages(room), {})[0]
+        assert payload["author"]["display_name"] == "New Name"
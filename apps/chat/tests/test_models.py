@@ -10,6 +10,7 @@ User = get_user_model()
 
 
 @pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
 class TestMessage:
     def test_create_message_with_attachment(self):
         user = User.objects.create_user(username="u", email="u@ex.com", password="p")
@@ -0,0 +1,82 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import create_user
+from apps.chat import search
+from apps.chat.models import Message
+from apps.chat.services import MessageService
+from apps.rooms.tests.factories import create_room
+
+
+def _search_url(room_id):
+    return f"/api/rooms/{room_id}/messages/search/"
+
+
+@pytest.mark.django_db
+class TestMessageSearch:
+    def test_uses_fts5_on_sqlite(self):
+        assert search.backend() == "fts5"
+
+    def test_finds_sent_messages_in_room_only(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        other_room = create_room(owner=user, name="R2")
+        hit = MessageService.send_message(room=room, author=user, content="Deploy finished at noon")
+        MessageService.send_message(room=room, author=user, content="lunch?")
+        MessageService.send_message(room=other_room, author=user, content="deploy elsewhere")
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_search_url(room.pk), {"q": "deploy"})
+        assert response.status_code == status.HTTP_200_OK
+        assert [m["id"] for m in response.data["results"]] == [hit.id]
+
+    def test_prefix_and_all_terms(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        a = MessageService.send_message(room=room, author=user, content="release notes draft")
+        MessageService.send_message(room=room, author=user, content="release party")
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_search_url(room.pk), {"q": 'release "no'})
+        assert [m["id"] for m in response.data["results"]] == [a.id]
+
+    def test_keyset_pages(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        ids = [MessageService.send_message(room=room, author=user, content=f"ping {i}").id for i in range(3)]
+        api_client.force_authenticate(user=user)
+        first = api_client.get(_search_url(room.pk), {"q": "ping", "page_size": 2})
+        second = api_client.get(
+            _search_url(room.pk), {"q": "ping", "page_size": 2, "before": first.data["next_cursor"]}
+        )
+        assert [m["id"] for m in first.data["results"]] == [ids[2], ids[1]]
+        assert [m["id"] for m in second.data["results"]] == [ids[0]]
+
+    def test_non_participant_403(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        other = create_user(username="other")
+        room = create_room(owner=owner, name="R1")
+        api_client.force_authenticate(user=other)
+        response = api_client.get(_search_url(room.pk), {"q": "x"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_blank_query_400(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_search_url(room.pk), {"q": "  "})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_backfill_command_indexes_existing_messages(self, api_client: APIClient):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        legacy = Message.objects.create(room=room, author=user, content="imported history")
+        call_command("rebuild_message_search_index")
+        call_command("rebuild_message_search_index")  # idempotent
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM chat_message_fts")
+            assert cursor.fetchone()[0] == 1
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_search_url(room.pk), {"q": "imported"})
+        assert [m["id"] for m in response.data["results"]] == [legacy.id]
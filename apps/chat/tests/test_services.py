@@ -1,9 +1,14 @@
 import pytest
 from core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 
 from apps.accounts.tests.factories import create_user
+from apps.chat.models import Message
+from apps.chat.serializers import MessageSerializer
 from apps.chat.services import MessageService
+from apps.files.models import File
+from apps.rooms.services import RoomService
 from apps.rooms.tests.factories import create_room
 
 User = get_user_model()
@@ -27,3 +32,203 @@ class TestMessageService:
         with pytest.raises(ValidationError) as exc_info:
             MessageService.send_message(room=room, author=other, content="Hi")
         assert "room" in exc_info.value.detail
+
+    def test_mark_read_moves_cursor_forward_only(self):
+        owner = create_user(username="owner")
+        reader = create_user(username="reader")
+        room = create_room(owner=owner, name="R1")
+        RoomService.add_participant(room, reader)
+        m1 = MessageService.send_message(room=room, author=owner, content="1")
+        m2 = MessageService.send_message(room=room, author=owner, content="2")
+        assert MessageService.unread_count(room, reader) == 2
+
+        assert MessageService.mark_read(room, reader, up_to_message_id=m1.id) == (0, m1.id)
+        assert MessageService.unread_count(room, reader) == 1
+        assert MessageService.mark_read(room, reader) == (m1.id, m2.id)
+        assert MessageService.mark_read(room, reader, up_to_message_id=m1.id) == (m2.id, m2.id)
+        assert MessageService.unread_count(room, reader) == 0
+
+    def test_own_messages_are_never_unread(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_message(room=room, author=user, content="mine")
+        assert MessageService.unread_count(room, user) == 0
+
+    def test_read_by_ids_follow_cursor(self):
+        owner = create_user(username="owner")
+        reader = create_user(username="reader")
+        room = create_room(owner=owner, name="R1")
+        RoomService.add_participant(room, reader)
+        m1 = MessageService.send_message(room=room, author=owner, content="1")
+        m2 = MessageService.send_message(room=room, author=owner, content="2")
+        MessageService.mark_read(room, reader, up_to_message_id=m1.id)
+        assert MessageSerializer(m1).data["read_by_ids"] == [reader.id]
+        assert MessageSerializer(m2).data["read_by_ids"] == []
+
+
+def _upload(user, name="x.txt"):
+    return File.objects.create(
+        uploaded_by=user,
+        file=ContentFile(b"x", name=name),
+        name=name,
+        size=1,
+        content_type="text/plain",
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
+class TestMessageServiceAttachments:
+    def test_attachments_validated_in_one_query(self, django_assert_num_queries):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        files = [_upload(user, f"f{i}.txt") for i in range(5)]
+        # membership, files, then savepoint / seq reserve (update + read) / message
+        # insert / attachment insert / search index insert / room activity / release
+        with django_assert_num_queries(10):
+            msg = MessageService.send_message(
+                room=room, author=user, content="x", attachment_file_ids=[f.id for f in files]
+            )
+        assert msg.attachments.count() == 5
+
+    def test_missing_attachment_reports_id(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        f = _upload(user)
+        with pytest.raises(ValidationError) as exc_info:
+            MessageService.send_message(
+                room=room, author=user, content="x", attachment_file_ids=[f.id, 999]
+            )
+        assert exc_info.value.detail["attachments"] == ["File id 999 not found."]
+        assert not Message.objects.exists()
+
+    def test_string_attachment_ids_accepted(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        f = _upload(user)
+        msg = MessageService.send_message(
+            room=room, author=user, content="x", attachment_file_ids=[str(f.id)]
+        )
+        assert [a.file_id for a in msg.attachments.all()] == [f.id]
+        with pytest.raises(ValidationError) as exc_info:
+            MessageService.send_message(
+                room=room, author=user, content="x", attachment_file_ids=["abc"]
+            )
+        assert exc_info.value.detail["attachments"] == ["File id abc not found."]
+
+    def test_foreign_attachment_rejected(self):
+        user = create_user(username="u")
+        other = create_user(username="o")
+        room = create_room(owner=user, name="R1")
+        f = _upload(other)
+        with pytest.raises(ValidationError) as exc_info:
+            MessageService.send_message(
+                room=room, author=user, content="x", attachment_file_ids=[f.id]
+            )
+        assert "attachments" in exc_info.value.detail
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
+class TestMessageServiceBulk:
+    def test_send_messages_inserts_all(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        f = _upload(user)
+        messages = MessageService.send_messages([
+            {"room": room, "author": user, "content": "a"},
+            {"room": room, "author": user, "content": " b ", "attachment_file_ids": [f.id]},
+        ])
+        assert [m.content for m in messages] == ["a", "b"]
+        assert all(m.pk for m in messages)
+        assert messages[1].attachments.get().file == f
+
+    def test_send_messages_rejects_whole_batch(self):
+        user = create_user(username="u")
+        outsider = create_user(username="o")
+        room = create_room(owner=user, name="R1")
+        with pytest.raises(ValidationError) as exc_info:
+            MessageService.send_messages([
+                {"room": room, "author": user, "content": "a"},
+                {"room": room, "author": outsider, "content": "b"},
+            ])
+        assert list(exc_info.value.detail["messages"]) == ["1"]
+        assert not Message.objects.exists()
+
+    def test_send_messages_partial(self):
+        user = create_user(username="u")
+        outsider = create_user(username="o")
+        room = create_room(owner=user, name="R1")
+        ok, rejected = MessageService.send_messages(
+            [
+                {"room": room, "author": user, "content": "a"},
+                {"room": room, "author": outsider, "content": "b"},
+            ],
+            partial=True,
+        )
+        assert ok.content == "a"
+        assert isinstance(rejected, ValidationError)
+        assert Message.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestMessageSeq:
+    def test_seq_is_per_room_and_gap_free(self):
+        user = create_user(username="u")
+        r1 = create_room(owner=user, name="R1")
+        r2 = create_room(owner=user, name="R2")
+        first = MessageService.send_message(room=r1, author=user, content="a")
+        batch = MessageService.send_messages([
+            {"room": r1, "author": user, "content": "b"},
+            {"room": r2, "author": user, "content": "c"},
+            {"room": r1, "author": user, "content": "d"},
+        ])
+        assert first.seq == 1
+        assert [m.seq for m in batch] == [2, 1, 3]
+        r1.refresh_from_db()
+        assert r1.message_seq == 3
+
+    def test_rejected_items_consume_no_seq(self):
+        user = create_user(username="u")
+        outsider = create_user(username="o")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_messages(
+            [
+                {"room": room, "author": outsider, "content": "x"},
+                {"room": room, "author": user, "content": "a"},
+            ],
+            partial=True,
+        )
+        assert list(Message.objects.values_list("seq", flat=True)) == [1]
+
+    def test_messages_since(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_messages(
+            [{"room": room, "author": user, "content": str(i)} for i in range(6)]
+        )
+        last_seq, messages = MessageService.messages_since(room.id, 4, limit=10)
+        assert last_seq == 6
+        assert [m.content for m in messages] == ["4", "5"]
+        assert MessageService.messages_since(room.id, 0, limit=5) == (6, None)
+
+    def test_messages_since_archived_gap(self):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_messages(
+            [{"room": room, "author": user, "content": str(i)} for i in range(4)]
+        )
+        Message.objects.filter(room=room, seq__lte=2).delete()
+        assert MessageService.messages_since(room.id, 1, limit=10) == (4, None)
+        assert len(MessageService.messages_since(room.id, 2, limit=10)[1]) == 2
+
+    @pytest.mark.parametrize("archived", [{1, 2, 3}, {3}, {2}])
+    def test_messages_since_archived_tail_or_middle(self, archived):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        MessageService.send_messages(
+            [{"room": room, "author": user, "content": str(i)} for i in range(3)]
+        )
+        Message.objects.filter(room=room, seq__in=archived).delete()
+        assert MessageService.messages_since(room.id, 0, limit=10) == (3, None)
+        assert MessageService.messages_since(room.id, 3, limit=10) == (3, [])
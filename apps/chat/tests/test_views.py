@@ -3,6 +3,8 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.accounts.tests.factories import create_user
+from apps.chat.models import Message
+from apps.rooms.models import RoomParticipant
 from apps.rooms.tests.factories import create_room
 
 
@@ -45,3 +47,92 @@ class TestMessageAPI:
         api_client.force_authenticate(user=other)
         response = api_client.post(_messages_url(room.pk), {"content": "Hi"})
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def _history_url(room_id):
+    return f"/api/chat/{room_id}/messages/"
+
+
+@pytest.mark.django_db
+class TestMessageHistoryCursor:
+    def _seed(self, n):
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        ids = [Message.objects.create(room=room, author=user, content=f"m{i}").id for i in range(n)]
+        return user, room, ids
+
+    def test_cursor_mode_has_no_count(self, api_client: APIClient):
+        user, room, ids = self._seed(5)
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_history_url(room.pk), {"pagination": "cursor", "page_size": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert "count" not in response.data
+        assert [m["id"] for m in response.data["results"]] == ids[::-1][:2]
+        assert response.data["previous"] is None
+        assert response.data["next_cursor"]
+
+    def test_before_walks_back_and_after_returns(self, api_client: APIClient):
+        user, room, ids = self._seed(5)
+        api_client.force_authenticate(user=user)
+        first = api_client.get(_history_url(room.pk), {"pagination": "cursor", "page_size": 2})
+        second = api_client.get(
+            _history_url(room.pk), {"before": first.data["next_cursor"], "page_size": 2}
+        )
+        assert [m["id"] for m in second.data["results"]] == [ids[2], ids[1]]
+        third = api_client.get(
+            _history_url(room.pk), {"before": second.data["next_cursor"], "page_size": 2}
+        )
+        assert [m["id"] for m in third.data["results"]] == [ids[0]]
+        assert third.data["next"] is None
+        back = api_client.get(
+            _history_url(room.pk), {"after": second.data["previous_cursor"], "page_size": 2}
+        )
+        assert [m["id"] for m in back.data["results"]] == [ids[4], ids[3]]
+        assert back.data["previous"] is None
+
+    def test_ties_on_created_at_are_broken_by_id(self, api_client: APIClient):
+        user, room, ids = self._seed(4)
+        Message.objects.filter(room=room).update(created_at=Message.objects.get(pk=ids[0]).created_at)
+        api_client.force_authenticate(user=user)
+        seen = []
+        params = {"pagination": "cursor", "page_size": 3}
+        while True:
+            response = api_client.get(_history_url(room.pk), params)
+            seen += [m["id"] for m in response.data["results"]]
+            if not response.data["next_cursor"]:
+                break
+            params = {"before": response.data["next_cursor"], "page_size": 3}
+        assert seen == ids[::-1]
+
+    def test_invalid_cursor_400(self, api_client: APIClient):
+        user, room, _ = self._seed(1)
+        api_client.force_authenticate(user=user)
+        response = api_client.get(_history_url(room.pk), {"before": "not-a-cursor"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestMessageReadAPI:
+    def test_read_advances_cursor_and_unread_count(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        reader = create_user(username="reader")
+        room = create_room(owner=owner, name="R1")
+        RoomParticipant.objects.create(room=room, user=reader)
+        m1 = Message.objects.create(room=room, author=owner, content="1")
+        Message.objects.create(room=room, author=owner, content="2")
+        api_client.force_authenticate(user=reader)
+        response = api_client.post(f"/api/chat/messages/{m1.id}/read/")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        participant = RoomParticipant.objects.get(room=room, user=reader)
+        assert participant.last_read_message_id == m1.id
+        rooms = api_client.get("/api/rooms/")
+        assert rooms.data["results"][0]["unread_count"] == 1
+
+    def test_read_non_participant_403(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        other = create_user(username="other")
+        room = create_room(owner=owner, name="R1")
+        m1 = Message.objects.create(room=room, author=owner, content="1")
+        api_client.force_authenticate(user=other)
+        response = api_client.post(f"/api/chat/messages/{m1.id}/read/")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework.authtoken.models import Token
+
+from apps.accounts.tests.factories import create_user
+from apps.chat.models import Message
+from apps.chat.write_behind import MessageWriteBehind, reset_write_behind
+from apps.rooms.tests.factories import create_room
+from core.exceptions import ValidationError
+
+from .test_consumers import application
+
+
+def _room_with_outsider():
+    owner = create_user(username="owner")
+    outsider = create_user(username="outsider")
+    room = create_room(owner=owner, name="R1")
+    return room, owner, outsider
+
+
+@pytest.mark.django_db(transaction=True)
+class TestMessageWriteBehind:
+    async def test_burst_is_flushed_in_one_batch(self):
+        room, owner, _ = await sync_to_async(_room_with_outsider)()
+        batcher = MessageWriteBehind(flush_interval=0.01, max_batch=100)
+        payloads = await asyncio.gather(
+            *(batcher.submit(room, owner, f"m{i}") for i in range(20))
+        )
+        assert batcher.flushes == 1
+        assert [p["content"] for p in payloads] == [f"m{i}" for i in range(20)]
+        assert all(p["id"] for p in payloads)
+        assert await sync_to_async(Message.objects.filter(room=room).count)() == 20
+
+    async def test_max_batch_triggers_flush(self):
+        room, owner, _ = await sync_to_async(_room_with_outsider)()
+        batcher = MessageWriteBehind(flush_interval=60, max_batch=5)
+        await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(room, owner, "x") for i in range(10))), timeout=5
+        )
+        assert batcher.flushes == 2
+
+    async def test_overlapping_flushes_run_one_at_a_time(self, monkeypatch):
+        from apps.chat import write_behind
+
+        room, owner, _ = await sync_to_async(_room_with_outsider)()
+        running, overlaps = [], []
+        to_thread = write_behind.database_sync_to_async
+
+        def slow_database_sync_to_async(fn):
+            async def run(*args):
+                overlaps.append(bool(running))
+                running.append(1)
+                try:
+                    await asyncio.sleep(0.05)  # the next batch fills up meanwhile
+                    return await to_thread(fn)(*args)
+                finally:
+                    running.pop()
+            return run
+
+        monkeypatch.setattr(write_behind, "database_sync_to_async", slow_database_sync_to_async)
+        batcher = MessageWriteBehind(flush_interval=60, max_batch=2)
+        payloads = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(room, owner, f"m{i}") for i in range(6))), timeout=5
+        )
+        assert batcher.flushes == 3
+        assert overlaps == [False] * 3
+        ids = [p["id"] for p in payloads]
+        assert ids == sorted(ids)
+        assert not batcher._tasks
+
+    async def test_invalid_message_does_not_sink_batch(self):
+        room, owner, outsider = await sync_to_async(_room_with_outsider)()
+        batcher = MessageWriteBehind(flush_interval=0.01, max_batch=100)
+        ok, rejected = await asyncio.gather(
+            batcher.submit(room, owner, "hi"),
+            batcher.submit(room, outsider, "spam"),
+            return_exceptions=True,
+        )
+        assert ok["content"] == "hi"
+        assert isinstance(rejected, ValidationError)
+        assert await sync_to_async(Message.objects.filter(room=room).count)() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChatConsumerWriteBehind:
+    async def test_sender_gets_ack_with_assigned_id(self, settings):
+        settings.CHAT_WRITE_BEHIND = True
+        reset_write_behind()
+        room, owner, _ = await sync_to_async(_room_with_outsider)()
+        token = await sync_to_async(Token.objects.create)(user=owner)
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{room.id}/?token={token.key}")
+        await communicator.connect()
+        await communicator.send_json_to(
+            {"type": "chat_message", "data": {"content": "hello", "client_id": "c-1"}}
+        )
+        # The ack goes straight to the socket; the broadcast loops through the channel layer.
+        frames = [await communicator.receive_json_from() for _ in range(2)]
+        await communicator.disconnect()
+        reset_write_behind()
+
+        by_type = {f["type"]: f["data"] for f in frames}
+        assert by_type["chat_message"]["content"] == "hello"
+        assert by_type["chat_message_ack"] == {"client_id": "c-1", "id": by_type["chat_message"]["id"]}
@@ -6,5 +6,6 @@ app_name = "chat"
 
 urlpatterns = [
     path("<int:room_id>/messages/", views.MessageListCreateView.as_view(), name="list-create"),
+    path("<int:room_id>/messages/search/", views.MessageSearchView.as_view(), name="search"),
     path("messages/<int:message_id>/read/", views.MessageReadView.as_view(), name="read"),
 ]
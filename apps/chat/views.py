@@ -6,25 +6,39 @@ from rest_framework.views import APIView
 
 from apps.rooms.models import Room
 from apps.rooms.services import RoomService
+from core.pagination import KeysetPagination
 
-from .models import Message
-from .serializers import CreateMessageSerializer, MessageSerializer
+from . import search
+from .message_cache import render_messages
+from .models import ArchivedMessage, Message
+from .serializers import ArchivedMessageSerializer, CreateMessageSerializer
 from .services import MessageService
 
 
+def render_history(rows, read_cursors, request) -> list[dict]:
+    """Serialize a page mixing hot Message rows (via the cache) and ArchivedMessage rows."""
+    hot = iter(render_messages([r for r in rows if isinstance(r, Message)], read_cursors, request))
+    archived = iter(ArchivedMessageSerializer(
+        [r for r in rows if isinstance(r, ArchivedMessage)],
+        many=True,
+        context={"request": request, "read_cursors": read_cursors},
+    ).data)
+    return [next(hot) if isinstance(r, Message) else next(archived) for r in rows]
+
+
 class MessageReadView(APIView):
     """Mark a message as read by the current user."""
 
     permission_classes = [IsAuthenticated]
 
     def post(self, request, message_id):
-        message = get_object_or_404(Message, pk=message_id)
+        message = get_object_or_404(Message.objects.select_related("room"), pk=message_id)
         if not RoomService.is_participant(message.room, request.user):
             return Response(
                 {"detail": "You are not a participant in this room."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        message.read_by.add(request.user)
+        MessageService.mark_read(message.room, request.user, up_to_message_id=message.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -44,13 +58,30 @@ class MessageListCreateView(APIView):
             )
 
     def get(self, request, room_id):
+        """
+        Paginated history, newest first.
+        Pass `pagination=cursor` (or a `before` / `after` cursor) for keyset mode:
+        no total count, constant cost per page regardless of history depth.
+        """
         from rest_framework.pagination import PageNumberPagination
 
         room = get_object_or_404(Room, pk=room_id)
         err = self.check_room_access(request, room)
         if err:
             return err
-        qs = Message.objects.filter(room=room).select_related("author").prefetch_related("attachments__file")
+        # Attachments are only loaded for cache misses (see message_cache.render_messages).
+        qs = Message.objects.filter(room=room).select_related("author", "author__profile")
+        read_cursors = MessageService.read_cursors(room.id)
+        if KeysetPagination.is_requested(request):
+            # Hot messages first, then the archive once the cursor walks past them.
+            archived = (
+                ArchivedMessage.objects.filter(room=room)
+                .select_related("author", "author__profile")
+                .prefetch_related("attachments__file")
+            )
+            paginator = KeysetPagination(field="created_at")
+            page = paginator.paginate_tiers([qs, archived], request)
+            return paginator.get_paginated_response(render_history(page, read_cursors, request))
         paginator = PageNumberPagination()
         try:
             page_size = request.query_params.get("page_size")
@@ -60,10 +91,8 @@ class MessageListCreateView(APIView):
             pass
         page = paginator.paginate_queryset(qs, request)
         if page is not None:
-            serializer = MessageSerializer(page, many=True, context={"request": request})
-            return paginator.get_paginated_response(serializer.data)
-        serializer = MessageSerializer(qs[:100], many=True, context={"request": request})
-        return Response(serializer.data)
+            return paginator.get_paginated_response(render_messages(page, read_cursors, request))
+        return Response(render_messages(qs[:100], read_cursors, request))
 
     def post(self, request, room_id):
         room = get_object_or_404(Room, pk=room_id)
@@ -85,6 +114,33 @@ class MessageListCreateView(APIView):
                 return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
             raise
         return Response(
-            MessageSerializer(message, context={"request": request}).data,
+            render_messages([message], {}, request)[0],
             status=status.HTTP_201_CREATED,
         )
+
+
+class MessageSearchView(APIView):
+    """Full-text search in one room's messages (`?q=`), newest first, keyset-paginated."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, room_id):
+        room = get_object_or_404(Room, pk=room_id)
+        if not RoomService.is_participant(room, request.user):
+            return Response(
+                {"detail": "You are not a participant in this room."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            return Response({"q": ["This parameter is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        qs = search.filter_messages(
+            Message.objects.filter(room=room).select_related("author", "author__profile"),
+            room.id,
+            q,
+        )
+        paginator = KeysetPagination(field="created_at")
+        page = paginator.paginate_queryset(qs, request)
+        return paginator.get_paginated_response(
+            render_messages(page, MessageService.read_cursors(room.id), request)
+        )
@@ -0,0 +1,120 @@
+"""
+Write-behind persistence for chat messages received over WebSocket.
+
+Instead of one database_sync_to_async hop per message, ChatConsumer hands messages to a
+per-process MessageWriteBehind queue. The queue is flushed with bulk_create every
+CHAT_WRITE_BEHIND_FLUSH_MS milliseconds or as soon as CHAT_WRITE_BEHIND_MAX_BATCH messages
+are waiting, in a single thread hop. Flushes run one at a time, in the order they were
+triggered. Each submitter awaits its own result, so the consumer only broadcasts (and
+acks the sender) after the row is committed and has an id.
+Enabled with settings.CHAT_WRITE_BEHIND.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+def persist_batch(items: list[dict]) -> list:
+    """
+    Insert a batch of send_message-style items in one transaction.
+    Returns one entry per item: the serialized message dict, or the ValidationError
+    that rejected it. Invalid items never block the rest of the batch.
+    """
+    from .message_cache import render_messages
+    from .services import MessageService
+
+    results = MessageService.send_messages(items, partial=True)
+    messages = [r for r in results if not isinstance(r, ValidationError)]
+    if not messages:
+        return results
+
+    # Fills the shared message cache; just-created messages are under nobody's read cursor.
+    payloads = iter(render_messages(messages, {}))
+    return [r if isinstance(r, ValidationError) else next(payloads) for r in results]
+
+
+class MessageWriteBehind:
+    """Per-process queue that batches message inserts. Must be used from one event loop."""
+
+    def __init__(self, flush_interval: float, max_batch: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()  # the loop keeps only weak references
+        self.flushes = 0
+        self.flushed_messages = 0
+
+    async def submit(self, room, author, content: str, attachment_file_ids=None) -> dict:
+        """Queue a message and wait until it is persisted. Returns the serialized message."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = {
+            "room": room,
+            "author": author,
+            "content": content or "",
+            "attachment_file_ids": list(attachment_file_ids or []),
+        }
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._flush_now)
+        return await future
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch) -> None:
+        # Lock waiters are woken first in, first out: batches are written in trigger order.
+        async with self._flush_lock:
+            try:
+                results = await database_sync_to_async(persist_batch)([item for item, _ in batch])
+            except Exception as e:
+                logger.exception("Chat write-behind flush of %d messages failed", len(batch))
+                results = [e] * len(batch)
+        self.flushes += 1
+        self.flushed_messages += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_write_behind: MessageWriteBehind | None = None
+
+
+def get_write_behind() -> MessageWriteBehind:
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = MessageWriteBehind(
+            flush_interval=getattr(settings, "CHAT_WRITE_BEHIND_FLUSH_MS", 5) / 1000,
+            max_batch=getattr(settings, "CHAT_WRITE_BEHIND_MAX_BATCH", 100),
+        )
+    return _write_behind
+
+
+def reset_write_behind() -> None:
+    """Drop the process-wide queue (tests, settings changes)."""
+    global _write_behind
+    _write_behind = None
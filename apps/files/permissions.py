@@ -14,12 +14,9 @@ class IsFileAccessible(permissions.BasePermission):
             return False
         if obj.uploaded_by_id == request.user.id:
             return True
-        from apps.rooms.models import RoomParticipant
+        from apps.rooms import membership
 
-        room_ids = obj.message_attachments.values_list(
-            "message__room_id", flat=True
-        ).distinct()
-        return RoomParticipant.objects.filter(
-            room_id__in=room_ids,
-            user=request.user,
-        ).exists()
+        room_ids = obj.message_attachments.values_list("message__room_id", flat=True).union(
+            obj.archived_attachments.values_list("message__room_id", flat=True)
+        )
+        return bool(membership.members((room_id, request.user.id) for room_id in room_ids))
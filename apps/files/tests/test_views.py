@@ -9,6 +9,7 @@ from apps.accounts.tests.factories import create_user
 
 
 @pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
 class TestFileAPI:
     def test_upload_201(self, api_client: APIClient):
         user = create_user(username="u")
@@ -105,3 +106,38 @@ class TestFileAPI:
         response = api_client.get(reverse("files:detail", kwargs={"pk": f.pk}))
         assert response.status_code == status.HTTP_200_OK
         assert response.data["name"] == "x.txt"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("media_root")
+class TestFileConditionalGet:
+    def test_detail_304_with_etag_or_last_modified(self):
+        from django.core.files.base import ContentFile
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        from apps.files.models import File
+        from apps.files.views import FileDetailView
+
+        user = create_user(username="u")
+        obj = File.objects.create(
+            uploaded_by=user,
+            file=ContentFile(b"x", name="x.txt"),
+            name="x.txt",
+            size=1,
+            content_type="text/plain",
+        )
+        view = FileDetailView.as_view()
+
+        def get(**headers):
+            request = APIRequestFactory().get(f"/api/files/{obj.pk}/", headers=headers)
+            force_authenticate(request, user=user)
+            return view(request, pk=obj.pk)
+
+        first = get()
+        assert first.status_code == status.HTTP_200_OK
+        assert get(if_none_match=first["ETag"]).status_code == status.HTTP_304_NOT_MODIFIED
+        assert get(if_modified_since=first["Last-Modified"]).status_code == status.HTTP_304_NOT_MODIFIED
+
+        obj.name = "y.txt"
+        obj.save()
+        assert get(if_none_match=first["ETag"]).status_code == status.HTTP_200_OK
@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.conditional import ConditionalGetMixin, make_version
+
 from .constants import ALLOWED_CONTENT_TYPES, MAX_UPLOAD_SIZE
 from .models import File
 from .permissions import IsFileAccessible
@@ -56,7 +58,7 @@ class FileUploadView(APIView):
         )
 
 
-class FileDetailView(APIView):
+class FileDetailView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, IsFileAccessible]
 
     def get_object(self):
@@ -65,4 +67,9 @@ class FileDetailView(APIView):
     def get(self, request, pk):
         obj = self.get_object()
         self.check_object_permissions(request, obj)
-        return Response(FileSerializer(obj).data)
+        return self.conditional_response(
+            request,
+            make_version(obj.pk, obj.updated_at),
+            lambda: Response(FileSerializer(obj).data),
+            last_modified=obj.updated_at,
+        )
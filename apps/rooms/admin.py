@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import Room, RoomParticipant
+from .models import DirectRoomKey, Room, RoomParticipant
 
 
 @admin.register(Room)
@@ -21,3 +21,9 @@ class RoomAdmin(admin.ModelAdmin):
 class RoomParticipantAdmin(admin.ModelAdmin):
     list_display = ("room", "user", "created_at")
     list_filter = ("room",)
+
+
+@admin.register(DirectRoomKey)
+class DirectRoomKeyAdmin(admin.ModelAdmin):
+    list_display = ("room", "user_low", "user_high", "created_at")
+    raw_id_fields = ("room", "user_low", "user_high")
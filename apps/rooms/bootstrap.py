@@ -0,0 +1,66 @@
+"""
+Sidebar bootstrap: the current user, every room with unread count, pin flag, last
+message preview and call presence, in one response (GET /api/bootstrap/).
+
+The response carries a version (also sent as a weak ETag) computed from a few cheap
+reads instead of the payload itself, so a conditional request that comes back 304
+costs three indexed queries and one cache get_many:
+
+- the caller's memberships with each room's updated_at and message_seq (new
+  messages, renames) and the caller's pin flag / read cursor per room;
+- count, id sum and latest updated_at of all memberships in those rooms, plus the
+  latest profile change among their users (joins, leaves, display names, avatars);
+- the caller's own profile;
+- call presence of every room (cache).
+"""
+
+from __future__ import annotations
+
+from apps.accounts.models import Profile
+from apps.calls.call_state import get_rooms_state
+from apps.chat.models import Message
+from core.conditional import make_version
+
+from .models import Room, RoomParticipant
+from .services import RoomService
+
+
+def bootstrap_state(user) -> tuple[str, list[int], dict]:
+    """Return (version, room_ids, call_states) for the user's sidebar."""
+    memberships = list(
+        RoomParticipant.objects.filter(user=user)
+        .order_by("room_id")
+        .values_list(
+            "room_id",
+            "room__updated_at",
+            "room__message_seq",
+            "is_pinned",
+            "last_read_message_id",
+        )
+    )
+    room_ids = [row[0] for row in memberships]
+    members = RoomService.membership_version(room_ids)
+    profile = Profile.objects.filter(user=user).values_list("updated_at", flat=True).first()
+    call_states = get_rooms_state(room_ids)
+
+    version = make_version(
+        user.pk,
+        user.username,
+        user.email,
+        profile,
+        memberships,
+        sorted(members.items()),
+        sorted(call_states.items()),
+    )
+    return version, room_ids, call_states
+
+
+def last_messages(room_ids) -> dict:
+    """Map room_id -> newest Message (author, profile and attachments loaded) for the rooms."""
+    last_ids = Room.objects.filter(pk__in=room_ids, last_message_id__isnull=False).values("last_message_id")
+    messages = (
+        Message.objects.filter(pk__in=last_ids)
+        .select_related("author", "author__profile")
+        .prefetch_related("attachments")
+    )
+    return {m.room_id: m for m in messages}
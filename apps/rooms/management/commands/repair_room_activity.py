@@ -0,0 +1,67 @@
+"""
+Recompute Room.last_message_id / last_activity_at from the messages themselves.
+
+MessageService keeps both fields current; run this after deleting messages outside
+the service, restoring a backup, or bulk imports. Rooms are processed in id order in
+batches; only rooms whose stored values differ are written. Usage:
+
+    python manage.py repair_room_activity --batch-size 500 [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from apps.chat.models import ArchivedMessage, Message
+from apps.rooms.models import Room
+
+
+def _newest(model, column):
+    rows = model.objects.filter(room=OuterRef("pk")).order_by("-created_at", "-id")
+    return Subquery(rows.values(column)[:1])
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized last-activity fields on rooms."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Report stale rooms without writing.")
+
+    def handle(self, *args, **options):
+        checked = 0
+        stale = []
+        last_id = 0
+        while True:
+            rows = list(
+                Room.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .annotate(
+                    hot_id=_newest(Message, "id"),
+                    hot_at=_newest(Message, "created_at"),
+                    # Rooms whose whole history was archived keep their last archived message.
+                    cold_id=_newest(ArchivedMessage, "id"),
+                    cold_at=_newest(ArchivedMessage, "created_at"),
+                )
+                .only("pk", "created_at", "last_message_id", "last_activity_at")[: options["batch_size"]]
+            )
+            if not rows:
+                break
+            last_id = rows[-1].pk
+            checked += len(rows)
+            batch = []
+            for room in rows:
+                if room.hot_id is not None:
+                    expected = (room.hot_id, room.hot_at)
+                elif room.cold_id is not None:
+                    expected = (room.cold_id, room.cold_at)
+                else:
+                    expected = (None, room.created_at)
+                if (room.last_message_id, room.last_activity_at) != expected:
+                    room.last_message_id, room.last_activity_at = expected
+                    batch.append(room)
+            stale += batch
+            if batch and not options["dry_run"]:
+                Room.objects.bulk_update(batch, ["last_message_id", "last_activity_at"])
+
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(f"{verb} {len(stale)} stale rooms out of {checked}.")
@@ -0,0 +1,151 @@
+"""
+Room membership cache behind RoomService.is_participant.
+
+Two tiers in front of the RoomParticipant table:
+
+- a per-process LRU of (room_id, user_id) pairs known to be members, bounded by
+  ROOM_MEMBERSHIP_CACHE_SIZE, entries living ROOM_MEMBERSHIP_CACHE_LOCAL_TTL seconds;
+- optionally (ROOM_MEMBERSHIP_CACHE_SHARED_ALIAS set), a shared Django cache holding
+  both answers under rooms:member:{room_id}:{user_id}.
+
+RoomParticipant post_save / post_delete (signals.py) evict the pair from both tiers
+once the change commits. Signals only reach the local tier of the process that made
+the change, so the local tier never caches "not a member" (a join is visible
+everywhere at once) and a removal reaches other processes within LOCAL_TTL. Writers
+that skip signals (bulk_create, queryset update/delete) must call invalidate()
+themselves, through transaction.on_commit.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import RoomParticipant
+
+SHARED_KEY_PREFIX = "rooms:member:"
+
+_local: OrderedDict[tuple[int, int], float] = OrderedDict()
+_lock = threading.Lock()
+_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+
+def _max_size() -> int:
+    return getattr(settings, "ROOM_MEMBERSHIP_CACHE_SIZE", 10_000)
+
+
+def _local_ttl() -> float:
+    return getattr(settings, "ROOM_MEMBERSHIP_CACHE_LOCAL_TTL", 30)
+
+
+def _shared():
+    alias = getattr(settings, "ROOM_MEMBERSHIP_CACHE_SHARED_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _shared_key(pair: tuple[int, int]) -> str:
+    return f"{SHARED_KEY_PREFIX}{pair[0]}:{pair[1]}"
+
+
+def _local_get(pair, now: float) -> bool:
+    with _lock:
+        expires = _local.get(pair)
+        if expires is None:
+            return False
+        if expires < now:
+            del _local[pair]
+            return False
+        _local.move_to_end(pair)
+        return True
+
+
+def _local_add(pairs, now: float) -> None:
+    ttl = _local_ttl()
+    if ttl <= 0:
+        return
+    limit = _max_size()
+    with _lock:
+        for pair in pairs:
+            _local[pair] = now + ttl
+            _local.move_to_end(pair)
+        while len(_local) > limit:
+            _local.popitem(last=False)
+
+
+def members(pairs) -> set[tuple[int, int]]:
+    """Subset of the given (room_id, user_id) pairs that are memberships."""
+    pending = set(pairs)
+    found = set()
+    now = time.monotonic()
+
+    local_hits = {pair for pair in pending if _local_get(pair, now)}
+    found |= local_hits
+    pending -= local_hits
+    _stats["local_hits"] += len(local_hits)
+
+    shared = _shared()
+    if pending and shared is not None:
+        keys = {_shared_key(pair): pair for pair in pending}
+        for key, value in shared.get_many(keys).items():
+            pair = keys[key]
+            pending.discard(pair)
+            _stats["shared_hits"] += 1
+            if value:
+                found.add(pair)
+                _local_add([pair], now)
+
+    if pending:
+        _stats["misses"] += len(pending)
+        rows = set(
+            RoomParticipant.objects.filter(
+                room_id__in={room_id for room_id, _ in pending},
+                user_id__in={user_id for _, user_id in pending},
+            )
+            .order_by()
+            .values_list("room_id", "user_id")
+        )
+        known = rows & pending
+        found |= known
+        _local_add(known, now)
+        if shared is not None:
+            shared.set_many(
+                {_shared_key(pair): int(pair in known) for pair in pending},
+                timeout=getattr(settings, "ROOM_MEMBERSHIP_CACHE_SHARED_TTL", 3600),
+            )
+    return found
+
+
+def is_member(room_id: int, user_id: int) -> bool:
+    return (room_id, user_id) in members([(room_id, user_id)])
+
+
+def invalidate(room_id: int, user_ids) -> None:
+    pairs = [(room_id, user_id) for user_id in user_ids]
+    with _lock:
+        for pair in pairs:
+            _local.pop(pair, None)
+    shared = _shared()
+    if shared is not None:
+        shared.delete_many([_shared_key(pair) for pair in pairs])
+
+
+def stats() -> dict:
+    """Lookup counters of this process; hit_rate counts both tiers."""
+    total = sum(_stats.values())
+    hits = _stats["local_hits"] + _stats["shared_hits"]
+    return {**_stats, "size": len(_local), "hit_rate": hits / total if total else 0.0}
+
+
+def reset_stats() -> None:
+    for name in _stats:
+        _stats[name] = 0
+
+
+def clear() -> None:
+    """Drop the local tier (tests, settings changes)."""
+    with _lock:
+        _local.clear()
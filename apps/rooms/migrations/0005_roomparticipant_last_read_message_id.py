@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0004_alter_roomparticipant_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomparticipant',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0005_roomparticipant_last_read_message_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='message_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
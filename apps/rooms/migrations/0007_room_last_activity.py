@@ -0,0 +1,48 @@
+"""
+Denormalize each room's newest message onto Room (last_message_id, last_activity_at).
+
+Backfilled with one UPDATE over correlated subqueries; rooms without messages get
+their creation time as last activity.
+"""
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_activity(apps, schema_editor):
+    Room = apps.get_model("rooms", "Room")
+    Message = apps.get_model("chat", "Message")
+
+    newest = Message.objects.filter(room=OuterRef("pk")).order_by("-created_at", "-id")
+    Room.objects.update(
+        last_message_id=Subquery(newest.values("id")[:1]),
+        last_activity_at=Coalesce(Subquery(newest.values("created_at")[:1]), F("created_at")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0006_room_message_seq"),
+        ("chat", "0007_message_seq"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="room",
+            name="last_activity_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="room",
+            name="last_message_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(fields=["-last_activity_at", "-id"], name="rooms_room_activity"),
+        ),
+    ]
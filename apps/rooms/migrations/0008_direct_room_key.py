@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0007_room_last_activity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirectRoomKey",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("room", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="direct_key", to="rooms.room")),
+                ("user_high", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+                ("user_low", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("user_low", "user_high"), name="rooms_direct_pair_uniq"), models.CheckConstraint(condition=models.Q(("user_low__lt", models.F("user_high"))), name="rooms_direct_pair_ordered")],
+            },
+        ),
+    ]
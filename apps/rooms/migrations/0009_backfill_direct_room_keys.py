@@ -0,0 +1,122 @@
+"""
+Create a DirectRoomKey for every existing direct room, merging duplicate DMs.
+
+A direct room gets a key when exactly two users still participate in it (the old
+lookup only matched such rooms). When several direct rooms share a pair, the oldest
+one is kept and the others are folded into it:
+
+- messages, archived messages and invitations move to the kept room, and messages
+  are renumbered (seq) in (created_at, id) order, archived ones first;
+- each user keeps the furthest read cursor and stays pinned if any copy was pinned;
+- search index rows follow their messages, last activity is recomputed, and the
+  duplicate rooms are deleted.
+
+Not reversible: merged rooms are not split again.
+"""
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 5000
+
+
+def _renumber(message_model, archived_model, room_id):
+    seq = 0
+    for model in (archived_model, message_model):
+        rows = model.objects.filter(room_id=room_id).order_by("created_at", "id").only("id")
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            seq += 1
+            row.seq = seq
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ["seq"])
+                batch = []
+        model.objects.bulk_update(batch, ["seq"])
+    return seq
+
+
+def _move_search_rows(connection, keeper, duplicates):
+    table = {"sqlite": "chat_message_fts", "postgresql": "chat_message_search"}.get(connection.vendor)
+    if table is None:
+        return
+    placeholders = ", ".join(["%s"] * len(duplicates))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET room_id = %s WHERE room_id IN ({placeholders})",
+            [keeper, *duplicates],
+        )
+
+
+def _merge(apps, connection, keeper, duplicates):
+    Room = apps.get_model("rooms", "Room")
+    RoomParticipant = apps.get_model("rooms", "RoomParticipant")
+    RoomInvitation = apps.get_model("rooms", "RoomInvitation")
+    Message = apps.get_model("chat", "Message")
+    ArchivedMessage = apps.get_model("chat", "ArchivedMessage")
+    all_rooms = [keeper, *duplicates]
+
+    participants = RoomParticipant.objects.filter(room_id__in=all_rooms)
+    pinned = set(participants.filter(is_pinned=True).values_list("user_id", flat=True))
+    cursors = participants.values("user_id").annotate(last_read=Max("last_read_message_id")).order_by()
+    for row in cursors:
+        RoomParticipant.objects.filter(room_id=keeper, user_id=row["user_id"]).update(
+            last_read_message_id=row["last_read"],
+            is_pinned=row["user_id"] in pinned,
+        )
+
+    # Clear seq first: moved rows would otherwise collide on (room, seq).
+    Message.objects.filter(room_id__in=all_rooms).update(seq=None)
+    ArchivedMessage.objects.filter(room_id__in=all_rooms).update(seq=None)
+    Message.objects.filter(room_id__in=duplicates).update(room_id=keeper)
+    ArchivedMessage.objects.filter(room_id__in=duplicates).update(room_id=keeper)
+    RoomInvitation.objects.filter(room_id__in=duplicates).update(room_id=keeper)
+    _move_search_rows(connection, keeper, duplicates)
+    message_seq = _renumber(Message, ArchivedMessage, keeper)
+
+    newest = (
+        Message.objects.filter(room_id=keeper).order_by("-created_at", "-id").first()
+        or ArchivedMessage.objects.filter(room_id=keeper).order_by("-created_at", "-id").first()
+    )
+    update = {"message_seq": message_seq}
+    if newest is not None:
+        update.update(last_message_id=newest.id, last_activity_at=newest.created_at)
+    Room.objects.filter(pk=keeper).update(**update)
+    Room.objects.filter(pk__in=duplicates).delete()
+
+
+def backfill_direct_keys(apps, schema_editor):
+    RoomParticipant = apps.get_model("rooms", "RoomParticipant")
+    DirectRoomKey = apps.get_model("rooms", "DirectRoomKey")
+
+    members = defaultdict(set)
+    rows = RoomParticipant.objects.filter(room__is_direct=True).values_list("room_id", "user_id")
+    for room_id, user_id in rows.iterator(chunk_size=BATCH_SIZE):
+        members[room_id].add(user_id)
+
+    pairs = defaultdict(list)
+    for room_id, users in members.items():
+        if len(users) == 2:
+            pairs[tuple(sorted(users))].append(room_id)
+
+    keys = []
+    for (low, high), room_ids in sorted(pairs.items()):
+        keeper, *duplicates = sorted(room_ids)
+        if duplicates:
+            _merge(apps, schema_editor.connection, keeper, duplicates)
+        keys.append(DirectRoomKey(room_id=keeper, user_low_id=low, user_high_id=high))
+    DirectRoomKey.objects.bulk_create(keys, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0008_direct_room_key"),
+        ("chat", "0007_message_seq"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
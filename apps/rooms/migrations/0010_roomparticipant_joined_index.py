@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0009_backfill_direct_room_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomparticipant',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='rooms_participant_joined'),
+        ),
+    ]
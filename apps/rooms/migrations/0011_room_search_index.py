@@ -0,0 +1,108 @@
+"""
+Indexes for room search (see apps/rooms/search.py).
+
+SQLite: FTS5 tables rooms_room_fts (room names, rowid = room id) and rooms_member_fts
+(username and display name, rowid = user id), filled here and kept in sync by triggers
+on rooms_room, the user table and accounts_profile.
+PostgreSQL: pg_trgm GIN indexes on UPPER(name), UPPER(username) and UPPER(display_name),
+the expressions Django's icontains lookups compile to.
+"""
+
+from django.conf import settings
+from django.db import migrations
+
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+
+
+def sqlite_create(user_table):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS rooms_room_fts USING fts5(name, {TOKENIZE})",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS rooms_member_fts USING fts5(username, display_name, {TOKENIZE})",
+        "INSERT INTO rooms_room_fts (rowid, name) SELECT id, name FROM rooms_room",
+        "INSERT INTO rooms_member_fts (rowid, username, display_name) "
+        f"SELECT u.id, u.username, COALESCE(p.display_name, '') FROM {user_table} u "
+        "LEFT JOIN accounts_profile p ON p.user_id = u.id",
+        "CREATE TRIGGER rooms_room_fts_ai AFTER INSERT ON rooms_room BEGIN "
+        "INSERT INTO rooms_room_fts (rowid, name) VALUES (NEW.id, NEW.name); END",
+        "CREATE TRIGGER rooms_room_fts_au AFTER UPDATE OF name ON rooms_room BEGIN "
+        "UPDATE rooms_room_fts SET name = NEW.name WHERE rowid = NEW.id; END",
+        "CREATE TRIGGER rooms_room_fts_ad AFTER DELETE ON rooms_room BEGIN "
+        "DELETE FROM rooms_room_fts WHERE rowid = OLD.id; END",
+        f"CREATE TRIGGER rooms_member_fts_user_ai AFTER INSERT ON {user_table} BEGIN "
+        "INSERT INTO rooms_member_fts (rowid, username, display_name) VALUES (NEW.id, NEW.username, ''); END",
+        f"CREATE TRIGGER rooms_member_fts_user_au AFTER UPDATE OF username ON {user_table} BEGIN "
+        "UPDATE rooms_member_fts SET username = NEW.username WHERE rowid = NEW.id; END",
+        f"CREATE TRIGGER rooms_member_fts_user_ad AFTER DELETE ON {user_table} BEGIN "
+        "DELETE FROM rooms_member_fts WHERE rowid = OLD.id; END",
+        "CREATE TRIGGER rooms_member_fts_profile_ai AFTER INSERT ON accounts_profile BEGIN "
+        "UPDATE rooms_member_fts SET display_name = NEW.display_name WHERE rowid = NEW.user_id; END",
+        "CREATE TRIGGER rooms_member_fts_profile_au AFTER UPDATE OF display_name ON accounts_profile BEGIN "
+        "UPDATE rooms_member_fts SET display_name = NEW.display_name WHERE rowid = NEW.user_id; END",
+        "CREATE TRIGGER rooms_member_fts_profile_ad AFTER DELETE ON accounts_profile BEGIN "
+        "UPDATE rooms_member_fts SET display_name = '' WHERE rowid = OLD.user_id; END",
+    ]
+
+
+SQLITE_DROP = [
+    *(
+        f"DROP TRIGGER IF EXISTS {name}"
+        for name in (
+            "rooms_room_fts_ai",
+            "rooms_room_fts_au",
+            "rooms_room_fts_ad",
+            "rooms_member_fts_user_ai",
+            "rooms_member_fts_user_au",
+            "rooms_member_fts_user_ad",
+            "rooms_member_fts_profile_ai",
+            "rooms_member_fts_profile_au",
+            "rooms_member_fts_profile_ad",
+        )
+    ),
+    "DROP TABLE IF EXISTS rooms_room_fts",
+    "DROP TABLE IF EXISTS rooms_member_fts",
+]
+
+
+def postgres_create(user_table):
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS rooms_room_name_trgm ON rooms_room USING GIN (UPPER(name) gin_trgm_ops)",
+        f"CREATE INDEX IF NOT EXISTS rooms_user_username_trgm ON {user_table} "
+        "USING GIN (UPPER(username) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS rooms_profile_display_name_trgm ON accounts_profile "
+        "USING GIN (UPPER(display_name) gin_trgm_ops)",
+    ]
+
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS rooms_room_name_trgm",
+    "DROP INDEX IF EXISTS rooms_user_username_trgm",
+    "DROP INDEX IF EXISTS rooms_profile_display_name_trgm",
+]
+
+
+def create_index(apps, schema_editor):
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": sqlite_create, "postgresql": postgres_create}.get(vendor)
+    for sql in statements(user_table) if statements else []:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0010_roomparticipant_joined_index"),
+        ("accounts", "0002_profile_avatar"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0011_room_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomparticipant',
+            index=models.Index(fields=['user', 'room'], include=('is_pinned', 'last_read_message_id'), name='rooms_participant_user_room'),
+        ),
+    ]
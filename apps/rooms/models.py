@@ -15,9 +15,18 @@ class Room(TimestampedModel):
         related_name="owned_rooms",
     )
     is_direct = models.BooleanField(default=False)
+    # Last Message.seq handed out in this room (see MessageService); used for resume.
+    message_seq = models.BigIntegerField(default=0)
+    # Newest message and when it was sent (creation time while the room is empty).
+    # Kept up to date by MessageService; `manage.py repair_room_activity` recomputes them.
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+    last_activity_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-last_activity_at", "-id"], name="rooms_room_activity"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -37,15 +46,66 @@ class RoomParticipant(TimestampedModel):
         related_name="room_participations",
     )
     is_pinned = models.BooleanField(default=False)
+    # Read cursor: every message in the room with id <= this value counts as read
+    # by the user. Replaces one Message.read_by row per message per reader.
+    last_read_message_id = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = [["room", "user"]]
         ordering = ["-is_pinned", "created_at"]
+        indexes = [
+            # Participant list keyset pagination and participant previews, in join order.
+            models.Index(fields=["room", "created_at", "id"], name="rooms_participant_joined"),
+            # A user's memberships in room order (bootstrap, room listing); on PostgreSQL
+            # the included columns make those reads index-only.
+            models.Index(
+                fields=["user", "room"],
+                include=["is_pinned", "last_read_message_id"],
+                name="rooms_participant_user_room",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} in {self.room}"
 
 
+class DirectRoomKey(TimestampedModel):
+    """
+    Canonical key of a direct (DM) room: its two users, lower id first. The unique
+    pair makes finding a DM one index probe and lets concurrent creators collide on
+    insert instead of creating duplicates. Removed when either user leaves the room,
+    so the next DM between them starts a new room.
+    """
+
+    room = models.OneToOneField(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="direct_key",
+    )
+    user_low = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    user_high = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_low", "user_high"], name="rooms_direct_pair_uniq"),
+            models.CheckConstraint(
+                condition=models.Q(user_low__lt=models.F("user_high")),
+                name="rooms_direct_pair_ordered",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"DM {self.user_low_id}:{self.user_high_id} -> {self.room_id}"
+
+
 class RoomInvitation(TimestampedModel):
     """Invitation link to a room."""
 
@@ -1,5 +1,6 @@
 from rest_framework import permissions
 
+from . import membership
 from .models import Room
 
 
@@ -10,7 +11,7 @@ class IsRoomParticipant(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         if isinstance(obj, Room):
-            return obj.participants.filter(user=request.user).exists()
+            return membership.is_member(obj.pk, request.user.pk)
         return False
 
 
@@ -0,0 +1,46 @@
+"""
+Room presence groups: every NotificationConsumer connection of a user is in
+room_presence_{room_id} for each room the user belongs to, so a presence update
+(room_presence_update) is one group_send per room instead of one per member.
+
+NotificationConsumer joins the groups of the user's rooms on connect. Membership
+changes made while it is connected reach it as presence.subscribe /
+presence.unsubscribe events on the user_{id} group: RoomParticipant post_save /
+post_delete (signals.py) send them once the change commits, writers that skip
+signals (bulk_create) call subscribe() themselves through transaction.on_commit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def group_name(room_id: int) -> str:
+    return f"room_presence_{room_id}"
+
+
+def _send(event_type: str, room_id: int, user_ids) -> None:
+    channel_layer = get_channel_layer()
+    user_ids = list(user_ids)
+    if not channel_layer or not user_ids:
+        return
+    event = {"type": event_type, "room_id": int(room_id)}
+
+    async def fan_out():
+        await asyncio.gather(*(channel_layer.group_send(f"user_{user_id}", event) for user_id in user_ids))
+
+    async_to_sync(fan_out)()
+
+
+def subscribe(room_id: int, user_ids) -> None:
+    """Add the connected sockets of these users to the room's presence group."""
+    _send("presence.subscribe", room_id, user_ids)
+
+
+def unsubscribe(room_id: int, user_ids) -> None:
+    """Remove the connected sockets of these users from the room's presence group."""
+    _send("presence.unsubscribe", room_id, user_ids)
+
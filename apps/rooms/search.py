@@ -0,0 +1,76 @@
+"""
+Room search: rooms of the caller whose name matches, or where another participant's
+username or display name matches (GET /api/rooms/search/?q=).
+
+- SQLite: FTS5 tables rooms_room_fts (rowid = room id) and rooms_member_fts
+  (rowid = user id), maintained by triggers; every word of q must match as a word prefix.
+- PostgreSQL: icontains lookups backed by pg_trgm GIN indexes on UPPER(column); every
+  word of q must occur as a substring (terms under 3 characters cannot use the index).
+- Any other backend: the same icontains lookups, unindexed.
+
+Tables, triggers and indexes are created by migration rooms 0011.
+"""
+
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Exists, OuterRef, Prefetch, Q, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+
+from .models import RoomParticipant
+from .serializers import participant_queryset
+from .services import RoomService
+
+User = get_user_model()
+
+ROOM_TABLE = "rooms_room_fts"
+MEMBER_TABLE = "rooms_member_fts"
+
+
+def backend() -> str:
+    return {"sqlite": "fts5", "postgresql": "trigram"}.get(connection.vendor, "scan")
+
+
+def prefix_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in q.split())
+
+
+def _room_name_filter(q: str) -> Q:
+    if backend() == "fts5":
+        return Q(pk__in=RawSQL(f"SELECT rowid FROM {ROOM_TABLE} WHERE {ROOM_TABLE} MATCH %s", (prefix_query(q),)))
+    condition = Q()
+    for term in q.split():
+        condition &= Q(name__icontains=term)
+    return condition
+
+
+def matching_user_ids(q: str):
+    """Subquery of ids of users whose username or display name matches q."""
+    if backend() == "fts5":
+        return RawSQL(f"SELECT rowid FROM {MEMBER_TABLE} WHERE {MEMBER_TABLE} MATCH %s", (prefix_query(q),))
+    users = User.objects.all()
+    for term in q.split():
+        users = users.filter(Q(username__icontains=term) | Q(profile__display_name__icontains=term))
+    return users.values("pk")
+
+
+def search_rooms(user, q: str):
+    """
+    rooms_for_listing(user) narrowed to rooms whose name matches q or that have another
+    participant matching q (the caller matching their own name would return every room).
+    """
+    members = RoomParticipant.objects.filter(
+        room=OuterRef("pk"), user_id__in=matching_user_ids(q)
+    ).exclude(user=user)
+    return RoomService.rooms_for_listing(user).filter(_room_name_filter(q) | Exists(members))
+
+
+def attach_matched_participants(rooms, user, q: str, limit: int) -> None:
+    """Set room.matched_participants: up to limit participants per room matching q (one query)."""
+    queryset = participant_queryset().filter(user_id__in=matching_user_ids(q)).exclude(user=user)
+    prefetch_related_objects(
+        rooms,
+        Prefetch("participants", queryset=queryset[:limit], to_attr="matched_participants"),
+    )
@@ -8,6 +8,20 @@ from .models import Room, RoomParticipant
 User = get_user_model()
 
 
+def participant_queryset():
+    """Participants in join order with users and profiles."""
+    return RoomParticipant.objects.select_related("user", "user__profile").order_by("created_at", "id")
+
+
+def participant_summary(participant: RoomParticipant) -> dict:
+    user = participant.user
+    return {
+        "id": user.id,
+        "username": user.username,
+        "display_name": user.profile.display_name if hasattr(user, "profile") else user.username,
+    }
+
+
 class RoomParticipantSerializer(serializers.ModelSerializer):
     """Participant in a room."""
 
@@ -20,7 +34,11 @@ class RoomParticipantSerializer(serializers.ModelSerializer):
         fields = ("id", "user", "joined_at", "is_admin")
 
     def get_is_admin(self, obj: RoomParticipant) -> bool:
-        return obj.room.owner_id == obj.user_id
+        # Lists pass the room's owner_id in the context instead of loading obj.room per row.
+        owner_id = self.context.get("room_owner_id")
+        if owner_id is None:
+            owner_id = obj.room.owner_id
+        return owner_id == obj.user_id
 
 
 class RoomSerializer(serializers.ModelSerializer):
@@ -31,47 +49,90 @@ class RoomSerializer(serializers.ModelSerializer):
     active_call_participants = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
     is_pinned = serializers.SerializerMethodField()
-    participant_users = serializers.SerializerMethodField()
 
     class Meta:
         model = Room
-        fields = ("id", "name", "owner", "participant_count", "active_call_participants", "unread_count", "is_pinned", "participant_users", "is_direct", "created_at", "updated_at")
+        fields = ("id", "name", "owner", "participant_count", "active_call_participants", "unread_count", "is_pinned", "is_direct", "last_activity_at", "created_at", "updated_at")
+
+    # Rooms from RoomService.rooms_for_listing carry annotations and the list view
+    # passes context["call_states"]; each getter falls back to its own query for a
+    # bare Room (detail, create, notifications). Members are not embedded: page them
+    # at /api/rooms/{id}/participants/ or find them with /api/rooms/search/.
 
     def get_participant_count(self, obj: Room) -> int:
+        if hasattr(obj, "num_participants"):
+            return obj.num_participants
         return obj.participants.count()
 
     def get_active_call_participants(self, obj: Room) -> list[str]:
-        from apps.calls.call_state import get_room_state
-        participants = get_room_state(obj.id)
+        call_states = self.context.get("call_states")
+        if call_states is not None and obj.id in call_states:
+            participants = call_states[obj.id]
+        else:
+            from apps.calls.call_state import get_room_state
+            participants = get_room_state(obj.id)
         # Return list of usernames for simplicity
         return [p["username"] for p in participants if p.get("state") in ("active", "connecting")]
 
     def get_unread_count(self, obj: Room) -> int:
+        if hasattr(obj, "viewer_unread_count"):
+            return obj.viewer_unread_count
         user = self.context.get("request") and self.context["request"].user
         if not user or not user.is_authenticated:
             return 0
-        # Count messages that are NOT from the current user and that the user has NOT read.
-        return obj.messages.exclude(author=user).exclude(read_by=user).count()
+        # Messages from others above the user's read cursor.
+        from apps.chat.services import MessageService
+        return MessageService.unread_count(obj, user)
 
     def get_is_pinned(self, obj: Room) -> bool:
+        if hasattr(obj, "viewer_is_pinned"):
+            return obj.viewer_is_pinned
         user = self.context.get("request") and self.context["request"].user
         if not user or not user.is_authenticated:
             return False
         participant = obj.participants.filter(user=user).first()
         return participant.is_pinned if participant else False
 
-    def get_participant_users(self, obj: Room) -> list[dict]:
-        """Return basic info about participants for search purposes."""
-        # Limit to first 10 participants to keep payload small, or all if it's a direct chat
-        participants = obj.participants.select_related("user", "user__profile").all()
-        return [
-            {
-                "id": p.user.id,
-                "username": p.user.username,
-                "display_name": p.user.profile.display_name if hasattr(p.user, "profile") else p.user.username,
-            }
-            for p in participants
-        ]
+
+class BootstrapRoomSerializer(RoomSerializer):
+    """RoomSerializer plus a preview of the newest message (context["last_messages"])."""
+
+    PREVIEW_LENGTH = 100
+
+    last_message = serializers.SerializerMethodField()
+
+    class Meta(RoomSerializer.Meta):
+        fields = RoomSerializer.Meta.fields + ("last_message",)
+
+    def get_last_message(self, obj: Room) -> dict | None:
+        message = self.context.get("last_messages", {}).get(obj.id)
+        if message is None:
+            return None
+        author = message.author
+        display_name = author.profile.display_name if hasattr(author, "profile") else ""
+        return {
+            "id": message.id,
+            "seq": message.seq,
+            "author_id": author.id,
+            "author_display_name": display_name or author.username,
+            "content": message.content[: self.PREVIEW_LENGTH],
+            "has_attachments": bool(message.attachments.all()),
+            "created_at": serializers.DateTimeField().to_representation(message.created_at),
+        }
+
+
+class RoomSearchSerializer(RoomSerializer):
+    """RoomSerializer plus the participants that matched the search (search.attach_matched_participants)."""
+
+    MATCHED_USERS_LIMIT = 5
+
+    matched_users = serializers.SerializerMethodField()
+
+    class Meta(RoomSerializer.Meta):
+        fields = RoomSerializer.Meta.fields + ("matched_users",)
+
+    def get_matched_users(self, obj: Room) -> list[dict]:
+        return [participant_summary(p) for p in getattr(obj, "matched_participants", [])]
 
 
 class CreateRoomSerializer(serializers.Serializer):
@@ -120,3 +181,21 @@ class RemoveParticipantSerializer(serializers.Serializer):
         if not attrs.get("id") and not attrs.get("username") and not attrs.get("email"):
             raise serializers.ValidationError("Provide id, username, or email.")
         return attrs
+
+
+class BulkParticipantsSerializer(serializers.Serializer):
+    """Input for adding or removing many participants at once by ids, usernames and emails."""
+
+    MAX_USERS = 500
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    emails = serializers.ListField(child=serializers.EmailField(), required=False, default=list)
+
+    def validate(self, attrs):
+        total = len(attrs["ids"]) + len(attrs["usernames"]) + len(attrs["emails"])
+        if not total:
+            raise serializers.ValidationError("Provide ids, usernames, or emails.")
+        if total > self.MAX_USERS:
+            raise serializers.ValidationError(f"At most {self.MAX_USERS} users per request.")
+        return attrs
@@ -1,12 +1,19 @@
+import asyncio
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from datetime import timedelta
+from functools import partial
+from django.db.models import Count, F, FilteredRelation, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 
-from .models import Room, RoomParticipant, RoomInvitation
+from . import membership, presence
+from .models import DirectRoomKey, Room, RoomParticipant, RoomInvitation
 from .serializers import RoomSerializer
 
 User = get_user_model()
@@ -47,23 +54,47 @@ class RoomService:
     """Room and participant management."""
 
     @staticmethod
-    def _notify_participant_added(room: Room, user: User) -> None:
-        """Send a real-time notification to the added user."""
+    def _notify_participants_added(room: Room, users) -> None:
+        """
+        Send a real-time room_added notification to each added user. The room is
+        serialized once and every group_send runs in one event-loop pass.
+        """
         channel_layer = get_channel_layer()
-        if not channel_layer:
+        if not channel_layer or not users:
             return
 
-        room_data = RoomSerializer(room).data
-        async_to_sync(channel_layer.group_send)(
-            f"user_{user.id}",
-            {
-                "type": "notification",
-                "data": {
-                    "type": "room_added",
-                    "room": room_data
-                }
-            }
+        event = {
+            "type": "notification",
+            "data": {
+                "type": "room_added",
+                "room": RoomSerializer(room).data,
+            },
+        }
+
+        async def fan_out():
+            await asyncio.gather(*(channel_layer.group_send(f"user_{user.id}", event) for user in users))
+
+        async_to_sync(fan_out)()
+
+    @staticmethod
+    def resolve_users(ids=(), usernames=(), emails=()) -> dict:
+        """
+        Look up users by id, username and email in one query. Returns a dict keyed by
+        ("id", value), ("username", value) and ("email", value); unknown ones are missing.
+        """
+        if not (ids or usernames or emails):
+            return {}
+        users = User.objects.filter(
+            Q(pk__in=ids) | Q(username__in=usernames) | Q(email__in=emails)
         )
+        ids, usernames, emails = set(ids), set(usernames), set(emails)
+        found = {}
+        for user in users:
+            for field, wanted in (("id", ids), ("username", usernames), ("email", emails)):
+                value = getattr(user, field)
+                if value in wanted:
+                    found[(field, value)] = user
+        return found
 
     @staticmethod
     def create_room(owner: User, name: str, **kwargs) -> Room:
@@ -79,9 +110,46 @@ class RoomService:
             raise ValidationError(detail={"user": ["User is already a participant in this room."]})
         participant = RoomParticipant.objects.create(room=room, user=user)
         # AICODE-NOTE: Notify user in real-time (#2)
-        RoomService._notify_participant_added(room, user)
+        RoomService._notify_participants_added(room, [user])
         return participant
 
+    @staticmethod
+    def add_participants(room: Room, users) -> set[int]:
+        """
+        Add many users to the room; existing participants are skipped. Returns the ids
+        of the users added. One query for existing members, one bulk insert, one to
+        read back which rows the insert created.
+        """
+        users = list({user.pk: user for user in users}.values())
+        existing = set(
+            RoomParticipant.objects.filter(room=room, user__in=users).values_list("user_id", flat=True)
+        )
+        new = [user for user in users if user.pk not in existing]
+        if not new:
+            return set()
+        # ignore_conflicts: a concurrent single add of the same user is not an error.
+        rows = [RoomParticipant(room=room, user=user) for user in new]
+        RoomParticipant.objects.bulk_create(rows, ignore_conflicts=True)
+        # The insert returns no ids, so tell our rows from ones a concurrent add got in
+        # first by the created_at bulk_create stamped on each instance.
+        stamps = {row.user_id: row.created_at for row in rows}
+        created = {
+            user_id
+            for user_id, created_at in RoomParticipant.objects.filter(
+                room=room, user_id__in=stamps
+            ).values_list("user_id", "created_at")
+            if created_at == stamps[user_id]
+        }
+        new = [user for user in new if user.pk in created]
+        if not new:
+            return set()
+        # bulk_create sends no post_save; evict and subscribe explicitly (on commit, as signals.py).
+        added = [user.pk for user in new]
+        transaction.on_commit(partial(membership.invalidate, room.pk, added))
+        transaction.on_commit(partial(presence.subscribe, room.pk, added))
+        RoomService._notify_participants_added(room, new)
+        return {user.pk for user in new}
+
     @staticmethod
     def remove_participant(room: Room, user: User) -> None:
         """Remove user from room. Raises ValidationError if not a participant."""
@@ -89,35 +157,116 @@ class RoomService:
             RoomParticipant.objects.get(room=room, user=user).delete()
         except RoomParticipant.DoesNotExist:
             raise ValidationError(detail={"user": ["User is not a participant in this room."]})
+        if room.is_direct:
+            # The pair no longer shares this room; a new DM between them starts fresh.
+            DirectRoomKey.objects.filter(room=room).delete()
+
+    @staticmethod
+    def remove_participants(room: Room, users) -> set[int]:
+        """Remove many users from the room; non-participants are skipped. Returns the ids removed."""
+        participants = RoomParticipant.objects.filter(room=room, user__in=list(users))
+        removed = set(participants.values_list("user_id", flat=True))
+        if not removed:
+            return set()
+        # Queryset delete still sends post_delete per row: signals.py evicts and unsubscribes.
+        participants.delete()
+        if room.is_direct:
+            DirectRoomKey.objects.filter(room=room).delete()
+        return removed
+
+    @staticmethod
+    def rooms_for_listing(user: User):
+        """
+        Rooms the user participates in, annotated with everything RoomSerializer needs
+        so a page of rooms costs a constant number of queries: participant count, the
+        user's pin flag and unread count (annotations), owner and owner profile (join).
+        """
+        from apps.chat.models import Message
+
+        def count(queryset):
+            return Coalesce(
+                Subquery(
+                    queryset.order_by().values("room_id").annotate(n=Count("*")).values("n"),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+
+        return (
+            Room.objects.annotate(
+                membership=FilteredRelation("participants", condition=Q(participants__user=user)),
+            )
+            .filter(membership__isnull=False)
+            .select_related("owner", "owner__profile")
+            .annotate(
+                viewer_is_pinned=F("membership__is_pinned"),
+                viewer_last_read=F("membership__last_read_message_id"),
+                num_participants=count(RoomParticipant.objects.filter(room=OuterRef("pk"))),
+            )
+            .annotate(
+                viewer_unread_count=count(
+                    Message.objects.filter(room=OuterRef("pk"), id__gt=OuterRef("viewer_last_read"))
+                    .exclude(author=user)
+                ),
+            )
+        )
+
+    @staticmethod
+    def membership_version(room_ids, viewer: User | None = None) -> dict:
+        """
+        Cheap version of the participant lists of the rooms, one aggregate query: count
+        and user id sum (joins, leaves), latest participant row change, latest profile
+        change among the participants (display names, avatars). With viewer, also the
+        viewer's read cursor and pin flag, which change without touching updated_at.
+        """
+        aggregates = {
+            "count": Count("id"),
+            "ids": Sum("user_id"),
+            "changed": Max("updated_at"),
+            "profiles": Max("user__profile__updated_at"),
+        }
+        if viewer is not None:
+            aggregates["viewer_read"] = Max("last_read_message_id", filter=Q(user=viewer))
+            aggregates["viewer_pinned"] = Count("id", filter=Q(user=viewer, is_pinned=True))
+        return RoomParticipant.objects.filter(room_id__in=room_ids).aggregate(**aggregates)
 
     @staticmethod
     def is_participant(room: Room, user: User) -> bool:
-        return RoomParticipant.objects.filter(room=room, user=user).exists()
+        """Cached membership check (see membership.py)."""
+        return membership.is_member(room.pk, user.pk)
 
     @staticmethod
     def get_or_create_direct_room(user1: User, user2: User) -> Room:
-        """Get existing or create a new direct room between two users."""
+        """
+        Get existing or create a new direct room between two users.
+        Looks up DirectRoomKey by the ordered id pair (one unique-index probe); a
+        concurrent request creating the same DM loses on the unique pair and returns
+        the winner's room.
+        """
         if user1.id == user2.id:
             raise ValidationError(detail={"user": ["Cannot create a direct room with yourself."]})
 
-        # Search for existing direct room
-        existing_rooms = Room.objects.filter(
-            is_direct=True,
-            participants__user=user1
-        ).filter(
-            participants__user=user2
-        ).distinct()
+        low, high = sorted((user1.id, user2.id))
+        key = DirectRoomKey.objects.select_related("room").filter(user_low_id=low, user_high_id=high).first()
+        if key is not None:
+            return key.room
 
-        if existing_rooms.exists():
-            return existing_rooms.first()
-
-        # Create new direct room
         room_name = f"DM: {user1.username} & {user2.username}"
-        room = Room.objects.create(owner=user1, name=room_name, is_direct=True)
-        RoomParticipant.objects.create(room=room, user=user1)
-        RoomParticipant.objects.create(room=room, user=user2)
+        try:
+            with transaction.atomic():
+                room = Room.objects.create(owner=user1, name=room_name, is_direct=True)
+                RoomParticipant.objects.bulk_create([
+                    RoomParticipant(room=room, user=user1),
+                    RoomParticipant(room=room, user=user2),
+                ])
+                DirectRoomKey.objects.create(room=room, user_low_id=low, user_high_id=high)
+            # bulk_create sends no post_save; evict and subscribe explicitly (on commit, as signals.py).
+            transaction.on_commit(partial(membership.invalidate, room.pk, [low, high]))
+            transaction.on_commit(partial(presence.subscribe, room.pk, [low, high]))
+        except IntegrityError:
+            return DirectRoomKey.objects.select_related("room").get(user_low_id=low, user_high_id=high).room
 
         # Notify user2 about new DM
-        RoomService._notify_participant_added(room, user2)
+        RoomService._notify_participants_added(room, [user2])
 
         return room
@@ -0,0 +1,34 @@
+"""
+Keep derived membership state in step with RoomParticipant: evict the membership cache
+(membership.py) and move the user's notification sockets in or out of the room's
+presence group (presence.py).
+
+Both run once the change commits: evicting earlier lets a concurrent reader cache the
+old answer again, and a socket subscribed to a room whose insert then rolls back would
+keep receiving its presence.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import membership, presence
+from .models import RoomParticipant
+
+
+@receiver([post_save, post_delete], sender=RoomParticipant)
+def evict_membership(sender, instance, **kwargs):
+    transaction.on_commit(partial(membership.invalidate, instance.room_id, [instance.user_id]))
+
+
+@receiver(post_save, sender=RoomParticipant)
+def subscribe_presence(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(presence.subscribe, instance.room_id, [instance.user_id]))
+
+
+@receiver(post_delete, sender=RoomParticipant)
+def unsubscribe_presence(sender, instance, **kwargs):
+    transaction.on_commit(partial(presence.unsubscribe, instance.room_id, [instance.user_id]))
@@ -0,0 +1,84 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import create_user
+from apps.calls.call_state import STATE_ACTIVE, set_user_state
+from apps.chat.services import MessageService
+from apps.rooms.models import RoomParticipant
+from apps.rooms.services import RoomService
+from apps.rooms.tests.factories import create_room
+
+
+def _seed(n=3):
+    user = create_user(username="u")
+    rooms = []
+    for i in range(n):
+        other = create_user(username=f"o{i}")
+        room = create_room(owner=other, name=f"Room {i}")
+        RoomParticipant.objects.create(room=room, user=user)
+        rooms.append((room, other))
+    return user, rooms
+
+
+@pytest.mark.django_db
+class TestBootstrap:
+    def test_returns_user_and_rooms(self, api_client: APIClient):
+        user, rooms = _seed()
+        room, other = rooms[0]
+        MessageService.send_message(room=room, author=other, content="hello " * 40)
+        set_user_state(room.id, other.id, other.username, STATE_ACTIVE)
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(reverse("bootstrap"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] == f'W/"{response.data["version"]}"'
+        assert response.data["user"]["id"] == user.id
+        by_id = {r["id"]: r for r in response.data["rooms"]}
+        assert set(by_id) == {r.id for r, _ in rooms}
+        first = by_id[room.id]
+        assert first["unread_count"] == 1
+        assert first["active_call_participants"] == [other.username]
+        assert first["last_message"]["author_id"] == other.id
+        assert len(first["last_message"]["content"]) == 100
+        assert by_id[rooms[1][0].id]["last_message"] is None
+
+    def test_not_modified(self, api_client: APIClient, django_assert_num_queries):
+        user, _ = _seed()
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(reverse("bootstrap"))["ETag"]
+
+        # memberships, co-members aggregate, own profile; no serialization
+        with django_assert_num_queries(3):
+            response = api_client.get(reverse("bootstrap"), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+    @pytest.mark.parametrize("change", ["message", "read", "pin", "join", "call", "rename"])
+    def test_version_changes(self, api_client: APIClient, change):
+        user, rooms = _seed()
+        room, other = rooms[0]
+        MessageService.send_message(room=room, author=other, content="first")
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(reverse("bootstrap"))["ETag"]
+
+        if change == "message":
+            MessageService.send_message(room=room, author=other, content="second")
+        elif change == "read":
+            MessageService.mark_read(room, user)
+        elif change == "pin":
+            participant = RoomParticipant.objects.get(room=room, user=user)
+            participant.is_pinned = True
+            participant.save()
+        elif change == "join":
+            RoomService.add_participant(room, create_user(username="newcomer"))
+        elif change == "call":
+            set_user_state(room.id, other.id, other.username, STATE_ACTIVE)
+        elif change == "rename":
+            room.name = "Renamed"
+            room.save()
+
+        response = api_client.get(reverse("bootstrap"), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
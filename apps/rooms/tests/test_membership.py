@@ -0,0 +1,134 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from apps.rooms import membership
+from apps.rooms.services import RoomService
+
+from .factories import create_room
+
+User = get_user_model()
+
+
+@pytest.fixture
+def users(db):
+    return [
+        User.objects.create_user(username=f"u{i}", email=f"u{i}@ex.com", password="p")
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestMembershipCache:
+    def test_member_lookup_hits_local_tier(self, users, django_assert_num_queries):
+        room = create_room(owner=users[0])
+        membership.reset_stats()
+        with django_assert_num_queries(1):
+            assert RoomService.is_participant(room, users[0])
+        with django_assert_num_queries(0):
+            assert RoomService.is_participant(room, users[0])
+        stats = membership.stats()
+        assert stats["local_hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_non_member_is_not_cached_locally(self, users, django_assert_num_queries):
+        room = create_room(owner=users[0])
+        assert not RoomService.is_participant(room, users[1])
+        # A join in another process must be visible immediately, so "no" is always re-checked.
+        with django_assert_num_queries(1):
+            assert not RoomService.is_participant(room, users[1])
+
+    def test_add_participant_visible_after_negative_lookup(self, users):
+        room = create_room(owner=users[0])
+        assert not RoomService.is_participant(room, users[1])
+        RoomService.add_participant(room, users[1])
+        assert RoomService.is_participant(room, users[1])
+
+    def test_remove_participant_evicts(self, users, django_capture_on_commit_callbacks):
+        room = create_room(owner=users[0])
+        RoomService.add_participant(room, users[1])
+        assert RoomService.is_participant(room, users[1])
+        with django_capture_on_commit_callbacks(execute=True):
+            RoomService.remove_participant(room, users[1])
+        assert not RoomService.is_participant(room, users[1])
+
+    def test_eviction_waits_for_commit(self, users, django_capture_on_commit_callbacks):
+        room = create_room(owner=users[0])
+        RoomService.add_participant(room, users[1])
+        assert RoomService.is_participant(room, users[1])
+        with django_capture_on_commit_callbacks() as callbacks:
+            RoomService.remove_participant(room, users[1])
+            # Still cached: evicting before commit would let a reader cache the old row again.
+            assert (room.pk, users[1].pk) in membership._local
+        for callback in callbacks:
+            callback()
+        assert not RoomService.is_participant(room, users[1])
+
+    def test_room_delete_evicts(self, users, django_capture_on_commit_callbacks):
+        room = create_room(owner=users[0])
+        assert RoomService.is_participant(room, users[0])
+        room_id = room.pk
+        with django_capture_on_commit_callbacks(execute=True):
+            room.delete()
+        assert not membership.is_member(room_id, users[0].pk)
+
+    def test_direct_room_members(self, users):
+        direct = RoomService.get_or_create_direct_room(users[0], users[1])
+        assert RoomService.is_participant(direct, users[0])
+        assert RoomService.is_participant(direct, users[1])
+
+    def test_members_batches_lookups(self, users, django_assert_num_queries):
+        a = create_room(owner=users[0])
+        b = create_room(owner=users[1])
+        pairs = [(a.pk, users[0].pk), (b.pk, users[1].pk), (a.pk, users[1].pk), (b.pk, users[2].pk)]
+        with django_assert_num_queries(1):
+            found = membership.members(pairs)
+        assert found == {(a.pk, users[0].pk), (b.pk, users[1].pk)}
+
+    def test_local_tier_is_bounded(self, users, settings):
+        settings.ROOM_MEMBERSHIP_CACHE_SIZE = 2
+        rooms = [create_room(owner=users[0], name=f"r{i}") for i in range(3)]
+        for room in rooms:
+            assert RoomService.is_participant(room, users[0])
+        assert membership.stats()["size"] == 2
+
+    def test_local_entries_expire(self, users, settings, monkeypatch, django_assert_num_queries):
+        settings.ROOM_MEMBERSHIP_CACHE_LOCAL_TTL = 30
+        room = create_room(owner=users[0])
+        now = membership.time.monotonic()
+        monkeypatch.setattr(membership.time, "monotonic", lambda: now)
+        assert RoomService.is_participant(room, users[0])
+        monkeypatch.setattr(membership.time, "monotonic", lambda: now + 31)
+        with django_assert_num_queries(1):
+            assert RoomService.is_participant(room, users[0])
+
+
+@pytest.mark.django_db
+class TestSharedMembershipTier:
+    @pytest.fixture(autouse=True)
+    def shared_tier(self, settings):
+        settings.ROOM_MEMBERSHIP_CACHE_SHARED_ALIAS = "default"
+
+    def test_other_process_reads_shared_tier(self, users, django_assert_num_queries):
+        room = create_room(owner=users[0])
+        assert RoomService.is_participant(room, users[0])
+        assert not RoomService.is_participant(room, users[1])
+        membership.clear()  # a fresh process: empty local tier
+        membership.reset_stats()
+        with django_assert_num_queries(0):
+            assert RoomService.is_participant(room, users[0])
+            assert not RoomService.is_participant(room, users[1])
+        assert membership.stats()["shared_hits"] == 2
+
+    def test_changes_evict_shared_entries(self, users, django_capture_on_commit_callbacks):
+        room = create_room(owner=users[0])
+        assert not RoomService.is_participant(room, users[1])
+        with django_capture_on_commit_callbacks(execute=True):
+            RoomService.add_participant(room, users[1])
+        assert cache.get(f"{membership.SHARED_KEY_PREFIX}{room.pk}:{users[1].pk}") is None
+        membership.clear()
+        assert RoomService.is_participant(room, users[1])
+        with django_capture_on_commit_callbacks(execute=True):
+            RoomService.remove_participant(room, users[1])
+        membership.clear()
+        assert not RoomService.is_participant(room, users[1])
@@ -0,0 +1,113 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.accounts.tests.factories import create_user
+from apps.rooms import search
+from apps.rooms.tests.factories import create_room
+
+
+@pytest.fixture(params=["fts5", "scan"])
+def search_backend(request, monkeypatch):
+    """Run each test against the FTS5 index and the unindexed icontains fallback."""
+    if request.param != "fts5":
+        monkeypatch.setattr(search, "backend", lambda: request.param)
+    return request.param
+
+
+@pytest.fixture
+def me(api_client):
+    user = create_user(username="me")
+    api_client.force_authenticate(user=user)
+    return user
+
+
+def _search(api_client, q, **params):
+    response = api_client.get(reverse("rooms:search"), {"q": q, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return response.data["results"]
+
+
+def _set_display_name(user, name):
+    user.profile.display_name = name
+    user.profile.save()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("search_backend")
+class TestRoomSearch:
+    def test_matches_room_name_prefix(self, api_client: APIClient, me):
+        create_room(owner=me, name="Project Apollo")
+        create_room(owner=me, name="Random")
+        assert [r["name"] for r in _search(api_client, "apol")] == ["Project Apollo"]
+        assert [r["name"] for r in _search(api_client, "proj apo")] == ["Project Apollo"]
+
+    def test_matches_participant_username_and_display_name(self, api_client: APIClient, me):
+        alice = create_user(username="alice")
+        bob = create_user(username="bob")
+        _set_display_name(bob, "Robert Smith")
+        with_alice = create_room(owner=me, name="One")
+        with_alice.participants.create(user=alice)
+        with_bob = create_room(owner=me, name="Two")
+        with_bob.participants.create(user=bob)
+
+        results = _search(api_client, "ali")
+        assert [r["id"] for r in results] == [with_alice.id]
+        assert results[0]["matched_users"] == [{"id": alice.id, "username": "alice", "display_name": "alice"}]
+        results = _search(api_client, "robert")
+        assert [r["id"] for r in results] == [with_bob.id]
+        assert results[0]["matched_users"][0]["display_name"] == "Robert Smith"
+
+    def test_only_callers_rooms(self, api_client: APIClient, me):
+        other = create_user(username="other")
+        create_room(owner=other, name="Secret plans")
+        assert _search(api_client, "secret") == []
+
+    def test_caller_does_not_match_own_rooms(self, api_client: APIClient, me):
+        create_room(owner=me, name="Anything")
+        assert _search(api_client, "me") == []
+
+    def test_index_follows_changes(self, api_client: APIClient, me):
+        alice = create_user(username="alice")
+        room = create_room(owner=me, name="Old name")
+        room.participants.create(user=alice)
+        room.name = "Fresh name"
+        room.save()
+        _set_display_name(alice, "Wonderland")
+        assert _search(api_client, "old") == []
+        assert [r["id"] for r in _search(api_client, "fresh")] == [room.id]
+        assert [r["id"] for r in _search(api_client, "wonder")] == [room.id]
+        alice.delete()
+        assert _search(api_client, "wonder") == []
+
+    def test_most_recent_activity_first_and_paginated(self, api_client: APIClient, me):
+        from apps.chat.services import MessageService
+
+        rooms = [create_room(owner=me, name=f"Team {i}") for i in range(3)]
+        MessageService.send_message(rooms[1], me, "hi")
+        results = _search(api_client, "team", page_size=2)
+        assert [r["id"] for r in results] == [rooms[1].id, rooms[2].id]
+
+    def test_odd_input_is_safe(self, api_client: APIClient, me):
+        create_room(owner=me, name='Say "hi" (now)')
+        assert len(_search(api_client, '"hi')) == 1
+        assert _search(api_client, 'NEAR AND OR * ^ -') == []
+
+    def test_q_required(self, api_client: APIClient, me):
+        response = api_client.get(reverse("rooms:search"), {"q": "  "})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestRoomSearchQueries:
+    @pytest.mark.parametrize("n", [2, 10])
+    def test_query_count_is_constant(self, api_client: APIClient, me, django_assert_num_queries, n):
+        for i in range(n):
+            member = create_user(username=f"dev{i}")
+            create_room(owner=me, name=f"Room {i}").participants.create(user=member)
+        # rooms with annotations, matched participants
+        with django_assert_num_queries(2):
+            results = _search(api_client, "dev")
+        assert len(results) == n
+        assert all(len(r["matched_users"]) == 1 for r in results)
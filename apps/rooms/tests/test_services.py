@@ -33,6 +33,33 @@ class TestRoomService:
             RoomService.add_participant(room, user)
         assert "user" in exc_info.value.detail
 
+    def test_add_participants_skips_rows_a_concurrent_add_inserted(self, monkeypatch):
+        from django.db.models import QuerySet
+
+        from apps.rooms.models import RoomParticipant
+
+        user = User.objects.create_user(username="u", email="u@ex.com", password="p")
+        a = User.objects.create_user(username="a", email="a@ex.com", password="p")
+        b = User.objects.create_user(username="b", email="b@ex.com", password="p")
+        room = create_room(owner=user)
+
+        # Simulate a single add of a that commits between the member lookup and the insert.
+        original_bulk_create = QuerySet.bulk_create
+
+        def racing_bulk_create(qs, objs, *args, **kwargs):
+            if qs.model is RoomParticipant:
+                RoomParticipant.objects.create(room=room, user=a)
+            return original_bulk_create(qs, objs, *args, **kwargs)
+
+        monkeypatch.setattr(QuerySet, "bulk_create", racing_bulk_create)
+        notified = []
+        monkeypatch.setattr(
+            RoomService, "_notify_participants_added", lambda room, users: notified.extend(users)
+        )
+        assert RoomService.add_participants(room, [a, b]) == {b.id}
+        assert notified == [b]
+        assert room.participants.count() == 3
+
     def test_remove_participant(self):
         user = User.objects.create_user(username="u", email="u@ex.com", password="p")
         other = User.objects.create_user(username="o", email="o@ex.com", password="p")
@@ -49,3 +76,102 @@ class TestRoomService:
         with pytest.raises(ValidationError) as exc_info:
             RoomService.remove_participant(room, other)
         assert "user" in exc_info.value.detail
+
+
+@pytest.mark.django_db
+class TestDirectRooms:
+    def _users(self):
+        a = User.objects.create_user(username="a", email="a@ex.com", password="p")
+        b = User.objects.create_user(username="b", email="b@ex.com", password="p")
+        return a, b
+
+    def test_get_or_create_is_symmetric(self, django_assert_num_queries):
+        from apps.rooms.models import DirectRoomKey
+
+        a, b = self._users()
+        room = RoomService.get_or_create_direct_room(a, b)
+        assert room.is_direct
+        assert set(room.participants.values_list("user_id", flat=True)) == {a.id, b.id}
+        key = DirectRoomKey.objects.get(room=room)
+        assert (key.user_low_id, key.user_high_id) == (min(a.id, b.id), max(a.id, b.id))
+
+        with django_assert_num_queries(1):
+            assert RoomService.get_or_create_direct_room(b, a) == room
+
+    def test_with_yourself_raises(self):
+        a, _ = self._users()
+        with pytest.raises(ValidationError):
+            RoomService.get_or_create_direct_room(a, a)
+
+    def test_concurrent_creation_returns_existing_room(self, monkeypatch):
+        from django.db.models import QuerySet
+
+        from apps.rooms.models import DirectRoomKey, Room
+
+        a, b = self._users()
+        winner = RoomService.get_or_create_direct_room(a, b)
+
+        # Simulate a request whose lookup ran before the winner committed.
+        original_first = QuerySet.first
+        missed = []
+
+        def stale_first(qs):
+            if qs.model is DirectRoomKey and not missed:
+                missed.append(True)
+                return None
+            return original_first(qs)
+
+        monkeypatch.setattr(QuerySet, "first", stale_first)
+        assert RoomService.get_or_create_direct_room(b, a) == winner
+        assert Room.objects.filter(is_direct=True).count() == 1
+
+    def test_leaving_releases_the_pair(self):
+        a, b = self._users()
+        room = RoomService.get_or_create_direct_room(a, b)
+        RoomService.remove_participant(room, b)
+        fresh = RoomService.get_or_create_direct_room(a, b)
+        assert fresh != room
+        assert fresh.participants.count() == 2
+
+
+@pytest.mark.django_db
+class TestPresenceSubscriptions:
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        from apps.rooms import presence
+
+        sent = []
+        monkeypatch.setattr(presence, "_send", lambda event_type, room_id, user_ids: sent.append(
+            (event_type, room_id, list(user_ids))
+        ))
+        return sent
+
+    def test_sent_once_the_change_commits(self, sent, django_capture_on_commit_callbacks):
+        user = User.objects.create_user(username="u", email="u@ex.com", password="p")
+        other = User.objects.create_user(username="o", email="o@ex.com", password="p")
+        room = create_room(owner=user)
+        with django_capture_on_commit_callbacks() as callbacks:
+            RoomService.add_participant(room, other)
+            RoomService.remove_participant(room, other)
+            assert sent == []
+        for callback in callbacks:
+            callback()
+        assert sent == [
+            ("presence.subscribe", room.id, [other.id]),
+            ("presence.unsubscribe", room.id, [other.id]),
+        ]
+
+    def test_rolled_back_add_sends_nothing(self, sent, django_capture_on_commit_callbacks):
+        from django.db import transaction
+
+        user = User.objects.create_user(username="u", email="u@ex.com", password="p")
+        others = [
+            User.objects.create_user(username=f"o{i}", email=f"o{i}@ex.com", password="p")
+            for i in range(2)
+        ]
+        room = create_room(owner=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(RuntimeError), transaction.atomic():
+                RoomService.add_participants(room, others)
+                raise RuntimeError
+        assert sent == []
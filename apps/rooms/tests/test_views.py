@@ -90,6 +90,31 @@ class TestRoomAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data["name"] == "New Name"
 
+    def test_rename_keeps_concurrent_message_state(self, api_client: APIClient, monkeypatch):
+        from apps.chat.services import MessageService
+        from apps.rooms import views
+        from apps.rooms.models import Room
+
+        user = create_user(username="u")
+        room = create_room(owner=user, name="Old")
+        get_object = views.RoomDetailView.get_object
+
+        def get_object_then_send(view):
+            obj = get_object(view)
+            # A message lands between the rename's read and its write.
+            MessageService.send_message(room=room, author=user, content="hi")
+            return obj
+
+        monkeypatch.setattr(views.RoomDetailView, "get_object", get_object_then_send)
+        api_client.force_authenticate(user=user)
+        response = api_client.patch(reverse("rooms:detail", kwargs={"pk": room.pk}), {"name": "New"})
+        assert response.status_code == status.HTTP_200_OK
+        room = Room.objects.get(pk=room.pk)
+        assert room.name == "New"
+        assert room.message_seq == 1
+        assert room.last_message_id is not None
+        MessageService.send_message(room=room, author=user, content="again")
+
     def test_update_room_as_non_owner_403(self, api_client: APIClient):
         owner = create_user(username="owner")
         other = create_user(username="other")
@@ -154,8 +179,9 @@ class TestRoomAPI:
         api_client.force_authenticate(user=user)
         response = api_client.get(reverse("rooms:participants", kwargs={"pk": room.pk}))
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]["user"]["username"] == "u"
+        assert len(response.data["results"]) == 1
+        assert response.data["results"][0]["user"]["username"] == "u"
+        assert response.data["results"][0]["is_admin"] is True
 
     def test_call_state_200_participant(self, api_client: APIClient):
         user = create_user(username="u")
@@ -168,6 +194,20 @@ class TestRoomAPI:
         assert response.data["room_state"] in ("idle", "active")
         assert isinstance(response.data["participants"], list)
 
+    def test_call_state_snapshot_carries_version(self, api_client: APIClient):
+        from apps.calls.call_state import STATE_ACTIVE, set_user_state
+
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R1")
+        delta = set_user_state(room.id, user.id, "u", STATE_ACTIVE)
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse("rooms:call-state", kwargs={"pk": room.pk}))
+        assert response.data == {
+            "version": delta["version"],
+            "participants": [{"user_id": user.id, "username": "u", "state": STATE_ACTIVE}],
+            "room_state": STATE_ACTIVE,
+        }
+
     def test_call_state_403_non_participant(self, api_client: APIClient):
         owner = create_user(username="owner")
         other = create_user(username="other")
@@ -221,3 +261,409 @@ class TestRoomAPI:
         url = reverse("rooms:remove-participant", kwargs={"pk": room.pk})
         response = api_client.post(url, {"id": target.id})
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize("method", ["post", "delete"])
+    def test_pin_keeps_concurrent_read_cursor(self, api_client: APIClient, monkeypatch, method):
+        from apps.rooms import views
+        from apps.rooms.models import RoomParticipant
+
+        owner = create_user(username="owner")
+        room = create_room(owner=owner, name="R1")
+        fetch = views.get_object_or_404
+
+        def fetch_then_read(model, **kwargs):
+            obj = fetch(model, **kwargs)
+            if model is RoomParticipant:
+                # mark_read lands between the pin view's read and its write.
+                RoomParticipant.objects.filter(pk=obj.pk).update(last_read_message_id=42)
+            return obj
+
+        monkeypatch.setattr(views, "get_object_or_404", fetch_then_read)
+        api_client.force_authenticate(user=owner)
+        response = getattr(api_client, method)(reverse("rooms:pin", kwargs={"pk": room.pk}))
+        assert response.status_code == status.HTTP_200_OK
+        participant = RoomParticipant.objects.get(room=room, user=owner)
+        assert participant.last_read_message_id == 42
+        assert participant.is_pinned is (method == "post")
+
+
+def _seed_rooms(user, n):
+    from apps.calls.call_state import STATE_ACTIVE, set_user_state
+    from apps.chat.services import MessageService
+    from apps.rooms.models import RoomParticipant
+
+    for i in range(n):
+        other = create_user(username=f"other{i}")
+        room = create_room(owner=other, name=f"Room {i}")
+        RoomParticipant.objects.create(room=room, user=user, is_pinned=i % 2 == 0)
+        MessageService.send_messages(
+            [{"room": room, "author": other, "content": f"m{j}"} for j in range(i + 1)]
+        )
+        set_user_state(room.id, other.id, other.username, STATE_ACTIVE)
+
+
+@pytest.mark.django_db
+class TestRoomListQueries:
+    def _list(self, api_client, django_assert_num_queries, expected):
+        with django_assert_num_queries(expected):
+            response = api_client.get(reverse("rooms:list-create"), {"page_size": 50})
+        assert response.status_code == status.HTTP_200_OK
+        return response.data["results"]
+
+    @pytest.mark.parametrize("n", [2, 12])
+    def test_list_query_count_is_constant(self, api_client: APIClient, django_assert_num_queries, n):
+        user = create_user(username="u")
+        _seed_rooms(user, n)
+        api_client.force_authenticate(user=user)
+        # page count, rooms with annotations
+        results = self._list(api_client, django_assert_num_queries, 2)
+        assert len(results) == n
+
+    def test_list_matches_per_room_serializer(self, api_client: APIClient, django_assert_num_queries):
+        from rest_framework.test import APIRequestFactory
+
+        from apps.rooms.models import Room
+        from apps.rooms.serializers import RoomSerializer
+
+        user = create_user(username="u")
+        _seed_rooms(user, 4)
+        api_client.force_authenticate(user=user)
+        results = self._list(api_client, django_assert_num_queries, 2)
+
+        request = APIRequestFactory().get("/")
+        request.user = user
+        for item in results:
+            expected = RoomSerializer(Room.objects.get(pk=item["id"]), context={"request": request}).data
+            assert item == expected
+            assert item["unread_count"] > 0
+            assert item["participant_count"] == 2
+            assert len(item["active_call_participants"]) == 1
+
+
+@pytest.mark.django_db
+class TestRoomActivity:
+    def test_send_message_updates_room_activity(self):
+        from apps.chat.services import MessageService
+        from apps.rooms.models import Room
+
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R")
+        assert room.last_message_id is None
+        MessageService.send_message(room=room, author=user, content="a")
+        latest = MessageService.send_messages([
+            {"room": room, "author": user, "content": "b"},
+            {"room": room, "author": user, "content": "c"},
+        ])[-1]
+        room = Room.objects.get(pk=room.pk)
+        assert room.last_message_id == latest.id
+        assert room.last_activity_at == latest.created_at
+
+    def test_list_ordering_activity(self, api_client: APIClient):
+        from apps.chat.services import MessageService
+
+        user = create_user(username="u")
+        old, quiet, busy = (create_room(owner=user, name=n) for n in ("old", "quiet", "busy"))
+        MessageService.send_message(room=old, author=user, content="x")
+        MessageService.send_message(room=busy, author=user, content="y")
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(reverse("rooms:list-create"), {"ordering": "activity"})
+        assert [r["name"] for r in response.data["results"]] == ["busy", "old", "quiet"]
+        default = api_client.get(reverse("rooms:list-create"))
+        assert [r["name"] for r in default.data["results"]] == ["busy", "quiet", "old"]
+        bad = api_client.get(reverse("rooms:list-create"), {"ordering": "name"})
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_repair_command(self):
+        from django.core.management import call_command
+
+        from apps.chat.models import Message
+        from apps.chat.services import MessageService
+        from apps.rooms.models import Room
+
+        user = create_user(username="u")
+        room = create_room(owner=user, name="R")
+        empty = create_room(owner=user, name="E")
+        first, second = MessageService.send_messages([
+            {"room": room, "author": user, "content": "a"},
+            {"room": room, "author": user, "content": "b"},
+        ])
+        Message.objects.filter(pk=second.pk).delete()
+        Room.objects.filter(pk=empty.pk).update(last_message_id=999)
+
+        call_command("repair_room_activity", "--batch-size", "1")
+        room.refresh_from_db()
+        empty.refresh_from_db()
+        assert (room.last_message_id, room.last_activity_at) == (first.id, first.created_at)
+        assert (empty.last_message_id, empty.last_activity_at) == (None, empty.created_at)
+
+
+@pytest.mark.django_db
+class TestBulkParticipants:
+    def _post(self, api_client, name, room, payload):
+        return api_client.post(reverse(f"rooms:{name}", kwargs={"pk": room.pk}), payload, format="json")
+
+    def test_add_reports_status_per_reference(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        a = create_user(username="a")
+        b = create_user(username="b")
+        member = create_user(username="m")
+        room = create_room(owner=owner)
+        room.participants.create(user=member)
+        api_client.force_authenticate(user=owner)
+        response = self._post(api_client, "add-participants", room, {
+            "ids": [a.id, member.id],
+            "usernames": ["b", "ghost"],
+            "emails": ["a@example.com"],
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 2
+        assert response.data["results"] == [
+            {"id": a.id, "user_id": a.id, "status": "added"},
+            {"id": member.id, "user_id": member.id, "status": "already_participant"},
+            {"username": "b", "user_id": b.id, "status": "added"},
+            {"username": "ghost", "user_id": None, "status": "not_found"},
+            {"email": "a@example.com", "user_id": a.id, "status": "added"},
+        ]
+        assert set(room.participants.values_list("user_id", flat=True)) == {owner.id, member.id, a.id, b.id}
+
+    @pytest.mark.parametrize("n", [3, 30])
+    def test_add_query_count_is_constant(self, api_client: APIClient, django_assert_num_queries, n):
+        owner = create_user(username="owner")
+        users = [create_user(username=f"user{i}") for i in range(n)]
+        room = create_room(owner=owner)
+        api_client.force_authenticate(user=owner)
+        # room + owner, users, existing members, insert, inserted rows, notification render (2)
+        with django_assert_num_queries(7):
+            response = self._post(api_client, "add-participants", room, {"ids": [u.id for u in users]})
+        assert response.data["count"] == n
+        assert room.participants.count() == n + 1
+
+    def test_add_notifies_each_added_user_once(self, api_client: APIClient, django_capture_on_commit_callbacks):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        owner = create_user(username="owner")
+        a = create_user(username="a")
+        member = create_user(username="m")
+        room = create_room(owner=owner)
+        room.participants.create(user=member)
+        layer = get_channel_layer()
+        channels = {}
+        for user in (a, member):
+            channels[user.id] = async_to_sync(layer.new_channel)()
+            async_to_sync(layer.group_add)(f"user_{user.id}", channels[user.id])
+
+        api_client.force_authenticate(user=owner)
+        with django_capture_on_commit_callbacks(execute=True):
+            self._post(api_client, "add-participants", room, {"ids": [a.id, member.id]})
+
+        events = []
+        while channels[a.id] in layer.channels and not layer.channels[channels[a.id]].empty():
+            events.append(async_to_sync(layer.receive)(channels[a.id]))
+        assert sorted(e["type"] for e in events) == ["notification", "presence.subscribe"]
+        (event,) = [e for e in events if e["type"] == "notification"]
+        assert event["data"]["type"] == "room_added"
+        assert event["data"]["room"]["id"] == room.id
+        assert event["data"]["room"]["participant_count"] == 3
+        assert layer.channels.get(channels[member.id]) is None or layer.channels[channels[member.id]].empty()
+
+    def test_add_non_owner_403(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        other = create_user(username="other")
+        room = create_room(owner=owner)
+        room.participants.create(user=other)
+        api_client.force_authenticate(user=other)
+        response = self._post(api_client, "add-participants", room, {"ids": [other.id]})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_add_requires_some_user(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        room = create_room(owner=owner)
+        api_client.force_authenticate(user=owner)
+        response = self._post(api_client, "add-participants", room, {"ids": []})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_add_rejects_too_many(self, api_client: APIClient):
+        from apps.rooms.serializers import BulkParticipantsSerializer
+
+        owner = create_user(username="owner")
+        room = create_room(owner=owner)
+        api_client.force_authenticate(user=owner)
+        ids = list(range(1, BulkParticipantsSerializer.MAX_USERS + 2))
+        response = self._post(api_client, "add-participants", room, {"ids": ids})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_added_users_pass_membership_checks(self, api_client: APIClient):
+        from apps.rooms.services import RoomService
+
+        owner = create_user(username="owner")
+        a = create_user(username="a")
+        room = create_room(owner=owner)
+        assert not RoomService.is_participant(room, a)
+        api_client.force_authenticate(user=owner)
+        self._post(api_client, "add-participants", room, {"ids": [a.id]})
+        assert RoomService.is_participant(room, a)
+
+    def test_remove_reports_status_per_reference(self, api_client: APIClient, django_capture_on_commit_callbacks):
+        from apps.rooms.services import RoomService
+
+        owner = create_user(username="owner")
+        a = create_user(username="a")
+        b = create_user(username="b")
+        outsider = create_user(username="x")
+        room = create_room(owner=owner)
+        room.participants.create(user=a)
+        room.participants.create(user=b)
+        assert RoomService.is_participant(room, a)
+        api_client.force_authenticate(user=owner)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self._post(api_client, "remove-participants", room, {
+                "ids": [a.id, outsider.id],
+                "emails": ["b@example.com"],
+            })
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 2
+        assert [r["status"] for r in response.data["results"]] == ["removed", "not_participant", "removed"]
+        assert list(room.participants.values_list("user_id", flat=True)) == [owner.id]
+        assert not RoomService.is_participant(room, a)
+
+    def test_remove_non_owner_403(self, api_client: APIClient):
+        owner = create_user(username="owner")
+        other = create_user(username="other")
+        room = create_room(owner=owner)
+        room.participants.create(user=other)
+        api_client.force_authenticate(user=other)
+        response = self._post(api_client, "remove-participants", room, {"ids": [owner.id]})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestRoomConditionalGet:
+    def _forbid_serializers(self, monkeypatch):
+        from apps.rooms.serializers import RoomParticipantSerializer, RoomSerializer
+
+        def fail(*args, **kwargs):
+            raise AssertionError("serializer ran on a 304 path")
+
+        for serializer in (RoomSerializer, RoomParticipantSerializer):
+            monkeypatch.setattr(serializer, "to_representation", fail)
+
+    def _setup(self, api_client):
+        owner = create_user(username="owner")
+        other = create_user(username="other")
+        room = create_room(owner=owner)
+        room.participants.create(user=other)
+        api_client.force_authenticate(user=owner)
+        return owner, other, room
+
+    def test_detail_304_runs_no_serializer_queries(
+        self, api_client: APIClient, django_assert_num_queries, monkeypatch
+    ):
+        _, _, room = self._setup(api_client)
+        url = reverse("rooms:detail", kwargs={"pk": room.pk})
+        etag = api_client.get(url)["ETag"]
+        self._forbid_serializers(monkeypatch)
+        # room with owner and profile, membership version
+        with django_assert_num_queries(2):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+    def test_participants_304_runs_no_serializer_queries(
+        self, api_client: APIClient, django_assert_num_queries, monkeypatch
+    ):
+        _, _, room = self._setup(api_client)
+        url = reverse("rooms:participants", kwargs={"pk": room.pk})
+        etag = api_client.get(url)["ETag"]
+        self._forbid_serializers(monkeypatch)
+        # room, membership version
+        with django_assert_num_queries(2):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_non_participant_gets_403_not_304(self, api_client: APIClient):
+        _, _, room = self._setup(api_client)
+        url = reverse("rooms:detail", kwargs={"pk": room.pk})
+        etag = api_client.get(url)["ETag"]
+        api_client.force_authenticate(user=create_user(username="stranger"))
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize("change", ["rename", "message", "join", "pin", "profile", "call", "read"])
+    def test_detail_etag_changes(self, api_client: APIClient, change):
+        from apps.calls.call_state import STATE_ACTIVE, set_user_state
+        from apps.chat.services import MessageService
+
+        owner, other, room = self._setup(api_client)
+        url = reverse("rooms:detail", kwargs={"pk": room.pk})
+        message = MessageService.send_message(room, other, "hello")
+        etag = api_client.get(url)["ETag"]
+        if change == "rename":
+            room.name = "Renamed"
+            room.save()
+        elif change == "message":
+            MessageService.send_message(room, other, "again")
+        elif change == "join":
+            room.participants.create(user=create_user(username="new"))
+        elif change == "pin":
+            room.participants.filter(user=owner).update(is_pinned=True)
+        elif change == "profile":
+            other.profile.display_name = "Other"
+            other.profile.save()
+        elif change == "call":
+            set_user_state(room.id, other.id, other.username, STATE_ACTIVE)
+        elif change == "read":
+            MessageService.mark_read(room, owner, message.id)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_participants_etag_changes_on_leave(self, api_client: APIClient):
+        from apps.rooms.services import RoomService
+
+        _, other, room = self._setup(api_client)
+        url = reverse("rooms:participants", kwargs={"pk": room.pk})
+        etag = api_client.get(url)["ETag"]
+        RoomService.remove_participant(room, other)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 1
+
+
+@pytest.mark.django_db
+class TestParticipantPagination:
+    def _room(self, n):
+        from apps.rooms.models import RoomParticipant
+
+        owner = create_user(username="owner")
+        room = create_room(owner=owner)
+        RoomParticipant.objects.bulk_create(
+            [RoomParticipant(room=room, user=create_user(username=f"user{i}")) for i in range(n)]
+        )
+        return owner, room
+
+    def test_walks_all_participants_in_join_order(self, api_client: APIClient):
+        owner, room = self._room(7)
+        api_client.force_authenticate(user=owner)
+        url = reverse("rooms:participants", kwargs={"pk": room.pk})
+        seen, params = [], {"page_size": 3}
+        while True:
+            data = api_client.get(url, params).data
+            seen += [p["user"]["username"] for p in data["results"]]
+            if not data["next_cursor"]:
+                break
+            params = {"page_size": 3, "after": data["next_cursor"]}
+        assert seen == ["owner"] + [f"user{i}" for i in range(7)]
+        assert [p["is_admin"] for p in api_client.get(url).data["results"]][:2] == [True, False]
+
+    @pytest.mark.parametrize("n", [3, 30])
+    def test_page_query_count_is_constant(self, api_client: APIClient, django_assert_num_queries, n):
+        owner, room = self._room(n)
+        api_client.force_authenticate(user=owner)
+        url = reverse("rooms:participants", kwargs={"pk": room.pk})
+        api_client.get(url)  # warm the membership cache
+        # room, membership version, page with users and profiles
+        with django_assert_num_queries(3):
+            response = api_client.get(url)
+        assert len(response.data["results"]) == n + 1
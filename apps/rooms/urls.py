@@ -1,5 +1,7 @@
 from django.urls import path, include
 
+from apps.chat.views import MessageSearchView
+
 from . import views
 
 app_name = "rooms"
@@ -7,6 +9,7 @@ app_name = "rooms"
 urlpatterns = [
     path("", views.RoomListCreateView.as_view(), name="list-create"),
     path("direct/", views.DirectRoomCreateView.as_view(), name="direct-create"),
+    path("search/", views.RoomSearchView.as_view(), name="search"),
     path("<int:pk>/", views.RoomDetailView.as_view(), name="detail"),
     path("<int:pk>/join/", views.RoomJoinView.as_view(), name="join"),
     path("<int:pk>/leave/", views.RoomLeaveView.as_view(), name="leave"),
@@ -14,8 +17,11 @@ urlpatterns = [
     path("<int:pk>/participants/", views.RoomParticipantListView.as_view(), name="participants"),
     path("<int:pk>/add-participant/", views.RoomAddParticipantView.as_view(), name="add-participant"),
     path("<int:pk>/remove-participant/", views.RoomRemoveParticipantView.as_view(), name="remove-participant"),
+    path("<int:pk>/add-participants/", views.RoomAddParticipantsView.as_view(), name="add-participants"),
+    path("<int:pk>/remove-participants/", views.RoomRemoveParticipantsView.as_view(), name="remove-participants"),
     path("<int:pk>/call-state/", views.RoomCallStateView.as_view(), name="call-state"),
     path("<int:pk>/invite/", views.RoomInviteCreateView.as_view(), name="invite-create"),
     path("join/<uuid:token>/", views.RoomInviteJoinView.as_view(), name="invite-join"),
+    path("<int:room_id>/messages/search/", MessageSearchView.as_view(), name="message-search"),
     path("<int:room_id>/messages/", include("apps.chat.urls")),
 ]
@@ -4,15 +4,28 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.calls.call_state import get_room_aggregate_state, get_room_state
+from apps.accounts.serializers import UserSerializer
+from apps.calls.call_state import (
+    aggregate_state,
+    get_room_snapshot,
+    get_room_state,
+    get_rooms_state,
+)
+from core.conditional import ConditionalGetMixin, make_version
+from core.pagination import KeysetPagination
 
+from . import search
+from .bootstrap import bootstrap_state, last_messages
 from .models import Room, RoomParticipant
 from .permissions import IsRoomOwner, IsRoomParticipant
 from .serializers import (
+    BootstrapRoomSerializer,
     CreateRoomSerializer,
     AddParticipantSerializer,
+    BulkParticipantsSerializer,
     RemoveParticipantSerializer,
     RoomParticipantSerializer,
+    RoomSearchSerializer,
     RoomSerializer,
     UpdateRoomSerializer,
 )
@@ -27,7 +40,7 @@ class RoomPinView(APIView):
         room = get_object_or_404(Room, pk=pk)
         participant = get_object_or_404(RoomParticipant, room=room, user=request.user)
         participant.is_pinned = True
-        participant.save()
+        participant.save(update_fields=["is_pinned", "updated_at"])
         return Response(RoomSerializer(room, context={"request": request}).data)
 
     def delete(self, request, pk):
@@ -35,7 +48,7 @@ class RoomPinView(APIView):
         room = get_object_or_404(Room, pk=pk)
         participant = get_object_or_404(RoomParticipant, room=room, user=request.user)
         participant.is_pinned = False
-        participant.save()
+        participant.save(update_fields=["is_pinned", "updated_at"])
         return Response(RoomSerializer(room, context={"request": request}).data)
 
 
@@ -77,14 +90,54 @@ class RoomInviteJoinView(APIView):
             raise
 
 
+class BootstrapView(ConditionalGetMixin, APIView):
+    """
+    Everything the sidebar needs at startup in one response. Send the returned
+    ETag back as If-None-Match to get an empty 304 while nothing changed.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        version, room_ids, call_states = bootstrap_state(request.user)
+
+        def build():
+            context = {
+                "request": request,
+                "call_states": call_states,
+                "last_messages": last_messages(room_ids),
+            }
+            rooms = RoomService.rooms_for_listing(request.user).filter(pk__in=room_ids)
+            return Response({
+                "version": version,
+                "user": UserSerializer(request.user, context={"request": request}).data,
+                "rooms": BootstrapRoomSerializer(rooms, many=True, context=context).data,
+            })
+
+        return self.conditional_response(request, version, build)
+
+
 class RoomListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    ORDERINGS = {
+        "created": ("-created_at", "-id"),
+        # Backed by the rooms_room_activity index; no scan of chat messages.
+        "activity": ("-last_activity_at", "-id"),
+    }
+
     def get(self, request):
-        """List rooms where the user is a participant. Paginated."""
+        """List rooms where the user is a participant. Paginated; ?ordering=created|activity."""
         from rest_framework.pagination import PageNumberPagination
 
-        rooms = Room.objects.filter(participants__user=request.user).distinct()
+        from core.exceptions import ValidationError
+
+        ordering = request.query_params.get("ordering", "created")
+        if ordering not in self.ORDERINGS:
+            raise ValidationError(
+                detail={"ordering": [f"Unknown ordering. Use one of: {', '.join(self.ORDERINGS)}."]}
+            )
+        rooms = RoomService.rooms_for_listing(request.user).order_by(*self.ORDERINGS[ordering])
         paginator = PageNumberPagination()
         try:
             page_size = request.query_params.get("page_size")
@@ -93,10 +146,15 @@ class RoomListCreateView(APIView):
         except (TypeError, ValueError):
             pass
         page = paginator.paginate_queryset(rooms, request)
+        rows = page if page is not None else list(rooms)
+        context = {
+            "request": request,
+            # One cache round trip for the call presence of every room on the page.
+            "call_states": get_rooms_state([room.id for room in rows]),
+        }
+        serializer = RoomSerializer(rows, many=True, context=context)
         if page is not None:
-            serializer = RoomSerializer(page, many=True, context={"request": request})
             return paginator.get_paginated_response(serializer.data)
-        serializer = RoomSerializer(rooms, many=True, context={"request": request})
         return Response(serializer.data)
 
     def post(self, request):
@@ -113,16 +171,60 @@ class RoomListCreateView(APIView):
         )
 
 
-class RoomDetailView(APIView):
+class RoomSearchView(APIView):
+    """
+    Rooms of the caller matching `?q=` by name or by another participant's username /
+    display name, most recent activity first, keyset-paginated. Each room lists the
+    participants that matched in `matched_users`.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        q = (request.query_params.get("q") or "").strip()
+        if not q:
+            return Response({"q": ["This parameter is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        rooms = search.search_rooms(request.user, q)
+        paginator = KeysetPagination(field="last_activity_at")
+        page = paginator.paginate_queryset(rooms, request)
+        search.attach_matched_participants(page, request.user, q, RoomSearchSerializer.MATCHED_USERS_LIMIT)
+        context = {
+            "request": request,
+            "call_states": get_rooms_state([room.id for room in page]),
+        }
+        return paginator.get_paginated_response(RoomSearchSerializer(page, many=True, context=context).data)
+
+
+class RoomDetailView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, IsRoomParticipant]
 
     def get_object(self):
         return get_object_or_404(Room, pk=self.kwargs["pk"])
 
     def get(self, request, pk):
-        room = self.get_object()
+        """Room details; ETag from the room row, its membership version and call presence."""
+        room = get_object_or_404(Room.objects.select_related("owner", "owner__profile"), pk=pk)
         self.check_object_permissions(request, room)
-        return Response(RoomSerializer(room, context={"request": request}).data)
+        members = RoomService.membership_version([room.pk], viewer=request.user)
+        call_state = get_room_state(room.pk)
+        owner_profile = getattr(room.owner, "profile", None)
+        version = make_version(
+            room.pk,
+            room.name,
+            room.updated_at,
+            room.message_seq,
+            room.last_message_id,
+            room.last_activity_at,
+            room.owner.username,
+            room.owner.email,
+            owner_profile and owner_profile.updated_at,
+            sorted(members.items()),
+            call_state,
+        )
+        context = {"request": request, "call_states": {room.pk: call_state}}
+        return self.conditional_response(
+            request, version, lambda: Response(RoomSerializer(room, context=context).data)
+        )
 
     def patch(self, request, pk):
         room = self.get_object()
@@ -135,7 +237,7 @@ class RoomDetailView(APIView):
         serializer.is_valid(raise_exception=True)
         if "name" in serializer.validated_data:
             room.name = serializer.validated_data["name"]
-            room.save()
+            room.save(update_fields=["name", "updated_at"])
         return Response(RoomSerializer(room, context={"request": request}).data)
 
     def delete(self, request, pk):
@@ -186,15 +288,31 @@ class RoomLeaveView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RoomParticipantListView(APIView):
+class RoomParticipantListView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, IsRoomParticipant]
 
+    page_size = 50
+
     def get(self, request, pk):
+        """
+        Participants in join order, keyset-paginated (`after` / `before` cursors,
+        `page_size` up to 100). ETag from the membership version and the room owner.
+        """
         room = get_object_or_404(Room, pk=pk)
         self.check_object_permissions(request, room)
-        participants = room.participants.select_related("user").all()
-        serializer = RoomParticipantSerializer(participants, many=True, context={"request": request})
-        return Response(serializer.data)
+        members = RoomService.membership_version([room.pk])
+        version = make_version(room.pk, room.owner_id, sorted(members.items()))
+
+        def build():
+            participants = room.participants.select_related("user", "user__profile")
+            paginator = KeysetPagination(field="created_at", descending=False)
+            paginator.page_size = self.page_size
+            page = paginator.paginate_queryset(participants, request)
+            context = {"request": request, "room_owner_id": room.owner_id}
+            serializer = RoomParticipantSerializer(page, many=True, context=context)
+            return paginator.get_paginated_response(serializer.data)
+
+        return self.conditional_response(request, version, build)
 
 class RoomAddParticipantView(APIView):
     """Add a participant to the room by id, username or email. Owner only."""
@@ -284,19 +402,81 @@ class RoomRemoveParticipantView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class BulkParticipantsView(APIView):
+    """
+    Base for the bulk add/remove endpoints: validates the owner and the input, resolves
+    every user in one query, applies `change` once and reports a status per reference.
+    """
+
+    permission_classes = [IsAuthenticated]
+    forbidden_detail = ""
+    changed_status = ""
+    unchanged_status = ""
+    change = None  # RoomService method (room, users) -> ids of the users changed
+
+    def post(self, request, pk):
+        room = get_object_or_404(Room.objects.select_related("owner"), pk=pk)
+        if not IsRoomOwner().has_object_permission(request, self, room):
+            return Response({"detail": self.forbidden_detail}, status=status.HTTP_403_FORBIDDEN)
+        serializer = BulkParticipantsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        refs = [
+            *(("id", value) for value in data["ids"]),
+            *(("username", value) for value in data["usernames"]),
+            *(("email", value) for value in data["emails"]),
+        ]
+        found = RoomService.resolve_users(data["ids"], data["usernames"], data["emails"])
+        changed = self.change(room, list(found.values()))
+
+        results = []
+        for field, value in refs:
+            user = found.get((field, value))
+            if user is None:
+                result_status = "not_found"
+            elif user.pk in changed:
+                result_status = self.changed_status
+            else:
+                result_status = self.unchanged_status
+            results.append({field: value, "user_id": user and user.pk, "status": result_status})
+        return Response({"count": len(changed), "results": results})
+
+
+class RoomAddParticipantsView(BulkParticipantsView):
+    """Add many participants by ids, usernames and emails. Owner only."""
+
+    forbidden_detail = "Only the room owner can add participants."
+    changed_status = "added"
+    unchanged_status = "already_participant"
+    change = staticmethod(RoomService.add_participants)
+
+
+class RoomRemoveParticipantsView(BulkParticipantsView):
+    """Remove many participants by ids, usernames and emails. Owner only."""
+
+    forbidden_detail = "Only the room owner can remove participants."
+    changed_status = "removed"
+    unchanged_status = "not_participant"
+    change = staticmethod(RoomService.remove_participants)
+
+
 class RoomCallStateView(APIView):
-    """Return current call presence state (Redis) for the room. Participants only."""
+    """
+    Return the current call presence snapshot for the room with its version, the
+    state that call_state_delta frames of the signaling socket apply to. Participants only.
+    """
 
     permission_classes = [IsAuthenticated, IsRoomParticipant]
 
     def get(self, request, pk):
         room = get_object_or_404(Room, pk=pk)
         self.check_object_permissions(request, room)
-        participants = get_room_state(room.id)
-        room_state = get_room_aggregate_state(room.id)
+        version, participants = get_room_snapshot(room.id)
         return Response({
+            "version": version,
             "participants": participants,
-            "room_state": room_state,
+            "room_state": aggregate_state(participants),
         })
 
 
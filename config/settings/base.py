@@ -149,8 +149,57 @@ LOGGING = {
     },
 }
 
+# Chat write-behind: when enabled, ChatConsumer queues incoming messages per process and
+# persists them with bulk_create every CHAT_WRITE_BEHIND_FLUSH_MS ms or MAX_BATCH messages.
+CHAT_WRITE_BEHIND = False
+CHAT_WRITE_BEHIND_FLUSH_MS = 5
+CHAT_WRITE_BEHIND_MAX_BATCH = 100
+
+# Serialized chat message cache (apps/chat/message_cache.py), shared by REST and WebSocket.
+CHAT_MESSAGE_CACHE_ALIAS = "default"
+CHAT_MESSAGE_CACHE_TTL = 3600
+
+# Messages older than this move to the archive tier (manage.py archive_messages).
+CHAT_ARCHIVE_AFTER_DAYS = 180
+
+# ChatConsumer ?since_seq=N replays at most this many missed messages; beyond that the
+# client gets resync_required and pages history over REST.
+CHAT_RESUME_MAX_MESSAGES = 200
+
+# Inbound WebSocket rate limits (core/ratelimit.py): token bucket per user and message type.
+# burst = bucket size, per_second = refill rate; "*" covers types without an entry.
+WS_RATE_LIMIT_ENABLED = True
+WS_RATE_LIMIT_CACHE_ALIAS = "default"
+WS_RATE_LIMITS = {
+    "chat_message": {"burst": 10, "per_second": 1},
+    "message_read": {"burst": 60, "per_second": 10},
+    "mark_room_as_read": {"burst": 10, "per_second": 1},
+    "join_call": {"burst": 10, "per_second": 0.5},
+    "leave_call": {"burst": 10, "per_second": 0.5},
+    "request_mic": {"burst": 5, "per_second": 0.2},
+    "offer": {"burst": 20, "per_second": 2},
+    "answer": {"burst": 20, "per_second": 2},
+    "ice_candidate": {"burst": 100, "per_second": 20},
+    "ping": {"burst": 10, "per_second": 1},
+    "*": {"burst": 20, "per_second": 2},
+}
+
+# ICE candidate coalescing for signaling sockets opened with ?ice_batch=1 (apps/calls/consumers.py):
+# candidates to one peer within this window are relayed as one ice_candidates frame. 0 = off.
+SIGNALING_ICE_BATCH_WINDOW_MS = 50
+
+# Room membership cache (apps/rooms/membership.py) behind every "is a participant?" check.
+# Local tier: per-process LRU of known memberships. Shared tier: a cache alias (None = off).
+ROOM_MEMBERSHIP_CACHE_SIZE = 10000
+ROOM_MEMBERSHIP_CACHE_LOCAL_TTL = 30
+ROOM_MEMBERSHIP_CACHE_SHARED_ALIAS = None
+ROOM_MEMBERSHIP_CACHE_SHARED_TTL = 3600
+
 # Call state (presence) for voice calls UI — Redis hash per room
 CALL_STATE_REDIS_URL = "redis://localhost:6379/3"
+# Cache holding call presence (apps/calls/call_state.py): per-user hash fields on a Redis
+# cache, compare-and-swap of the room dict on any other backend.
+CALL_STATE_CACHE_ALIAS = "default"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
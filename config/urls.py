@@ -7,9 +7,12 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.rooms.views import BootstrapView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("apps.accounts.urls")),
+    path("api/bootstrap/", BootstrapView.as_view(), name="bootstrap"),
     path("api/rooms/", include("apps.rooms.urls")),
     # path("api/files/", include("apps.files.urls")),
     path("api/chat/", include("apps.chat.urls")),
@@ -10,3 +10,24 @@ from rest_framework.test import APIClient
 @pytest.fixture
 def api_client():
     return APIClient()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """Write uploaded files under a temporary MEDIA_ROOT instead of the repo's media/."""
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """Cache-backed state (call presence, message cache, memberships) must not leak between tests."""
+    from django.core.cache import cache
+
+    from apps.rooms import membership
+
+    cache.clear()
+    membership.clear()
+    yield
+    cache.clear()
+    membership.clear()
@@ -0,0 +1,61 @@
+"""
+Conditional GET (ETag / Last-Modified) for APIViews.
+
+A view computes a version from cheap reads (updated_at columns, membership versions,
+cache state) before it touches serializers, and passes the serializer work as a
+callable. A request whose If-None-Match / If-Modified-Since still matches gets an
+empty 304 and the callable never runs:
+
+    class RoomDetailView(ConditionalGetMixin, APIView):
+        def get(self, request, pk):
+            room = ...
+            version = make_version(room.updated_at, ...)
+            return self.conditional_response(
+                request, version, lambda: Response(RoomSerializer(room).data)
+            )
+
+The ETag is weak (W/"<version>"): equal versions mean the same representation, not
+byte-identical bodies. Pass last_modified only when every input of the version is
+covered by it (a removed row lowers no max(updated_at)); If-None-Match wins when a
+client sends both, as RFC 9110 requires.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_version(*parts) -> str:
+    """Stable digest of the given values (anything with a deterministic repr)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs with 304 before building the response; see module docstring."""
+
+    def conditional_response(self, request, version: str, build, last_modified: datetime | None = None):
+        etag = f'W/"{version}"'
+        timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+        conditional = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if conditional is None:
+            response = build()
+        elif conditional.status_code == status.HTTP_304_NOT_MODIFIED:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            return conditional
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        # Per-user representations: browsers may store them but must revalidate.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
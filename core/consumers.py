@@ -1,27 +1,57 @@
+import asyncio
+
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from core.ws_auth import get_user_from_scope
 
+from apps.rooms import presence
+from apps.rooms.models import RoomParticipant
+
+
 class NotificationConsumer(AsyncJsonWebsocketConsumer):
     """
     WebSocket consumer for user-specific notifications (e.g., room invites, updates).
-    Group name: user_{user_id}
+    Group name: user_{user_id}, plus room_presence_{room_id} for every room of the user
+    (see apps/rooms/presence.py).
     """
     async def connect(self):
         self.user = await database_sync_to_async(get_user_from_scope)(self.scope)
-        
+
         if not self.user or not self.user.is_authenticated:
             await self.close(code=4403)
             return
 
         self.user_group_name = f"user_{self.user.id}"
+        # Join user_{id} first: membership changes from here on arrive as presence.* events.
         await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        room_ids = await database_sync_to_async(
+            lambda: list(RoomParticipant.objects.filter(user=self.user).values_list("room_id", flat=True))
+        )()
+        self.presence_groups = {presence.group_name(room_id) for room_id in room_ids}
+        await asyncio.gather(
+            *(self.channel_layer.group_add(group, self.channel_name) for group in self.presence_groups)
+        )
         await self.accept()
 
     async def disconnect(self, close_code):
         if hasattr(self, "user_group_name"):
-            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+            await asyncio.gather(
+                self.channel_layer.group_discard(self.user_group_name, self.channel_name),
+                *(self.channel_layer.group_discard(group, self.channel_name) for group in self.presence_groups),
+            )
 
     async def notification(self, event):
         """Send notification to the client."""
         await self.send_json(event["data"])
+
+    async def presence_subscribe(self, event):
+        """The user joined a room: receive its presence updates."""
+        group = presence.group_name(event["room_id"])
+        self.presence_groups.add(group)
+        await self.channel_layer.group_add(group, self.channel_name)
+
+    async def presence_unsubscribe(self, event):
+        """The user left a room."""
+        group = presence.group_name(event["room_id"])
+        self.presence_groups.discard(group)
+        await self.channel_layer.group_discard(group, self.channel_name)
@@ -0,0 +1,21 @@
+"""Print how often WebSocket rate limits tripped, per message type (all processes sharing the cache)."""
+
+from django.core.management.base import BaseCommand
+
+from core import ratelimit
+
+
+class Command(BaseCommand):
+    help = "Show WebSocket rate-limit trip counters per message type."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing.")
+
+    def handle(self, *args, **options):
+        stats = ratelimit.shared_stats()
+        if not stats:
+            self.stdout.write("No rate limits tripped.")
+        for name, count in sorted(stats.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"{name}={count}")
+        if options["reset"]:
+            ratelimit.reset_stats()
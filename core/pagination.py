@@ -0,0 +1,164 @@
+"""
+Keyset (seek) pagination over a (timestamp, id) pair.
+
+Unlike PageNumberPagination it never runs COUNT(*) and never uses OFFSET,
+so page latency depends on the page size, not on how deep the client scrolled.
+Cursors are opaque url-safe tokens: base64("<iso timestamp>|<id>").
+"""
+
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.exceptions import ValidationError
+
+
+def encode_cursor(value, pk) -> str:
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Return (datetime, id) from a cursor token. Raises ValidationError if malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        ts, pk = raw.rsplit("|", 1)
+        value = parse_datetime(ts)
+        if value is None:
+            raise ValueError(ts)
+        return value, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError(detail={"cursor": ["Invalid cursor."]})
+
+
+class KeysetPagination:
+    """
+    Paginate a queryset by (field, id) with `before` / `after` cursors.
+
+    descending=True (default) returns newest first: `before` walks on to older rows
+    and `after` walks back to newer ones. With descending=False the roles swap, so
+    `after` is always "later in time". Pages are always returned in display order.
+    The queryset should be backed by an index on (<filter columns>, field, id) for
+    the seek to stay O(page_size).
+    """
+
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    before_query_param = "before"
+    after_query_param = "after"
+
+    def __init__(self, field: str = "created_at", descending: bool = True):
+        self.field = field
+        self.descending = descending
+        if descending:
+            self.forward_param, self.backward_param = self.before_query_param, self.after_query_param
+        else:
+            self.forward_param, self.backward_param = self.after_query_param, self.before_query_param
+        self.request = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        """True if the request asks for keyset mode (explicitly or by passing a cursor)."""
+        params = request.query_params
+        return (
+            params.get("pagination") == "cursor"
+            or cls.before_query_param in params
+            or cls.after_query_param in params
+        )
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _seek(self, value, pk, forward: bool) -> Q:
+        # Written as a range on `field` minus the tied rows on the wrong side of `id`
+        # (instead of `field < v OR (field = v AND id < pk)`) so the planner can
+        # turn it into an index range scan.
+        f = self.field
+        if forward == self.descending:
+            return Q(**{f"{f}__lte": value}) & ~Q(**{f: value, "id__gte": pk})
+        return Q(**{f"{f}__gte": value}) & ~Q(**{f: value, "id__lte": pk})
+
+    def _order(self, forward: bool) -> list[str]:
+        prefix = "-" if forward == self.descending else ""
+        return [f"{prefix}{self.field}", f"{prefix}id"]
+
+    def paginate_queryset(self, queryset, request) -> list:
+        return self.paginate_tiers([queryset], request)
+
+    def paginate_tiers(self, querysets, request) -> list:
+        """
+        Paginate over several querysets with the same (field, id) keys, given in
+        display order, e.g. [hot table, archive table] for newest-first history
+        where every archived row is older than every hot row. Later tiers are only
+        queried once the earlier ones run out of rows for the page.
+        """
+        self.request = request
+        size = self.get_page_size(request)
+        forward = request.query_params.get(self.forward_param)
+        backward = request.query_params.get(self.backward_param)
+
+        if backward:
+            value, pk = decode_cursor(backward)
+            # Walk against the display order, then flip the page back.
+            seek = self._seek(value, pk, forward=False)
+            rows = self._collect(reversed(querysets), seek, forward=False, limit=size + 1)
+            has_more = len(rows) > size
+            rows = rows[:size][::-1]
+            self.previous_cursor = self._cursor(rows[0]) if has_more else None
+            self.next_cursor = self._cursor(rows[-1]) if rows else backward
+            return rows
+
+        seek = None
+        if forward:
+            value, pk = decode_cursor(forward)
+            seek = self._seek(value, pk, forward=True)
+        rows = self._collect(querysets, seek, forward=True, limit=size + 1)
+        has_more = len(rows) > size
+        rows = rows[:size]
+        self.next_cursor = self._cursor(rows[-1]) if has_more else None
+        if forward:
+            self.previous_cursor = self._cursor(rows[0]) if rows else forward
+        return rows
+
+    def _collect(self, querysets, seek, forward: bool, limit: int) -> list:
+        rows = []
+        for qs in querysets:
+            if seek is not None:
+                qs = qs.filter(seek)
+            rows += list(qs.order_by(*self._order(forward=forward))[: limit - len(rows)])
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _cursor(self, obj) -> str:
+        return encode_cursor(getattr(obj, self.field), obj.pk)
+
+    def _link(self, param: str, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(OrderedDict([
+            ("next", self._link(self.forward_param, self.next_cursor)),
+            ("previous", self._link(self.backward_param, self.previous_cursor)),
+            ("next_cursor", self.next_cursor),
+            ("previous_cursor", self.previous_cursor),
+            ("results", data),
+        ]))
@@ -0,0 +1,170 @@
+"""
+Token-bucket rate limiting for inbound WebSocket messages (ChatConsumer, SignalingConsumer).
+
+Every user has one bucket per message type, shared by all of their sockets and all
+worker processes: settings.WS_RATE_LIMITS maps a message type to {"burst", "per_second"};
+types without an entry (unknown ones included) share the "*" bucket. A message spends one token; tokens
+refill continuously up to burst.
+
+Buckets live in the cache named by WS_RATE_LIMIT_CACHE_ALIAS under
+ratelimit:ws:{user_id}:{type}. On a Redis cache (Django's RedisCache or django-redis) the
+refill-and-spend step is one Lua script, so it is atomic across processes. Other backends
+use get/set under a per-process lock: exact for LocMemCache, best effort (a burst racing
+across processes may overspend slightly) for shared database/memcached caches.
+
+Trips are counted per message type in this process (stats()) and mirrored into the cache
+under ratelimit:ws:stats:* (shared_stats(), `manage.py ws_rate_limit_stats`).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from core.utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:ws:"
+STATS_PREFIX = f"{KEY_PREFIX}stats:"
+STATS_INDEX_KEY = f"{STATS_PREFIX}types"
+DEFAULT_BUDGET = {"burst": 20, "per_second": 2}
+
+# KEYS[1] bucket hash; ARGV burst, per_second, ttl. Returns seconds to wait ("0" = allowed).
+_REDIS_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return tostring(retry)
+"""
+
+clock = time.time
+_lock = threading.Lock()
+_stats: dict[str, int] = {}
+
+
+def _cache():
+    return caches[getattr(settings, "WS_RATE_LIMIT_CACHE_ALIAS", "default")]
+
+
+def bucket_name(message_type) -> str:
+    """Types without their own budget (including unknown, client-chosen ones) share "*"."""
+    return message_type if message_type in getattr(settings, "WS_RATE_LIMITS", {}) else "*"
+
+
+def budget(name: str) -> dict:
+    return getattr(settings, "WS_RATE_LIMITS", {}).get(name) or DEFAULT_BUDGET
+
+
+def _spend_redis(client, key, burst, rate, ttl) -> float:
+    return float(client.eval(_REDIS_SCRIPT, 1, key, burst, rate, ttl))
+
+
+def _spend_local(cache, key, burst, rate, ttl) -> float:
+    with _lock:
+        now = clock()
+        tokens, ts = cache.get(key) or (burst, now)
+        tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+        retry = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry = (1 - tokens) / rate
+        cache.set(key, (tokens, now), timeout=ttl)
+    return retry
+
+
+def hit(user_id: int, message_type: str) -> float:
+    """
+    Spend one token of user_id's bucket for message_type.
+    Returns 0.0 if the message is allowed, else the seconds until it would be.
+    """
+    if not getattr(settings, "WS_RATE_LIMIT_ENABLED", True):
+        return 0.0
+    name = bucket_name(message_type)
+    limit = budget(name)
+    burst, rate = limit["burst"], limit["per_second"]
+    # An idle bucket refills completely in burst / rate seconds; after that, no key = full.
+    ttl = math.ceil(burst / rate) + 1
+    cache = _cache()
+    key = f"{KEY_PREFIX}{user_id}:{name}"
+    raw_key = cache.make_and_validate_key(key)
+    client = redis_client(cache, raw_key)
+    if client is not None:
+        retry = _spend_redis(client, raw_key, burst, rate, ttl)
+    else:
+        retry = _spend_local(cache, key, burst, rate, ttl)
+    if retry > 0:
+        _record(name)
+        logger.info("Rate limited user %s on %s (retry in %.2fs)", user_id, name, retry)
+    return retry
+
+
+async def ahit(user_id: int, message_type: str) -> float:
+    """hit() for consumers; cache I/O runs off the event loop."""
+    return await sync_to_async(hit, thread_sensitive=False)(user_id, message_type)
+
+
+def rate_limited_error(message_type, retry_after: float, **extra) -> dict:
+    """The frame sent back instead of processing a rate-limited message."""
+    return {
+        "type": "error",
+        "code": "rate_limited",
+        "detail": f"Too many messages; retry in {retry_after:.2f}s.",
+        "message_type": message_type,
+        "retry_after": round(retry_after, 3),
+        **extra,
+    }
+
+
+def _record(name: str) -> None:
+    _stats[name] = _stats.get(name, 0) + 1
+    cache = _cache()
+    key = f"{STATS_PREFIX}{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+        types = cache.get(STATS_INDEX_KEY) or []
+        if name not in types:
+            cache.set(STATS_INDEX_KEY, sorted([*types, name]), timeout=None)
+
+
+def stats() -> dict[str, int]:
+    """Rate-limit trips per message type in this process."""
+    return dict(_stats)
+
+
+def shared_stats() -> dict[str, int]:
+    """Rate-limit trips per message type summed over every process sharing the cache."""
+    cache = _cache()
+    types = cache.get(STATS_INDEX_KEY) or []
+    values = cache.get_many([f"{STATS_PREFIX}{t}" for t in types])
+    return {t: values.get(f"{STATS_PREFIX}{t}", 0) for t in types}
+
+
+def reset_stats() -> None:
+    _stats.clear()
+    cache = _cache()
+    types = cache.get(STATS_INDEX_KEY) or []
+    cache.delete_many([STATS_INDEX_KEY, *(f"{STATS_PREFIX}{t}" for t in types)])
@@ -0,0 +1,75 @@
+from datetime import UTC, datetime
+
+import pytest
+from django.utils.http import http_date
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core.conditional import ConditionalGetMixin, make_version
+
+CHANGED = datetime(2024, 5, 1, 12, 0, tzinfo=UTC)
+
+
+class ThingView(ConditionalGetMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+    built = 0
+
+    def get(self, request):
+        def build():
+            ThingView.built += 1
+            return Response({"thing": 1})
+
+        return self.conditional_response(request, make_version("thing", CHANGED), build, last_modified=CHANGED)
+
+
+@pytest.fixture
+def get():
+    ThingView.built = 0
+    view = ThingView.as_view()
+
+    def _get(**headers):
+        return view(APIRequestFactory().get("/thing/", headers=headers))
+
+    return _get
+
+
+class TestMakeVersion:
+    def test_stable_and_sensitive(self):
+        assert make_version(1, "a", CHANGED) == make_version(1, "a", CHANGED)
+        assert make_version(1, "a") != make_version(1, "b")
+        assert make_version("ab", "c") != make_version("a", "bc")
+
+
+class TestConditionalGetMixin:
+    def test_full_response_carries_validators(self, get):
+        response = get()
+        assert response.status_code == 200
+        assert response["ETag"] == f'W/"{make_version("thing", CHANGED)}"'
+        assert response["Last-Modified"] == http_date(CHANGED.timestamp())
+        assert "private" in response["Cache-Control"] and "no-cache" in response["Cache-Control"]
+        assert ThingView.built == 1
+
+    def test_if_none_match_skips_build(self, get):
+        etag = get()["ETag"]
+        response = get(if_none_match=etag)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert ThingView.built == 1
+
+    def test_if_none_match_accepts_lists_and_strong_form(self, get):
+        etag = get()["ETag"]
+        assert get(if_none_match=f'"other", {etag}').status_code == 304
+        assert get(if_none_match=etag.removeprefix("W/")).status_code == 304
+
+    def test_stale_etag_gets_full_response(self, get):
+        assert get(if_none_match='W/"stale"').status_code == 200
+
+    def test_if_modified_since(self, get):
+        assert get(if_modified_since=http_date(CHANGED.timestamp())).status_code == 304
+        assert get(if_modified_since=http_date(CHANGED.timestamp() - 60)).status_code == 200
+
+    def test_if_none_match_wins_over_if_modified_since(self, get):
+        response = get(if_none_match='W/"stale"', if_modified_since=http_date(CHANGED.timestamp()))
+        assert response.status_code == 200
@@ -0,0 +1,113 @@
+import pytest
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import path
+from rest_framework.authtoken.models import Token
+
+from apps.accounts.tests.factories import create_user
+from apps.calls.consumers import SignalingConsumer
+from apps.rooms import presence
+from apps.rooms.models import RoomParticipant
+from apps.rooms.services import RoomService
+from apps.rooms.tests.factories import create_room
+from core.consumers import NotificationConsumer
+
+application = URLRouter([
+    path("ws/notifications/", NotificationConsumer.as_asgi()),
+    path("ws/call/<int:room_id>/", SignalingConsumer.as_asgi()),
+])
+
+
+async def _drain(communicator):
+    frames = []
+    while not await communicator.receive_nothing(timeout=0.1):
+        frames.append(await communicator.receive_json_from())
+    return frames
+
+
+async def _notifications(user):
+    token = await sync_to_async(lambda: Token.objects.create(user=user))()
+    communicator = WebsocketCommunicator(application, f"/ws/notifications/?token={token.key}")
+    assert (await communicator.connect())[0]
+    return communicator
+
+
+def _presence(frames):
+    return [f for f in frames if f.get("type") == "room_presence_update"]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNotificationPresenceGroups:
+    async def test_call_presence_reaches_members_through_room_sends(self, monkeypatch):
+        def seed():
+            owner = create_user(username="owner")
+            room = create_room(owner=owner, name="Big")
+            members = [create_user(username=f"m{i}") for i in range(20)]
+            RoomParticipant.objects.bulk_create([RoomParticipant(room=room, user=m) for m in members])
+            outsider = create_user(username="outsider")
+            return room, Token.objects.create(user=owner), members[0], outsider
+
+        room, owner_token, member, outsider = await sync_to_async(seed)()
+        member_socket = await _notifications(member)
+        outsider_socket = await _notifications(outsider)
+
+        layer = get_channel_layer()
+        group_send = layer.group_send
+        sent_to = []
+
+        async def counting_group_send(group, message):
+            sent_to.append(group)
+            await group_send(group, message)
+
+        monkeypatch.setattr(layer, "group_send", counting_group_send)
+        call = WebsocketCommunicator(application, f"/ws/call/{room.id}/?token={owner_token.key}")
+        assert (await call.connect())[0]
+        await call.send_json_to({"type": "join_call"})
+        await _drain(call)
+
+        # Two changes (connecting, then active), one room-group send each.
+        frames = _presence(await _drain(member_socket))
+        assert frames == 2 * [{"type": "room_presence_update", "room_id": room.id, "active_participants": ["owner"]}]
+        assert _presence(await _drain(outsider_socket)) == []
+        assert sent_to.count(presence.group_name(room.id)) == 2
+        assert not [group for group in sent_to if group.startswith("user_")]
+
+        await call.disconnect()
+        await member_socket.disconnect()
+        await outsider_socket.disconnect()
+
+    async def test_membership_changes_while_connected(self):
+        def seed():
+            owner = create_user(username="owner")
+            user = create_user(username="u")
+            return create_room(owner=owner, name="Later"), user
+
+        room, user = await sync_to_async(seed)()
+        socket = await _notifications(user)
+        update = {"type": "notification", "data": {"type": "room_presence_update", "room_id": room.id}}
+
+        await sync_to_async(RoomService.add_participant)(room, user)
+        frames = await _drain(socket)
+        assert [f["type"] for f in frames] == ["room_added"]
+        await get_channel_layer().group_send(presence.group_name(room.id), update)
+        assert _presence(await _drain(socket)) == [update["data"]]
+
+        await sync_to_async(RoomService.remove_participant)(room, user)
+        await _drain(socket)
+        await get_channel_layer().group_send(presence.group_name(room.id), update)
+        assert await _drain(socket) == []
+        await socket.disconnect()
+
+    async def test_disconnect_leaves_presence_groups(self):
+        def seed():
+            user = create_user(username="u")
+            return create_room(owner=user, name="Mine"), user
+
+        room, user = await sync_to_async(seed)()
+        socket = await _notifications(user)
+        layer = get_channel_layer()
+        assert layer.groups.get(presence.group_name(room.id))
+        await socket.disconnect()
+        assert not layer.groups.get(presence.group_name(room.id))
@@ -0,0 +1,227 @@
+"""
+Query-plan regression suite for the hot read paths.
+
+Seeds a dataset large enough for the planner to prefer indexes once per module
+(committed, then deleted again), runs ANALYZE, and checks EXPLAIN of each hot query: no
+full scan of a hot table (SQLite "SCAN <table>", PostgreSQL "Seq Scan on <table>"), and
+no sort step where an index is meant to deliver the rows in order. Runs on whichever database the test settings point at.
+"""
+
+import re
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.chat.models import ArchivedMessage, Message
+from apps.files.models import File
+from apps.rooms.models import DirectRoomKey, Room, RoomInvitation, RoomParticipant
+from apps.rooms.services import RoomService
+
+User = get_user_model()
+
+HOT_TABLES = [
+    "chat_message",
+    "chat_archivedmessage",
+    "rooms_room",
+    "rooms_roomparticipant",
+    "rooms_roominvitation",
+    "rooms_directroomkey",
+    "files_file",
+]
+N_USERS = 200
+N_ROOMS = 300
+MEMBERS_PER_ROOM = 8
+N_MESSAGES = 10000
+
+
+@pytest.fixture(scope="module")
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            users, rooms = _seed()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        yield users, rooms
+        with transaction.atomic():
+            user_ids = [user.id for user in users]
+            RoomInvitation.objects.filter(created_by_id__in=user_ids).delete()
+            File.objects.filter(uploaded_by_id__in=user_ids).delete()
+            Room.objects.filter(owner_id__in=user_ids).delete()
+            User.objects.filter(id__in=user_ids).delete()
+
+
+def _seed():
+    now = timezone.now()
+    users = User.objects.bulk_create(
+        [User(username=f"plan{i}", email=f"plan{i}@example.com") for i in range(N_USERS)]
+    )
+    rooms = Room.objects.bulk_create(
+        [Room(name=f"Room {i}", owner=users[i % N_USERS], last_activity_at=now) for i in range(N_ROOMS)]
+    )
+    RoomParticipant.objects.bulk_create(
+        [
+            RoomParticipant(room=room, user=users[(i * 7 + j) % N_USERS])
+            for i, room in enumerate(rooms)
+            for j in range(MEMBERS_PER_ROOM)
+        ],
+        ignore_conflicts=True,
+    )
+    Message.objects.bulk_create(
+        [
+            Message(
+                room=rooms[i % N_ROOMS],
+                author=users[i % N_USERS],
+                content=f"message {i}",
+                seq=i // N_ROOMS + 1,
+                created_at=now - timedelta(seconds=N_MESSAGES - i),
+            )
+            for i in range(N_MESSAGES)
+        ]
+    )
+    ArchivedMessage.objects.bulk_create(
+        [
+            ArchivedMessage(
+                id=10**9 + i,
+                room=rooms[i % N_ROOMS],
+                author=users[i % N_USERS],
+                content="old",
+                created_at=now - timedelta(days=365, seconds=i),
+            )
+            for i in range(N_MESSAGES // 4)
+        ]
+    )
+    RoomInvitation.objects.bulk_create(
+        [RoomInvitation(room=rooms[i % N_ROOMS], created_by=users[i % N_USERS]) for i in range(1000)]
+    )
+    File.objects.bulk_create(
+        [File(uploaded_by=users[i % N_USERS], name=f"f{i}.txt", file=f"files/f{i}.txt") for i in range(2000)]
+    )
+    DirectRoomKey.objects.bulk_create(
+        [
+            DirectRoomKey(room=rooms[i], user_low=users[i], user_high=users[i + 1])
+            for i in range(0, N_USERS - 1, 2)
+        ]
+    )
+    return users, rooms
+
+
+def explain(queryset) -> str:
+    if connection.vendor == "postgresql":
+        return queryset.explain(format="text")
+    return queryset.explain()
+
+
+def full_scans(plan: str) -> list[str]:
+    """Hot tables the plan reads in full."""
+    if connection.vendor == "postgresql":
+        pattern = r"Seq Scan on (\w+)"
+    else:
+        # "SCAN t" or "SCAN t USING [COVERING] INDEX i": both walk the whole table / index.
+        pattern = r"\bSCAN (\w+)"
+    return [table for table in re.findall(pattern, plan) if table in HOT_TABLES]
+
+
+def sorts(plan: str) -> bool:
+    if connection.vendor == "postgresql":
+        return bool(re.search(r"^\s*(->\s*)?(Incremental )?Sort\b", plan, re.MULTILINE))
+    return "USE TEMP B-TREE FOR ORDER BY" in plan
+
+
+def _hot_queries(users, rooms):
+    user, room = users[3], rooms[5]
+    newest = Message.objects.filter(room=room).order_by("-created_at", "-id").first()
+    return {
+        # name: (queryset, index must deliver the order)
+        "message_history_page": (
+            Message.objects.filter(room=room).order_by("-created_at", "-id")[:21],
+            True,
+        ),
+        "message_history_seek": (
+            Message.objects.filter(room=room)
+            .filter(Q(created_at__lte=newest.created_at) & ~Q(created_at=newest.created_at, id__gte=newest.id))
+            .order_by("-created_at", "-id")[:21],
+            True,
+        ),
+        "archive_history_page": (
+            ArchivedMessage.objects.filter(room=room).order_by("-created_at", "-id")[:21],
+            True,
+        ),
+        "unread_count": (
+            Message.objects.filter(room=room, id__gt=newest.id - 1000).exclude(author=user).values("id"),
+            False,
+        ),
+        "messages_since_seq": (
+            Message.objects.filter(room=room, seq__gt=10, seq__lte=210).order_by("seq"),
+            True,
+        ),
+        "user_memberships": (
+            RoomParticipant.objects.filter(user=user)
+            .order_by("room_id")
+            .values_list("room_id", "is_pinned", "last_read_message_id"),
+            True,
+        ),
+        "room_listing": (
+            RoomService.rooms_for_listing(user).order_by("-last_activity_at", "-id")[:20],
+            False,
+        ),
+        "participants_page": (
+            RoomParticipant.objects.filter(room=room).order_by("created_at", "id")[:51],
+            True,
+        ),
+        "membership_check": (
+            RoomParticipant.objects.filter(room_id__in=[room.id], user_id__in=[user.id])
+            .order_by()
+            .values_list("room_id", "user_id"),
+            False,
+        ),
+        "invitation_by_token": (RoomInvitation.objects.filter(token=uuid.uuid4()), False),
+        "files_by_uploader": (File.objects.filter(uploaded_by=user), False),
+        "direct_room_key": (
+            DirectRoomKey.objects.filter(user_low=users[0], user_high=users[1]).select_related("room"),
+            False,
+        ),
+    }
+
+
+HOT_QUERY_NAMES = [
+    "message_history_page",
+    "message_history_seek",
+    "archive_history_page",
+    "unread_count",
+    "messages_since_seq",
+    "user_memberships",
+    "room_listing",
+    "participants_page",
+    "membership_check",
+    "invitation_by_token",
+    "files_by_uploader",
+    "direct_room_key",
+]
+
+
+@pytest.mark.django_db
+class TestHotQueryPlans:
+    def test_every_hot_query_is_checked(self, dataset):
+        assert sorted(_hot_queries(*dataset)) == sorted(HOT_QUERY_NAMES)
+
+    @pytest.mark.parametrize("name", HOT_QUERY_NAMES)
+    def test_no_full_scan(self, dataset, name):
+        queryset, ordered = _hot_queries(*dataset)[name]
+        plan = explain(queryset)
+        assert full_scans(plan) == [], f"{name} scans a hot table:\n{plan}"
+        if ordered:
+            assert not sorts(plan), f"{name} sorts instead of reading an index in order:\n{plan}"
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="on SQLite every index ends in the rowid, so room_id alone already bounds id",
+    )
+    def test_unread_count_uses_room_id_index(self, dataset):
+        queryset, _ = _hot_queries(*dataset)["unread_count"]
+        plan = explain(queryset)
+        assert "chat_msg_room_id" in plan, plan
@@ -0,0 +1,69 @@
+import pytest
+from django.core.management import call_command
+
+from core import ratelimit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, "clock", lambda: now[0])
+    ratelimit.reset_stats()
+    yield now
+    ratelimit.reset_stats()
+
+
+@pytest.fixture
+def limits(settings):
+    settings.WS_RATE_LIMITS = {
+        "chat_message": {"burst": 3, "per_second": 1},
+        "*": {"burst": 1, "per_second": 0.5},
+    }
+
+
+@pytest.mark.usefixtures("limits")
+class TestTokenBucket:
+    def test_burst_then_limited(self, clock):
+        assert [ratelimit.hit(1, "chat_message") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert ratelimit.hit(1, "chat_message") == pytest.approx(1.0)
+
+    def test_refills_over_time(self, clock):
+        for _ in range(3):
+            ratelimit.hit(1, "chat_message")
+        clock[0] += 0.5
+        assert ratelimit.hit(1, "chat_message") == pytest.approx(0.5)
+        clock[0] += 0.5
+        assert ratelimit.hit(1, "chat_message") == 0.0
+
+    def test_buckets_are_per_user_and_type(self, clock):
+        for _ in range(3):
+            ratelimit.hit(1, "chat_message")
+        assert ratelimit.hit(2, "chat_message") == 0.0
+        assert ratelimit.hit(1, "offer") == 0.0
+
+    def test_unknown_types_share_default_bucket(self, clock):
+        assert ratelimit.hit(1, "foo") == 0.0
+        assert ratelimit.hit(1, "bar") == pytest.approx(2.0)
+        assert ratelimit.stats() == {"*": 1}
+
+    def test_disabled(self, clock, settings):
+        settings.WS_RATE_LIMIT_ENABLED = False
+        assert all(ratelimit.hit(1, "chat_message") == 0.0 for _ in range(10))
+
+    def test_trip_counters(self, clock, capsys):
+        for _ in range(5):
+            ratelimit.hit(1, "chat_message")
+        assert ratelimit.stats() == {"chat_message": 2}
+        assert ratelimit.shared_stats() == {"chat_message": 2}
+        call_command("ws_rate_limit_stats", "--reset")
+        assert "chat_message=2" in capsys.readouterr().out
+        assert ratelimit.shared_stats() == {}
+
+
+def test_rate_limited_error_frame():
+    frame = ratelimit.rate_limited_error("offer", 0.12345, client_id="c1")
+    assert frame["type"] == "error"
+    assert frame["code"] == "rate_limited"
+    assert frame["retry_after"] == 0.123
+    assert frame["message_type"] == "offer"
+    assert frame["client_id"] == "c1"
@@ -1 +1,12 @@
 # Shared helper functions; keep minimal in bootstrap phase.
+
+
+def redis_client(cache, key):
+    """Raw redis client behind a Redis-backed Django cache (for key), or None."""
+    backend = getattr(cache, "_cache", None)
+    if backend is not None and hasattr(backend, "get_client"):  # django.core.cache RedisCache
+        return backend.get_client(key, write=True)
+    client = getattr(cache, "client", None)
+    if client is not None and hasattr(client, "get_client"):  # django-redis
+        return client.get_client(write=True)
+    return None
@@ -13,33 +13,46 @@ interface SidebarProps {
 }
 
 export const Sidebar: React.FC<SidebarProps> = ({ onClose }) => {
-  const { rooms, fetchRooms, togglePinRoom } = useRoomStore();
+  const { rooms, fetchRooms, togglePinRoom, searchRooms } = useRoomStore();
   const { user, logout, token } = useAuthStore();
   const { joinCall, isActive: isCallActive } = useCallStore();
   const navigate = useNavigate();
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
+  // Ids of rooms the server matched (room name or member name); null until it answers.
+  const [matchedRoomIds, setMatchedRoomIds] = useState<Set<number> | null>(null);
   const { t } = useTranslation();
 
   useEffect(() => {
     fetchRooms();
   }, [fetchRooms]);
 
+  useEffect(() => {
+    const query = searchQuery.trim();
+    setMatchedRoomIds(null);
+    if (!query) return;
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const found = await searchRooms(query);
+        if (!cancelled) setMatchedRoomIds(new Set(found.map(r => r.id)));
+      } catch {
+        // keep the local name filter
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, searchRooms]);
+
   const filteredRooms = useMemo(() => {
     const query = searchQuery.toLowerCase().trim();
     if (!query) return rooms;
-
-    return rooms.filter(room => {
-      // Search by room name
-      if (room.name.toLowerCase().includes(query)) return true;
-      
-      // Search by participants
-      return room.participant_users?.some(p => 
-        p.username.toLowerCase().includes(query) || 
-        p.display_name?.toLowerCase().includes(query)
-      );
-    });
-  }, [rooms, searchQuery]);
+    if (matchedRoomIds) return rooms.filter(room => matchedRoomIds.has(room.id));
+    // Until the server answers, filter by room name locally.
+    return rooms.filter(room => room.name.toLowerCase().includes(query));
+  }, [rooms, searchQuery, matchedRoomIds]);
 
   const { pinnedRooms, regularRooms } = useMemo(() => {
     return {
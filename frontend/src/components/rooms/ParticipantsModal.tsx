@@ -19,7 +19,16 @@ export const ParticipantsModal: React.FC<ParticipantsModalProps> = ({
   roomId,
   isOwner,
 }) => {
-  const { participants, fetchParticipants, removeParticipant, getOrCreateDirectRoom, isLoading, error } = useRoomStore();
+  const {
+    participants,
+    participantsCursor,
+    fetchParticipants,
+    fetchMoreParticipants,
+    removeParticipant,
+    getOrCreateDirectRoom,
+    isLoading,
+    error,
+  } = useRoomStore();
   const { user: currentUser } = useAuthStore();
   const navigate = useNavigate();
 
@@ -115,6 +124,15 @@ export const ParticipantsModal: React.FC<ParticipantsModalProps> = ({
           {participants.length === 0 && (
             <div className="text-gray-400 text-sm">Нет участников</div>
           )}
+          {participantsCursor && (
+            <button
+              className="w-full py-2 text-sm text-blue-400 hover:text-blue-300 disabled:opacity-50"
+              disabled={isLoading}
+              onClick={() => fetchMoreParticipants(roomId)}
+            >
+              Показать ещё
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -14,6 +14,7 @@ interface CallState {
   remoteStreams: Map<number, MediaStream>; // userId -> stream
   peers: Map<number, RTCPeerConnection>; // userId -> peer connection
   participants: Map<number, CallParticipant>; // userId -> participant details
+  callStateVersion: number | null; // version of the call_state snapshot + applied deltas
   volumes: Map<number, number>; // userId -> volume (0.0 to 2.0)
   ws: WebSocket | null;
   roomId: number | null;
@@ -73,6 +74,7 @@ export const useCallStore = create<CallState>((set, get) => ({
   remoteStreams: new Map(),
   peers: new Map(),
   participants: new Map(),
+  callStateVersion: null,
   volumes: new Map(),
   ws: null,
   roomId: null,
@@ -153,7 +155,8 @@ export const useCallStore = create<CallState>((set, get) => ({
       });
 
       // 2. Connect Signaling WebSocket
-      const ws = new WebSocket(`${WS_URL}/ws/call/${roomId}/?token=${token}`);
+      // ice_batch=1: trickled candidates arrive coalesced as ice_candidates frames
+      const ws = new WebSocket(`${WS_URL}/ws/call/${roomId}/?token=${token}&ice_batch=1`);
 
       ws.onopen = () => {
         get().addLog('Connected to signaling server');
@@ -190,60 +193,57 @@ export const useCallStore = create<CallState>((set, get) => ({
 
         try {
           if (type === 'call_state') {
-            const participants = data.participants;
+            // Full snapshot (on connect or after sync_call_state); deltas apply on top of it.
             const participantsMap = new Map<number, CallParticipant>();
-            
-            if (Array.isArray(participants)) {
-              participants.forEach((p: any) => {
-                participantsMap.set(p.user_id, {
-                  id: p.user_id,
-                  username: p.username,
-                  state: p.state,
-                });
-              });
-            }
-            
-            set({ participants: participantsMap });
+            (data.participants || []).forEach((p: any) => {
+              participantsMap.set(p.user_id, { id: p.user_id, username: p.username, state: p.state });
+            });
+
+            set({ participants: participantsMap, callStateVersion: data.version });
             get().updateVideoQuality();
           }
-          else if (type === 'user_joined') {
-            // New user joined, we (existing user) initiate connection
-            const targetUserId = data.user.id;
+          else if (type === 'call_state_delta') {
+            const version = get().callStateVersion;
+            if (version === null || data.version <= version) {
+              return; // Before our snapshot, or already contained in it
+            }
+            if (data.version !== version + 1) {
+              get().addLog(`Call state gap (${version} -> ${data.version}), resyncing`);
+              ws.send(JSON.stringify({ type: 'sync_call_state' }));
+              return;
+            }
+
             const myUserId = _user.id;
-            get().addLog(`User joined: ${data.user.username} (${targetUserId})`);
-            
-            // Add to participants
-            set((state: CallState) => {
-              const newParticipants = new Map(state.participants);
-              newParticipants.set(targetUserId, {
-                id: targetUserId,
-                username: data.user.username,
-                state: 'active'
-              });
-              return { participants: newParticipants };
+            const previous = get().participants;
+            const participantsMap = new Map(previous);
+            const joined: number[] = [];
+            [...data.added, ...data.changed].forEach((p: any) => {
+              // A peer becoming active is what user_joined used to announce
+              if (p.state === 'active' && previous.get(p.user_id)?.state !== 'active' && p.user_id !== myUserId) {
+                joined.push(p.user_id);
+              }
+              participantsMap.set(p.user_id, { id: p.user_id, username: p.username, state: p.state });
             });
+            data.removed.forEach((userId: number) => participantsMap.delete(userId));
 
-            await createPeerConnection(targetUserId, stream, ws, set, get, myUserId);
-            get().updateVideoQuality();
-          } 
-          else if (type === 'user_left') {
-            const targetUserId = data.user_id;
-            get().addLog(`User left: ${targetUserId}`);
-            
-            // Remove from participants
             set((state: CallState) => {
-              const newParticipants = new Map(state.participants);
-              newParticipants.delete(targetUserId);
-              
               const newPeerFlags = new Map(state.peerFlags);
-              newPeerFlags.delete(targetUserId);
-              
-              return { participants: newParticipants, peerFlags: newPeerFlags };
+              data.removed.forEach((userId: number) => newPeerFlags.delete(userId));
+              return { participants: participantsMap, peerFlags: newPeerFlags, callStateVersion: data.version };
             });
 
-            closePeerConnection(targetUserId, set, get);
+            // New user joined, we (existing user) initiate connection
+            for (const userId of joined) {
+              get().addLog(`User joined: ${participantsMap.get(userId)?.username} (${userId})`);
+              await createPeerConnection(userId, stream, ws, set, get, myUserId);
+            }
+            for (const userId of data.removed) {
+              if (userId === myUserId) continue;
+              get().addLog(`User left: ${userId}`);
+              closePeerConnection(userId, set, get);
+            }
             get().updateVideoQuality();
-          } 
+          }
           else if (type === 'existing_participants') {
              // Connect to existing users in the room
              const { users } = data;
@@ -307,11 +307,15 @@ export const useCallStore = create<CallState>((set, get) => ({
               }
             }
           } 
-          else if (type === 'ice_candidate') {
-            const { from_user_id, candidate } = data;
+          else if (type === 'ice_candidate' || type === 'ice_candidates') {
+            const { from_user_id } = data;
+            const candidates = type === 'ice_candidates' ? data.candidates : [data.candidate];
             const peer = get().peers.get(from_user_id);
             if (peer) {
-              await peer.addIceCandidate(new RTCIceCandidate(candidate));
+              for (const candidate of candidates) {
+                // null = end-of-candidates
+                await peer.addIceCandidate(candidate ? new RTCIceCandidate(candidate) : undefined);
+              }
             }
           }
           else if (type === 'request_mic') {
@@ -369,6 +373,7 @@ export const useCallStore = create<CallState>((set, get) => ({
       remoteStreams: new Map(),
       peers: new Map(),
       participants: new Map(),
+      callStateVersion: null,
       ws: null,
       roomId: null,
     });
@@ -596,15 +601,15 @@ async function createPeerConnection(
 
   // Handle ICE candidates
   peer.onicecandidate = (event) => {
-    if (event.candidate) {
-      ws.send(JSON.stringify({
-        type: 'ice_candidate',
-        data: {
-          target_user_id: targetUserId,
-          candidate: event.candidate,
-        },
-      }));
-    }
+    // event.candidate is null once gathering is done: sent as end-of-candidates so the
+    // server flushes its batch for this peer right away
+    ws.send(JSON.stringify({
+      type: 'ice_candidate',
+      data: {
+        target_user_id: targetUserId,
+        candidate: event.candidate,
+      },
+    }));
   };
 
   // AICODE-NOTE: Perfect Negotiation pattern implementation (#WebRTC)
@@ -61,7 +61,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
     set({ isLoading: true, error: null });
     try {
       // Handle pagination
-      const response = await api.get<any>(`/api/chat/${roomId}/messages/`);
+      const response = await api.get<any>(`/api/chat/${roomId}/messages/?pagination=cursor`);
       const data = response.data;
       
       let messages: Message[] = [];
@@ -95,8 +95,14 @@ export const useChatStore = create<ChatState>((set, get) => ({
       set({ ws: null, isConnected: false });
     }
 
+    // Resume from the last message we already hold for this room, if any
+    const lastSeq = get().messages
+      .filter((m) => m.room === roomId && m.seq)
+      .reduce((max, m) => Math.max(max, m.seq as number), 0);
+    const resume = lastSeq > 0 ? `&since_seq=${lastSeq}` : '';
+
     // Ensure correct path
-    const url = `${WS_URL}/ws/chat/${roomId}/?token=${token}`;
+    const url = `${WS_URL}/ws/chat/${roomId}/?token=${token}${resume}`;
     console.log('Connecting to WebSocket:', url);
     
     const ws = new WebSocket(url);
@@ -125,6 +131,10 @@ export const useChatStore = create<ChatState>((set, get) => ({
 
       if (data.type === 'chat_message') {
         const newMessage = data.data;
+        // Replayed messages on resume may overlap with live broadcasts
+        if (get().messages.some((m) => m.id === newMessage.id)) {
+          return;
+        }
         set((state) => ({
           messages: [...state.messages, newMessage],
         }));
@@ -172,6 +182,46 @@ export const useChatStore = create<ChatState>((set, get) => ({
             ),
           };
         });
+      } else if (data.type === 'messages_read') {
+        // Batched read receipt: everything in (from_message_id, last_read_message_id] is read by user_id
+        const { room_id, user_id, from_message_id, last_read_message_id, count } = data.data;
+        const currentUser = useAuthStore.getState().user;
+
+        if (currentUser && user_id === currentUser.id && count > 0) {
+          useRoomStore.setState((roomState) => ({
+            rooms: roomState.rooms.map(r =>
+              r.id === room_id && typeof r.unread_count === 'number'
+                ? { ...r, unread_count: Math.max(0, r.unread_count - count) }
+                : r
+            )
+          }));
+        }
+
+        set((state) => ({
+          messages: state.messages.map((m) =>
+            m.id > from_message_id && m.id <= last_read_message_id && m.author.id !== user_id
+              ? { ...m, read_by_ids: Array.from(new Set([...(m.read_by_ids || []), user_id])) }
+              : m
+          ),
+        }));
+      } else if (data.type === 'read_state') {
+        // Resume snapshot: user_id -> last read message id for every participant
+        const { room_id, read_cursors } = data.data;
+        set((state) => ({
+          messages: state.messages.map((m) =>
+            m.room === room_id
+              ? {
+                  ...m,
+                  read_by_ids: Object.entries(read_cursors as Record<string, number>)
+                    .filter(([uid, lastRead]) => Number(uid) !== m.author.id && lastRead >= m.id)
+                    .map(([uid]) => Number(uid)),
+                }
+              : m
+          ),
+        }));
+      } else if (data.type === 'resync_required') {
+        // Too much was missed to replay over the socket: reload history over REST
+        get().fetchMessages(roomId);
       } else if (data.type === 'error') {
         set({ error: data.detail });
       }
@@ -1,18 +1,24 @@
 import { create } from 'zustand';
 import api from '../api/client';
 import type { Room, CreateRoomPayload, RoomParticipant } from '../types/room';
+import type { User } from '../types/auth';
 
-interface PaginatedResponse<T> {
-  count: number;
-  next: string | null;
-  previous: string | null;
-  results: T[];
+interface BootstrapResponse {
+  version: string;
+  user: User;
+  rooms: Room[];
+}
+
+interface ParticipantPage {
+  results: RoomParticipant[];
+  next_cursor: string | null;
 }
 
 interface RoomState {
   rooms: Room[];
   currentRoom: Room | null;
   participants: RoomParticipant[];
+  participantsCursor: string | null;
   isLoading: boolean;
   error: string | null;
   
@@ -22,6 +28,8 @@ interface RoomState {
   getRoom: (id: number) => Promise<void>;
   addParticipant: (roomId: number, query: string) => Promise<void>;
   fetchParticipants: (roomId: number) => Promise<void>;
+  fetchMoreParticipants: (roomId: number) => Promise<void>;
+  searchRooms: (query: string) => Promise<Room[]>;
   removeParticipant: (roomId: number, userIdOrQuery: string | number) => Promise<void>;
   getOrCreateDirectRoom: (userId: number) => Promise<Room>;
   togglePinRoom: (roomId: number, isPinned: boolean) => Promise<void>;
@@ -33,6 +41,7 @@ export const useRoomStore = create<RoomState>((set, get) => ({
   rooms: [],
   currentRoom: null,
   participants: [],
+  participantsCursor: null,
   isLoading: false,
   error: null,
 
@@ -84,8 +93,9 @@ export const useRoomStore = create<RoomState>((set, get) => ({
   fetchRooms: async () => {
     set({ isLoading: true, error: null });
     try {
-      const response = await api.get<PaginatedResponse<Room>>('/api/rooms/');
-      set({ rooms: response.data.results, isLoading: false });
+      // One request for the whole sidebar; the browser revalidates it with its ETag (304)
+      const response = await api.get<BootstrapResponse>('/api/bootstrap/');
+      set({ rooms: response.data.rooms, isLoading: false });
     } catch (error: any) {
       set({
         isLoading: false,
@@ -171,8 +181,40 @@ export const useRoomStore = create<RoomState>((set, get) => ({
   fetchParticipants: async (roomId) => {
     set({ isLoading: true, error: null });
     try {
-      const response = await api.get<RoomParticipant[]>(`/api/rooms/${roomId}/participants/`);
-      set({ participants: response.data, isLoading: false });
+      const response = await api.get<ParticipantPage>(`/api/rooms/${roomId}/participants/`);
+      set({
+        participants: response.data.results,
+        participantsCursor: response.data.next_cursor,
+        isLoading: false,
+      });
+    } catch (error: any) {
+      set({
+        isLoading: false,
+        error: error.response?.data?.detail || 'Failed to fetch participants',
+      });
+    }
+  },
+
+  searchRooms: async (query) => {
+    const response = await api.get<{ results: Room[] }>('/api/rooms/search/', {
+      params: { q: query, page_size: 100 },
+    });
+    return response.data.results;
+  },
+
+  fetchMoreParticipants: async (roomId) => {
+    const cursor = get().participantsCursor;
+    if (!cursor) return;
+    set({ isLoading: true, error: null });
+    try {
+      const response = await api.get<ParticipantPage>(`/api/rooms/${roomId}/participants/`, {
+        params: { after: cursor },
+      });
+      set((state) => ({
+        participants: [...state.participants, ...response.data.results],
+        participantsCursor: response.data.next_cursor,
+        isLoading: false,
+      }));
     } catch (error: any) {
       set({
         isLoading: false,
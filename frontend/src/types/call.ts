@@ -15,7 +15,7 @@ export interface CallState {
 }
 
 export interface SignalingMessage {
-  type: 'join_call' | 'leave_call' | 'offer' | 'answer' | 'ice_candidate' | 'user_joined' | 'user_left';
+  type: 'join_call' | 'leave_call' | 'sync_call_state' | 'offer' | 'answer' | 'ice_candidate' | 'ice_candidates' | 'call_state' | 'call_state_delta';
   data?: any;
   target_user_id?: number;
   sender_user_id?: number;
@@ -17,6 +17,7 @@ export interface Attachment {
 export interface Message {
   id: number;
   room: number;
+  seq?: number | null;
   author: User;
   content: string;
   attachments: Attachment[];
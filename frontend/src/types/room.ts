@@ -8,14 +8,25 @@ export interface Room {
   active_call_participants: string[];
   unread_count?: number;
   is_pinned?: boolean;
-  participant_users?: Array<{
+  // Only in /api/rooms/search/ results: participants whose name matched.
+  matched_users?: Array<{
     id: number;
     username: string;
     display_name: string | null;
   }>;
   is_direct: boolean;
+  last_activity_at: string;
   created_at: string;
   updated_at: string;
+  last_message?: {
+    id: number;
+    seq: number | null;
+    author_id: number;
+    author_display_name: string;
+    content: string;
+    has_attachments: boolean;
+    created_at: string;
+  } | null;
 }
 
 export interface CreateRoomPayload {